@@ -2,30 +2,90 @@
 LabAgent - Agente de Inventário Automatizado
 Coleta informações de hardware e software do computador e sincroniza com a API Laravel
 """
+import logging
+import signal
 import time
-import hashlib
-import json
+import os
 import sys
-from collectors import hardware, software, network
+from datetime import datetime
+from collectors.backend import get_backend
+from collectors.pipeline import CollectorPipeline
+from collectors.cache import cache as collector_cache
+from collectors.registry_watch import SoftwareWatcher, create_backend
+from collectors.software_filter import SoftwareFilter
 from api.client import LaravelAPIClient
+from api.batching import AdaptiveBatchSizer
+from api.retry import CircuitBreaker, RetryPolicy
 from utils.logger import setup_logger
 from utils.config_manager import ConfigManager
+from utils.state_store import SyncState
+from utils.software_cache import SoftwareIdCache
+from utils.fingerprint import section_hashes, equipamento_hash
+from sync.synchronizer import InventorySynchronizer
+from sync.drainer import SpoolDrainer
+from utils.spool import SyncSpool
+from utils.metrics import StatusServer, metrics
+from utils.scheduler import CadenceScheduler
 
 AGENT_VERSION = "1.0.0"
 
 
-def generate_hash(data):
+def install_stop_handlers(scheduler):
     """
-    Gera hash SHA256 dos dados para detectar mudanças
+    Encerra o agente com Ctrl+C ou parada do serviço
+    
+    O NSSM para o serviço enviando Ctrl+C (e depois Ctrl+Break); no Linux
+    chega SIGTERM. O primeiro sinal encerra o agendador, que termina o ciclo
+    em andamento e sai; um segundo sinal interrompe imediatamente.
     
     Args:
-        data: Dicionário com dados
+        scheduler: Instância de CadenceScheduler
+    """
+    def handle(signum, frame):
+        if scheduler.stopped:
+            raise KeyboardInterrupt
+        scheduler.stop()
     
-    Returns:
-        str: Hash SHA256 dos dados
+    for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+        signum = getattr(signal, name, None)
+        if signum is not None:
+            signal.signal(signum, handle)
+
+
+def enqueue_changes(spool, changed, equipamento_data, sw_data, hashes, reconcile=False):
     """
-    json_str = json.dumps(data, sort_keys=True)
-    return hashlib.sha256(json_str.encode()).hexdigest()
+    Grava no spool os snapshots das seções alteradas
+    
+    Um snapshot idêntico ao já pendente não é regravado.
+    
+    Args:
+        spool: Instância de SyncSpool
+        changed: Seções alteradas
+        equipamento_data: Dados do equipamento (hardware + rede)
+        sw_data: Lista de SoftwareRecord (gravados no spool como listas)
+        hashes: Hash por seção
+        reconcile: Pedir a conferência do inventário de softwares no servidor
+    """
+    logger = logging.getLogger('LabAgent')
+    
+    if changed & {'hardware', 'rede'}:
+        eq_hashes = {'hardware': hashes['hardware'], 'rede': hashes['rede']}
+        pending = spool.get('equipamento')
+        if not pending or pending['payload']['hashes'] != eq_hashes:
+            spool.put('equipamento', {'data': equipamento_data, 'hashes': eq_hashes})
+    
+    if 'software' in changed:
+        if not sw_data:
+            logger.warning("Nenhum software encontrado para sincronizar")
+            return
+        pending = spool.get('software')
+        if (not pending or pending['payload']['hash'] != hashes['software']
+                or (reconcile and not pending['payload'].get('reconciliar'))):
+            payload = {'data': sw_data, 'hash': hashes['software']}
+            if reconcile:
+                payload['reconciliar'] = True
+            if spool.put('software', payload) is None:
+                logger.warning("Inventário de softwares excede o tamanho máximo do spool; não enfileirado")
 
 
 def main():
@@ -93,104 +153,288 @@ def main():
             logger.error("ID do laboratório deve ser um número!")
             sys.exit(1)
     
-    # Inicializar cliente API
+    # Inicializar cliente API (o pool precisa comportar os lotes enviados em paralelo)
+    max_paralelo = max(int(config.get('sync.max_paralelo', 1)), 1)
     try:
         client = LaravelAPIClient(
             config.get('api.url'),
-            config.get('api.key')
+            config.get('api.key'),
+            pool_size=max(config.get('api.pool_size', 4), max_paralelo),
+            connect_timeout=config.get('api.timeout_conexao', 10),
+            read_timeout=config.get('api.timeout_leitura', 60),
+            retry_policy=RetryPolicy(
+                max_attempts=config.get('api.tentativas', 3),
+                max_delay=config.get('api.backoff_max', 30),
+            ),
+            circuit_breaker=CircuitBreaker(
+                failure_threshold=config.get('api.circuito_falhas', 5),
+                cooldown=config.get('api.circuito_espera', 60),
+            ),
+            compression=config.get('api.compressao', 'auto'),
+            compress_min_bytes=config.get('api.compressao_min_bytes', 1024),
         )
         logger.info("Cliente API inicializado")
     except Exception as e:
         logger.error(f"Erro ao inicializar cliente API: {e}")
         sys.exit(1)
     
-    last_hash = None
+    # Estado persistente da última sincronização (fica ao lado do config.yaml)
+    state_dir = os.path.dirname(os.path.abspath(config.config_file))
+    state_file = os.path.join(state_dir, config.get('sync.arquivo_estado', 'sync_state.json'))
+    state = SyncState(state_file, AGENT_VERSION)
+    if state.get('equipamento_id'):
+        logger.info(f"Estado de sincronização carregado (equipamento ID {state.get('equipamento_id')})")
+    
+    # Cache local (nome, versao) -> ID do software no servidor
+    software_cache = None
+    if config.get('sync.cache_softwares', True):
+        software_cache = SoftwareIdCache(
+            os.path.join(state_dir, config.get('sync.arquivo_cache_softwares', 'software_cache.json')),
+            ttl_seconds=config.get('sync.cache_softwares_ttl_horas', 168) * 3600,
+        )
+    
+    # Tamanho de lote: parte do último valor aprendido (se houver)
+    batch_size = config.get('sync.batch_size', 25)
+    if config.get('sync.lote_adaptativo', True):
+        batch_sizer = AdaptiveBatchSizer(
+            initial_size=state.get('batch_size', batch_size),
+            min_size=config.get('sync.lote_min', 5),
+            max_size=config.get('sync.lote_max', 200),
+            max_bytes=config.get('sync.lote_max_kb', 512) * 1024,
+        )
+    else:
+        batch_sizer = AdaptiveBatchSizer.fixed(batch_size)
+    
+    synchronizer = InventorySynchronizer(
+        client,
+        state,
+        batch_sizer,
+        delta=config.get('sync.delta', True),
+        max_in_flight=max_paralelo,
+        software_cache=software_cache,
+        reconcile=config.get('sync.reconciliar', True),
+        bucket_count=config.get('sync.reconciliar_buckets', 64),
+    )
+    volatile_fields = config.get('sync.campos_volateis', [])
+    
+    # Spool persistente: snapshots pendentes sobrevivem a quedas do servidor e reinícios
+    spool = SyncSpool(
+        os.path.join(state_dir, config.get('spool.arquivo', 'sync_spool.jsonl')),
+        max_bytes=config.get('spool.max_mb', 10) * 1024 * 1024,
+    )
+    if spool.depth():
+        logger.info(f"Spool com {spool.depth()} seções pendentes de execução anterior")
+    drainer = SpoolDrainer(
+        spool,
+        synchronizer,
+        base_delay=config.get('spool.backoff_inicial', 5),
+        max_delay=config.get('spool.backoff_max', 600),
+    )
+    drainer.start()
+    
+    # Cadência de cada coletor (segundos); intervalo_segundos vale para rede e,
+    # sem o monitor do Registry, para softwares
     intervalo = config.get('coleta.intervalo_segundos', 300)
+    cadences = {'hardware': 86400, 'rede': intervalo, 'software': intervalo}
+    cadences.update(config.get('coleta.cadencias', {}) or {})
+    retry_delay = config.get('coleta.nova_tentativa_segundos', 60)
+    
+    # Validade dos dados estáticos de hardware/rede reaproveitados entre ciclos
+    collector_cache.configure(config.get('coleta.cache_ttl', {}))
+    
+    # Regras de softwares ignorados (updates, componentes do sistema...)
+    try:
+        software_filter = SoftwareFilter.from_config(config.get('filtros'))
+    except ValueError as e:
+        logger.error(f"❌ Filtros de software inválidos ({e}), usando as regras padrão")
+        software_filter = SoftwareFilter()
+    
+    # Coletores independentes: rodam em paralelo, o ciclo dura o tempo do mais lento
+    backend = get_backend()
+    pipeline = CollectorPipeline(
+        backend.collectors(software_filter),
+        parallel=config.get('coleta.paralela', True),
+        timeouts=config.get('coleta.prazos', {}),
+        default_timeout=config.get('coleta.prazo_segundos', 120),
+    )
     
-    logger.info(f"Agente iniciado. Intervalo de coleta: {intervalo}s")
+    # Agendador: cada coletor na sua cadência, ciclos sem deriva
+    scheduler = CadenceScheduler()
+    for name in pipeline.collectors:
+        scheduler.add(name, cadences.get(name, intervalo))
+    
+    # Conferência periódica do inventário no servidor (ex: após restauração de backup)
+    reconcile_hours = config.get('sync.reconciliar_horas', 24)
+    if synchronizer.reconcile and reconcile_hours:
+        scheduler.add('reconciliacao', reconcile_hours * 3600, run_now=False)
+    install_stop_handlers(scheduler)
+    
+    # Monitoramento do Registry: softwares só são relidos quando algo muda
+    watcher = None
+    if backend.watches_software and config.get('coleta.monitorar_softwares', True):
+        watch_backend = create_backend()
+        if watch_backend is not None:
+            watcher = SoftwareWatcher(
+                watch_backend,
+                on_change=lambda: scheduler.trigger('software'),
+                debounce=config.get('coleta.monitor_debounce_segundos', 10),
+                max_delay=config.get('coleta.monitor_espera_max_segundos', 60),
+            )
+            watcher.start()
+            scheduler.set_interval('software', None)
+            scheduler.trigger('software')
+            logger.info("👀 Monitorando alterações de softwares no Registry")
+        else:
+            logger.info("Monitoramento do Registry indisponível, usando varredura periódica")
+    
+    # Métricas: arquivo Prometheus (textfile collector) e endpoint local /metrics e /status
+    metrics.gauge_callback('spool_depth', spool.depth)
+    metrics_file = config.get('metricas.arquivo_prometheus')
+    if metrics_file and not os.path.isabs(metrics_file):
+        metrics_file = os.path.join(state_dir, metrics_file)
+    agent_status = {'versao': AGENT_VERSION, 'iniciado_em': datetime.now().isoformat(timespec='seconds')}
+    
+    def current_status():
+        last_sync = metrics.snapshot()['gauges'].get('last_sync_timestamp_seconds', {}).get('_')
+        return {
+            **agent_status,
+            'ultima_sincronizacao': datetime.fromtimestamp(last_sync).isoformat(timespec='seconds') if last_sync else None,
+            'fila_pendente': spool.depth(),
+            'backend': backend.name,
+        }
+    
+    status_server = None
+    status_port = config.get('metricas.porta', 9101)
+    if status_port:
+        status_server = StatusServer(metrics, status_port, status=current_status)
+        if status_server.start():
+            logger.info(f"📊 Métricas em http://127.0.0.1:{status_port}/metrics e /status")
+    
+    logger.info("Agente iniciado. Cadências: " + ", ".join(
+        f"{name} {'ao mudar' if scheduler.interval(name) is None else f'{scheduler.interval(name)}s'}"
+        for name in pipeline.collectors
+    ))
     print("\n" + "="*60)
     print(f"LabAgent v{AGENT_VERSION} está rodando...")
     print(f"Pressione Ctrl+C para parar")
     print("="*60 + "\n")
     
-    # Loop principal
-    while True:
-        try:
-            logger.info("=== Iniciando ciclo de coleta ===")
-            
-            # Coletar informações
-            logger.info("Coletando informações de hardware...")
-            hw_data = hardware.collect_hardware()
-            logger.debug(f"Hardware: {hw_data}")
-            
-            logger.info("Coletando informações de rede...")
-            net_data = network.collect_network()
-            logger.debug(f"Rede: {net_data}")
-            
-            logger.info("Coletando softwares instalados...")
-            sw_data = software.collect_software()
-            logger.info(f"Softwares encontrados: {len(sw_data)}")
-            
-            # Combinar dados do equipamento
-            equipamento_data = {
-                **hw_data,
-                **net_data,
-                'laboratorio_id': config.get('laboratorio.id'),
-                'dados_hash': '',  # Será preenchido
-            }
+    # Loop principal: cada ciclo executa apenas os coletores com execução pendente
+    latest = {}
+    try:
+        while scheduler.wait():
+            if watcher is not None and not watcher.active() and scheduler.interval('software') is None:
+                # Monitor parou: voltar à varredura periódica dos softwares
+                scheduler.set_interval('software', cadences.get('software', intervalo))
             
-            # Gerar hash dos dados
-            current_hash = generate_hash(equipamento_data)
-            equipamento_data['dados_hash'] = current_hash
+            names = scheduler.claim()
+            reconcile = 'reconciliacao' in names
+            if reconcile:
+                # A conferência usa a lista de softwares atual
+                names = [name for name in names if name != 'reconciliacao']
+                if 'software' not in names:
+                    names.append('software')
+            if not names:
+                continue
             
-            # Verificar se houve mudança
-            if current_hash != last_hash:
-                logger.info("🔄 Mudanças detectadas, sincronizando com servidor...")
+            try:
+                logger.info("=== Iniciando ciclo de coleta ===")
+                
+                # Coletar informações
+                logger.info(f"Coletando {', '.join(names)}...")
+                started = time.monotonic()
+                results = pipeline.run(names)
+                errors = []
+                for result in results.values():
+                    logger.info(f"Coletor {result.name}: {result.duration:.2f}s{' (desatualizado)' if result.stale else ''}")
+                    metrics.observe('collector_duration_seconds', result.duration, collector=result.name)
+                    if result.error is not None:
+                        # Nova tentativa antes da próxima cadência (ex: hardware, diário)
+                        metrics.inc('collector_errors_total', collector=result.name)
+                        scheduler.run_within(result.name, retry_delay)
+                        if not result.stale:
+                            errors.append(result.error)
+                            continue
+                        # Prazo estourado: o ciclo segue com o último valor válido
+                    latest[result.name] = result.data
+                logger.info(f"Coleta concluída em {time.monotonic() - started:.2f}s")
+                if errors:
+                    raise errors[0]
+                cache_stats = collector_cache.stats()
+                logger.debug(f"Cache de coleta: {cache_stats['hits']} acertos, {cache_stats['misses']} falhas")
+                
+                missing = set(pipeline.collectors) - latest.keys()
+                if missing:
+                    # Ainda sem a primeira coleta de algum coletor: nada a comparar
+                    logger.info(f"Aguardando a primeira coleta de {', '.join(sorted(missing))}")
+                    continue
+                
+                hw_data = latest['hardware']
+                logger.debug(f"Hardware: {hw_data}")
+                net_data = latest['rede']
+                logger.debug(f"Rede: {net_data}")
+                sw_data = latest['software']
+                logger.info(f"Softwares encontrados: {len(sw_data)}")
+                if 'software' in results:
+                    logger.debug(f"Softwares ignorados por regra: {software_filter.stats()}")
                 
-                # 1. Sincronizar equipamento
-                logger.info("Sincronizando equipamento...")
-                eq_response = client.sync_equipamento(equipamento_data)
-                equipamento_id = eq_response['equipamento_id']
-                action = eq_response['action']
-                logger.info(f"✅ Equipamento {action}: ID {equipamento_id}")
+                # Hash independente por seção (hardware, rede, software)
+                hw_section = {**hw_data, 'laboratorio_id': config.get('laboratorio.id')}
+                with metrics.timer('hash_duration_seconds'):
+                    hashes = section_hashes(hw_section, net_data, sw_data, volatile_fields)
                 
-                # 2. Sincronizar softwares
-                if sw_data:
-                    total_softwares = len(sw_data)
-                    batch_size = config.get('sync.batch_size', 25)
-                    logger.info(f"Sincronizando {total_softwares} softwares em lotes (tamanho: {batch_size})...")
-                    sw_response = client.sync_softwares(sw_data, batch_size=batch_size)
-                    software_ids = sw_response['software_ids']
-                    logger.info(f"✅ Softwares processados: {sw_response['total']} (erros: {sw_response.get('errors_count', 0)})")
-                    
-                    # 3. Sincronizar relacionamento
-                    logger.info("Sincronizando relacionamento equipamento-softwares...")
-                    client.sync_equipamento_softwares(equipamento_id, software_ids)
-                    logger.info("✅ Relacionamento sincronizado")
+                # Combinar dados do equipamento
+                equipamento_data = {
+                    **hw_section,
+                    **net_data,
+                    'dados_hash': equipamento_hash(hashes),
+                }
+                
+                # Enfileirar apenas as seções que mudaram; o envio é feito pelo drenador
+                changed = synchronizer.changed_sections(hashes)
+                if reconcile:
+                    logger.info("🌳 Conferindo o inventário de softwares no servidor")
+                    enqueue_changes(spool, {'software'}, equipamento_data, sw_data, hashes, reconcile=True)
+                    drainer.wake()
+                if changed:
+                    enqueue_changes(spool, changed, equipamento_data, sw_data, hashes)
+                    logger.info(f"🔄 Mudanças detectadas ({', '.join(sorted(changed))}), {spool.depth()} seções aguardando envio")
+                    drainer.wake()
+                    metrics.inc('cycles_total', result='changed')
                 else:
-                    logger.warning("Nenhum software encontrado para sincronizar")
+                    logger.info("✓ Nenhuma mudança detectada desde última sincronização")
+                    metrics.inc('cycles_total', result='unchanged')
                 
-                last_hash = current_hash
-                logger.info("🎉 Sincronização concluída com sucesso!")
-            else:
-                logger.info("✓ Nenhuma mudança detectada desde última sincronização")
+            except Exception as e:
+                logger.error(f"❌ Erro durante sincronização: {e}", exc_info=True)
+                logger.info("Tentando novamente no próximo ciclo...")
+                metrics.inc('cycles_total', result='error')
             
-        except KeyboardInterrupt:
-            logger.info("Encerrando agente por solicitação do usuário...")
-            print("\n\nAgente encerrado.")
-            break
+            finally:
+                if metrics_file:
+                    try:
+                        metrics.write_textfile(metrics_file)
+                    except OSError as e:
+                        logger.warning(f"⚠️ Não foi possível gravar as métricas em {metrics_file}: {e}")
             
-        except Exception as e:
-            logger.error(f"❌ Erro durante sincronização: {e}", exc_info=True)
-            logger.info("Tentando novamente no próximo ciclo...")
-        
-        # Aguardar intervalo configurado
-        logger.info(f"⏳ Aguardando {intervalo} segundos até próxima coleta...\n")
-        try:
-            time.sleep(intervalo)
-        except KeyboardInterrupt:
-            logger.info("Encerrando agente...")
-            break
+            remaining = scheduler.seconds_until_next()
+            if remaining is not None:
+                logger.info(f"⏳ Próxima coleta em {remaining:.0f} segundos\n")
+    
+    except KeyboardInterrupt:
+        # Segundo Ctrl+C durante o ciclo
+        pass
+    
+    logger.info("Encerrando agente...")
+    print("\n\nAgente encerrado.")
+    if watcher is not None:
+        watcher.stop()
+    if status_server is not None:
+        status_server.stop()
+    pipeline.close()
+    drainer.stop()
+    drainer.join(timeout=10)
+    client.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+"""
+Dimensionamento adaptativo dos lotes de softwares
+"""
+import json
+import threading
+import requests
+from utils.records import to_dict
+
+
+# Bytes do envelope {"softwares": [...]} além dos itens
+_ENVELOPE_BYTES = 16
+
+
+def is_shrinkable_error(error):
+    """
+    Verifica se o erro indica que o lote é grande demais para o servidor
+
+    Timeout, 413 (corpo grande demais) e 5xx costumam ser causados por lotes
+    pesados; repetir o mesmo lote tende a falhar de novo.
+
+    Args:
+        error: Exceção lançada pela requisição
+
+    Returns:
+        bool: True se vale a pena tentar novamente com um lote menor
+    """
+    if isinstance(error, requests.Timeout):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 413 or status >= 500
+    return False
+
+
+def item_size(item):
+    """
+    Tamanho aproximado de um item serializado no corpo da requisição
+
+    Args:
+        item: Software (SoftwareRecord ou dicionário)
+
+    Returns:
+        int: Tamanho em bytes (inclui o separador)
+    """
+    return len(json.dumps(to_dict(item))) + 1
+
+
+class AdaptiveBatchSizer:
+    """Ajusta o tamanho dos lotes conforme a latência e as falhas observadas"""
+
+    def __init__(self, initial_size=25, min_size=5, max_size=200, max_bytes=512 * 1024,
+                 fast_seconds=2.0, slow_seconds=10.0):
+        """
+        Inicializa o dimensionador
+
+        Args:
+            initial_size: Tamanho inicial (ex: o último aprendido)
+            min_size: Menor tamanho de lote
+            max_size: Maior tamanho de lote
+            max_bytes: Tamanho máximo do corpo serializado (None = sem limite)
+            fast_seconds: Respostas abaixo disso aumentam o lote
+            slow_seconds: Respostas acima disso reduzem o lote
+        """
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.max_bytes = max_bytes
+        self.fast_seconds = fast_seconds
+        self.slow_seconds = slow_seconds
+        self._size = self._clamp(initial_size)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fixed(cls, size):
+        """
+        Cria um dimensionador que nunca muda de tamanho (comportamento antigo)
+
+        Args:
+            size: Tamanho fixo dos lotes
+
+        Returns:
+            AdaptiveBatchSizer: Dimensionador fixo
+        """
+        return cls(initial_size=size, min_size=size, max_size=size, max_bytes=None)
+
+    @property
+    def size(self):
+        """Tamanho de lote atual"""
+        return self._size
+
+    def _clamp(self, size):
+        """
+        Limita o tamanho ao intervalo configurado
+
+        Args:
+            size: Tamanho desejado
+
+        Returns:
+            int: Tamanho dentro de [min_size, max_size]
+        """
+        return min(self.max_size, max(self.min_size, int(size)))
+
+    def next_batch(self, items, start):
+        """
+        Monta o próximo lote respeitando o tamanho atual e o limite de bytes
+
+        Args:
+            items: Lista completa de itens
+            start: Posição do primeiro item do lote
+
+        Returns:
+            list: Lote com pelo menos um item
+        """
+        end = min(len(items), start + self._size)
+        if self.max_bytes is None:
+            return items[start:end]
+
+        total = _ENVELOPE_BYTES
+        for index in range(start, end):
+            total += item_size(items[index])
+            if total > self.max_bytes and index > start:
+                return items[start:index]
+        return items[start:end]
+
+    def plan(self, items):
+        """
+        Divide todos os itens em lotes com o tamanho atual
+
+        Args:
+            items: Lista completa de itens
+
+        Returns:
+            list: Lista de lotes
+        """
+        batches = []
+        start = 0
+        while start < len(items):
+            batch = self.next_batch(items, start)
+            batches.append(batch)
+            start += len(batch)
+        return batches
+
+    def record_success(self, batch_len, duration):
+        """
+        Registra um lote aceito e ajusta o tamanho pela latência
+
+        Args:
+            batch_len: Quantidade de itens do lote
+            duration: Tempo de resposta em segundos
+        """
+        with self._lock:
+            if duration < self.fast_seconds and batch_len >= self._size:
+                self._size = self._clamp(self._size * 3 // 2 + 1)
+            elif duration > self.slow_seconds:
+                self._size = self._clamp(self._size * 3 // 4)
+
+    def record_failure(self):
+        """
+        Registra um lote rejeitado por tamanho/timeout e reduz o lote pela metade
+        """
+        with self._lock:
+            self._size = self._clamp(self._size // 2)
@@ -1,81 +1,309 @@
 """
 Cliente para comunicação com a API Laravel
 """
+import json
+import logging
+import threading
 import requests
 import time
+from concurrent.futures import CancelledError, FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from api.batching import AdaptiveBatchSizer, is_shrinkable_error
+from api.compression import RequestCompressor
+from api.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+from utils.metrics import metrics
+from utils.records import to_dict
+
+
+logger = logging.getLogger('LabAgent')
+
+
+class BaseMismatchError(Exception):
+    """O inventário base enviado no delta diverge do inventário do servidor"""
+
+    def __init__(self, server_hash=None):
+        super().__init__(f"Inventário base divergente (hash do servidor: {server_hash})")
+        self.server_hash = server_hash
+
+
+class EquipamentoNotFoundError(Exception):
+    """O equipamento_id enviado não existe mais no servidor (excluído ou banco restaurado)"""
+
+    def __init__(self, equipamento_id=None):
+        super().__init__(f"Equipamento ID {equipamento_id} não encontrado no servidor")
+        self.equipamento_id = equipamento_id
+
+
+class ConnectionStats:
+    """Contadores de conexões TCP abertas e requisições enviadas"""
+
+    def __init__(self):
+        """
+        Inicializa os contadores zerados
+        """
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.requests = 0
+
+    def connection_opened(self):
+        """
+        Registra a abertura de uma nova conexão
+        """
+        with self._lock:
+            self.opened += 1
+
+    def request_sent(self):
+        """
+        Registra o envio de uma requisição
+        """
+        with self._lock:
+            self.requests += 1
+
+    def as_dict(self):
+        """
+        Retorna um retrato dos contadores
+
+        Returns:
+            dict: Conexões abertas, reutilizadas e total de requisições
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'opened': self.opened,
+                'reused': max(self.requests - self.opened, 0),
+            }
+
+
+def _counting_pool(pool_class, stats):
+    """
+    Cria uma subclasse do pool do urllib3 que conta novas conexões
+
+    Args:
+        pool_class: HTTPConnectionPool ou HTTPSConnectionPool
+        stats: Instância de ConnectionStats
+
+    Returns:
+        type: Classe de pool instrumentada
+    """
+    class CountingPool(pool_class):
+        def _new_conn(self):
+            stats.connection_opened()
+            return super()._new_conn()
+
+    return CountingPool
+
+
+class _PooledAdapter(HTTPAdapter):
+    """Adapter HTTP com pool de conexões keep-alive instrumentado"""
+
+    def __init__(self, stats, **kwargs):
+        """
+        Inicializa o adapter
+
+        Args:
+            stats: Instância de ConnectionStats
+            **kwargs: Argumentos do HTTPAdapter (pool_maxsize, etc)
+        """
+        # Precisa existir antes do super().__init__, que chama init_poolmanager
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """
+        Cria o PoolManager usando os pools instrumentados
+        """
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self.stats),
+            'https': _counting_pool(HTTPSConnectionPool, self.stats),
+        }
 
 
 class LaravelAPIClient:
     """Cliente HTTP para comunicação com a API do Laravel"""
     
-    def __init__(self, base_url, api_key):
+    def __init__(self, base_url, api_key, pool_size=4, connect_timeout=10, read_timeout=60,
+                 retry_policy=None, circuit_breaker=None, compression='auto', compress_min_bytes=1024):
         """
         Inicializa o cliente da API
         
         Args:
             base_url: URL base da API (ex: http://localhost:8000/api/v1/agent)
             api_key: Chave de API para autenticação
+            pool_size: Máximo de conexões keep-alive mantidas abertas por host
+            connect_timeout: Timeout para estabelecer a conexão (segundos)
+            read_timeout: Timeout aguardando a resposta do servidor (segundos)
+            retry_policy: RetryPolicy com as regras de novas tentativas
+            circuit_breaker: CircuitBreaker compartilhado pelas requisições
+            compression: Compressão do corpo ('auto', 'gzip', 'zstd' ou 'nenhuma'),
+                usada só depois que o servidor anunciar suporte
+            compress_min_bytes: Corpos menores que isso vão sem compressão
         """
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
-        self.timeout = 60
-        self.max_retries = 3
+        self.timeout = (connect_timeout, read_timeout)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.stats = ConnectionStats()
+        self.compressor = RequestCompressor(compression, compress_min_bytes)
+        self.session = self._create_session(pool_size)
     
-    def _headers(self, hostname='unknown'):
+    def _create_session(self, pool_size):
         """
-        Gera headers HTTP para as requisições
+        Cria a sessão HTTP com pool de conexões e headers fixos
         
         Args:
-            hostname: Nome do computador
+            pool_size: Tamanho do pool de conexões
         
         Returns:
-            dict: Headers HTTP
+            requests.Session: Sessão configurada
         """
-        return {
+        session = requests.Session()
+        adapter = _PooledAdapter(self.stats, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
             'X-Agent-API-Key': self.api_key,
             'Content-Type': 'application/json',
+            'Accept': 'application/json',
             'User-Agent': 'LabAgent/1.0',
-        }
+            'Connection': 'keep-alive',
+        })
+        return session
+    
+    def close(self):
+        """
+        Fecha a sessão HTTP e todas as conexões do pool
+        """
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
-    def _request(self, method, endpoint, data=None, hostname='unknown'):
+    def connection_stats(self):
+        """
+        Estatísticas de reutilização de conexões
+        
+        Returns:
+            dict: requests, opened (conexões abertas) e reused (reutilizadas)
+        """
+        return self.stats.as_dict()
+    
+    def _request(self, method, endpoint, data=None, hostname='unknown', max_retries=None, giveup=None):
         """
         Faz requisição HTTP com retry automático
         
+        Erros de rede, timeouts, 408/425/429 e 5xx são repetidos conforme a
+        RetryPolicy (backoff com jitter, respeitando Retry-After em 429/503);
+        os demais 4xx falham de imediato. Com o circuito aberto a requisição
+        nem é enviada. Corpos grandes vão comprimidos quando o servidor
+        anunciou suporte; um 415 desativa a codificação recusada e a mesma
+        requisição é reenviada sem ela, sem gastar uma tentativa.
+        
         Args:
             method: Método HTTP (GET, POST, etc)
             endpoint: Endpoint da API (ex: sync-equipamento)
             data: Dados para enviar
             hostname: Nome do computador
+            max_retries: Número de tentativas (padrão: retry_policy.max_attempts)
+            giveup: Função que recebe o erro e indica se ele deve ser lançado
+                sem novas tentativas (ex: lote que será dividido)
         
         Returns:
             dict: Resposta JSON da API
         
         Raises:
             requests.RequestException: Se todas as tentativas falharem
+            CircuitOpenError: Se o circuit breaker estiver aberto
+            BaseMismatchError: Se o servidor responder 409 (base do delta divergente)
+            EquipamentoNotFoundError: Se o servidor não conhecer o equipamento_id enviado
         """
         url = f"{self.base_url}/{endpoint}"
+        max_retries = max_retries or self.retry_policy.max_attempts
+        body = json.dumps(data).encode('utf-8') if data is not None else None
         
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.request(
-                    method,
-                    url,
-                    json=data,
-                    headers=self._headers(hostname),
-                    timeout=self.timeout
+        for attempt in range(max_retries):
+            if not self.circuit_breaker.allow():
+                metrics.inc('http_circuit_open_total', endpoint=endpoint)
+                raise CircuitOpenError(
+                    f"Servidor indisponível, circuito aberto por mais {self.circuit_breaker.remaining():.0f}s"
                 )
+            
+            started = time.monotonic()
+            status = 'error'
+            try:
+                response = self._send(method, url, endpoint, body)
+                status = response.status_code
+                if response.status_code == 409:
+                    # Conflito não se resolve repetindo a mesma requisição
+                    self.circuit_breaker.record_success()
+                    raise BaseMismatchError(_json_or_empty(response).get('base_hash'))
+                if data and data.get('equipamento_id') and _equipamento_missing(response):
+                    # Repetir não adianta: o equipamento precisa ser registrado de novo
+                    self.circuit_breaker.record_success()
+                    raise EquipamentoNotFoundError(data['equipamento_id'])
                 response.raise_for_status()
+                self.circuit_breaker.record_success()
                 return response.json()
                 
             except requests.RequestException as e:
-                if attempt == self.max_retries - 1:
-                    # Última tentativa falhou, propagar erro
+                if self.retry_policy.is_server_failure(e):
+                    self.circuit_breaker.record_failure()
+                else:
+                    # Servidor respondeu: está no ar, mesmo que com erro
+                    self.circuit_breaker.record_success()
+                
+                if (attempt == max_retries - 1 or not self.retry_policy.is_retryable(e)
+                        or (giveup is not None and giveup(e))):
                     raise
                 
-                # Aguardar antes de tentar novamente (exponential backoff)
-                wait_time = 2 ** attempt
-                print(f"Tentativa {attempt + 1} falhou, aguardando {wait_time}s...")
-                time.sleep(wait_time)
+                wait_time = self.retry_policy.delay(attempt, e)
+                logger.warning(f"Tentativa {attempt + 1}/{max_retries} em {endpoint} falhou ({e}), aguardando {wait_time:.1f}s...")
+            
+            finally:
+                # Erro fora de RequestException não pode prender o teste do circuito
+                self.circuit_breaker.release_probe()
+                metrics.inc('http_requests_total', endpoint=endpoint, status=status)
+                metrics.observe('http_request_duration_seconds', time.monotonic() - started, endpoint=endpoint)
+            
+            # Só chega aqui quando a requisição será repetida
+            metrics.inc('http_retries_total', endpoint=endpoint)
+            time.sleep(wait_time)
+    
+    def _send(self, method, url, endpoint, body):
+        """
+        Envia o corpo, comprimido se negociado, e renegocia se o servidor recusar
+        
+        Args:
+            method: Método HTTP
+            url: URL completa
+            endpoint: Endpoint da API (para logs e métricas)
+            body: Corpo JSON já serializado (ou None)
+        
+        Returns:
+            requests.Response: Resposta do servidor
+        """
+        while True:
+            payload, encoding = self.compressor.encode(body)
+            headers = {'Content-Encoding': encoding} if encoding else None
+            self.stats.request_sent()
+            metrics.inc('http_request_bytes_total', len(payload or b''), endpoint=endpoint)
+            metrics.inc('http_request_uncompressed_bytes_total', len(body or b''), endpoint=endpoint)
+            response = self.session.request(method, url, data=payload, headers=headers, timeout=self.timeout)
+            self.compressor.observe(response)
+            if encoding is None:
+                return response
+            if response.status_code != 415:
+                logger.info(f"📦 {endpoint}: {len(body)} → {len(payload)} bytes ({encoding})")
+                return response
+            # Servidor (ou proxy) não aceita a codificação: reenviar sem ela
+            self.compressor.reject(encoding)
+            metrics.inc('http_compression_rejected_total', endpoint=endpoint, encoding=encoding)
+            logger.warning(f"⚠️ Servidor recusou Content-Encoding {encoding} em {endpoint}; reenviando sem essa compressão")
     
     def sync_equipamento(self, data):
         """
@@ -89,40 +317,207 @@ class LaravelAPIClient:
         """
         return self._request('POST', 'sync-equipamento', data, data.get('hostname'))
     
-    def sync_softwares(self, softwares, batch_size=25):
+    def sync_softwares(self, softwares, batch_size=25, max_in_flight=1, batch_sizer=None):
         """
         Sincroniza lista de softwares em lotes
         
         Args:
-            softwares: Lista de dicionários com dados dos softwares
-            batch_size: Tamanho de cada lote (padrão: 25)
+            softwares: Lista de softwares (SoftwareRecord ou dicionários)
+            batch_size: Tamanho de cada lote (padrão: 25), usado sem batch_sizer
+            max_in_flight: Máximo de lotes enviados simultaneamente (1 = sequencial)
+            batch_sizer: AdaptiveBatchSizer que ajusta o tamanho dos lotes; lotes
+                recusados por timeout/413/5xx são divididos e reenviados
         
         Returns:
-            dict: Resposta agregada com software_ids e total
+            dict: Resposta agregada com software_ids, total, errors_count e
+                resolved (lista de pares (software, software_id) identificados)
+        
+        Raises:
+            requests.RequestException: Se algum lote falhar; os lotes ainda
+                não enviados são cancelados
         """
         if not softwares:
-            return {'software_ids': [], 'total': 0, 'errors_count': 0}
+            return {'software_ids': [], 'total': 0, 'errors_count': 0, 'resolved': []}
+        
+        if batch_sizer is None:
+            batch_sizer = AdaptiveBatchSizer.fixed(batch_size)
+        
+        batches = batch_sizer.plan(softwares) if max_in_flight > 1 else []
+        
+        if len(batches) > 1:
+            responses = self._send_batches_concurrently(batches, max_in_flight, batch_sizer)
+        else:
+            # Sequencial: cada lote usa o tamanho aprendido com os anteriores
+            responses = []
+            start = 0
+            batch_num = 0
+            while start < len(softwares):
+                batch = batch_sizer.next_batch(softwares, start)
+                batch_num += 1
+                logger.info(f"Processando lote {batch_num} ({len(batch)} softwares, {start + len(batch)}/{len(softwares)})...")
+                responses.extend(self._send_software_batch(batch, batch_sizer))
+                start += len(batch)
         
-        total_batches = (len(softwares) + batch_size - 1) // batch_size
+        # Respostas na ordem dos lotes para manter software_ids alinhado ao inventário
         all_software_ids = []
         total_errors = 0
-        
-        for i in range(0, len(softwares), batch_size):
-            batch = softwares[i:i + batch_size]
-            batch_num = (i // batch_size) + 1
-            
-            print(f"Processando lote {batch_num}/{total_batches} ({len(batch)} softwares)...")
-            
-            response = self._request('POST', 'sync-softwares', {'softwares': batch})
+        resolved = []
+        for batch, response in responses:
             all_software_ids.extend(response.get('software_ids', []))
             total_errors += response.get('errors_count', 0)
+            resolved.extend(match_software_ids(batch, response))
         
         return {
             'software_ids': all_software_ids,
             'total': len(all_software_ids),
-            'errors_count': total_errors
+            'errors_count': total_errors,
+            'resolved': resolved,
         }
     
+    def _send_software_batch(self, batch, batch_sizer):
+        """
+        Envia um lote, dividindo-o ao meio se o servidor não suportar o tamanho
+        
+        Args:
+            batch: Lista de softwares
+            batch_sizer: AdaptiveBatchSizer que recebe a latência/falhas observadas
+        
+        Returns:
+            list: Pares (sub-lote, resposta da API), na ordem dos itens do lote
+        """
+        splittable = len(batch) > batch_sizer.min_size
+        started = time.monotonic()
+        try:
+            # Lote divisível: erros de lote pesado (timeout/413/5xx) dividem o lote
+            # em vez de repetir o mesmo envio; quedas de conexão e 429 seguem a RetryPolicy
+            response = self._request(
+                'POST', 'sync-softwares', {'softwares': [to_dict(s) for s in batch]},
+                giveup=is_shrinkable_error if splittable else None
+            )
+        except requests.RequestException as e:
+            if not (splittable and is_shrinkable_error(e)):
+                raise
+            batch_sizer.record_failure()
+            metrics.inc('software_batches_total', result='split')
+            metrics.set('software_batch_size', batch_sizer.size)
+            half = len(batch) // 2
+            logger.warning(f"Lote de {len(batch)} softwares recusado ({e}); reenviando em lotes de {half}...")
+            return (
+                self._send_software_batch(batch[:half], batch_sizer)
+                + self._send_software_batch(batch[half:], batch_sizer)
+            )
+        
+        batch_sizer.record_success(len(batch), time.monotonic() - started)
+        metrics.inc('software_batches_total', result='ok')
+        metrics.set('software_batch_size', batch_sizer.size)
+        return [(batch, response)]
+    
+    def _send_batches_concurrently(self, batches, max_in_flight, batch_sizer):
+        """
+        Envia lotes em paralelo com número limitado de requisições simultâneas
+        
+        Args:
+            batches: Lista de lotes (listas de softwares)
+            max_in_flight: Máximo de requisições simultâneas
+            batch_sizer: AdaptiveBatchSizer compartilhado pelos lotes
+        
+        Returns:
+            list: Pares (lote, resposta da API) na mesma ordem dos lotes
+        
+        Raises:
+            requests.RequestException: Erro do primeiro lote que falhar
+        """
+        total_batches = len(batches)
+        cancelled = threading.Event()
+        
+        def send(batch_num, batch):
+            if cancelled.is_set():
+                raise CancelledError()
+            logger.info(f"Processando lote {batch_num}/{total_batches} ({len(batch)} softwares)...")
+            return self._send_software_batch(batch, batch_sizer)
+        
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='sync-softwares') as executor:
+            futures = [
+                executor.submit(send, batch_num, batch)
+                for batch_num, batch in enumerate(batches, start=1)
+            ]
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            
+            failed = next((f for f in futures if f in done and f.exception() is not None), None)
+            if failed is not None:
+                # Erro fatal: cancelar lotes que ainda não começaram
+                cancelled.set()
+                for future in pending:
+                    future.cancel()
+                raise failed.exception()
+            
+            return [pair for future in futures for pair in future.result()]
+    
+    def sync_softwares_delta(self, equipamento_id, base_hash, added, removed):
+        """
+        Sincroniza apenas os softwares adicionados e removidos
+
+        Args:
+            equipamento_id: ID do equipamento
+            base_hash: Hash do último inventário confirmado pelo servidor
+            added: Lista de softwares instalados (SoftwareRecord ou dicionários)
+            removed: Lista de chaves (nome, versao) dos softwares removidos
+
+        Returns:
+            dict: Resposta da API com added_ids, removed_ids e hash
+
+        Raises:
+            BaseMismatchError: Se o inventário do servidor não corresponder à base
+        """
+        return self._request('POST', 'sync-softwares-delta', {
+            'equipamento_id': equipamento_id,
+            'base_hash': base_hash,
+            'added': [to_dict(s) for s in added],
+            'removed': [{'nome': nome, 'versao': versao} for nome, versao in removed],
+        })
+    
+    def reconcile_softwares(self, equipamento_id, tree):
+        """
+        Compara a árvore do inventário local com a do servidor
+
+        Args:
+            equipamento_id: ID do equipamento
+            tree: InventoryTree do inventário local
+
+        Returns:
+            dict: 'match' (raízes iguais) e 'buckets' (índices dos buckets divergentes)
+        """
+        return self._request('POST', 'reconcile-softwares', {
+            'equipamento_id': equipamento_id,
+            'bucket_count': tree.bucket_count,
+            'root': tree.root,
+            'buckets': tree.bucket_hashes,
+        })
+
+    def sync_software_buckets(self, equipamento_id, bucket_count, buckets):
+        """
+        Substitui no servidor o conteúdo de alguns buckets do inventário
+
+        Args:
+            equipamento_id: ID do equipamento
+            bucket_count: Quantidade de buckets da árvore
+            buckets: Dicionário índice do bucket -> lista de softwares do bucket
+                (SoftwareRecord ou dicionários; lista vazia esvazia o bucket)
+
+        Returns:
+            dict: Resposta da API com software_ids (na ordem dos softwares
+                enviados, bucket a bucket em ordem crescente), errors,
+                removed_ids e root (nova raiz do servidor)
+        """
+        return self._request('POST', 'sync-software-buckets', {
+            'equipamento_id': equipamento_id,
+            'bucket_count': bucket_count,
+            'buckets': {
+                str(index): [to_dict(s) for s in buckets[index]]
+                for index in sorted(buckets)
+            },
+        })
+
     def sync_equipamento_softwares(self, equipamento_id, software_ids):
         """
         Sincroniza relacionamento equipamento-softwares
@@ -139,3 +534,87 @@ class LaravelAPIClient:
             'software_ids': software_ids,
         })
 
+
+def match_software_ids(batch, response):
+    """
+    Associa cada software enviado ao ID retornado pelo servidor
+
+    O servidor devolve os IDs na ordem dos itens, omitindo os que falharam
+    (listados em 'errors' pelo índice). Se a contagem não bater, nenhum par
+    é retornado para não associar IDs errados.
+
+    Args:
+        batch: Lista de softwares enviada
+        response: Resposta de sync-softwares
+
+    Returns:
+        list: Pares (software, software_id)
+    """
+    failed = {error.get('index') for error in response.get('errors', []) if isinstance(error, dict)}
+    accepted = [software for index, software in enumerate(batch) if index not in failed]
+    software_ids = response.get('software_ids', [])
+    if len(accepted) != len(software_ids):
+        return []
+    return list(zip(accepted, software_ids))
+
+
+def invalid_software_ids(error, software_ids):
+    """
+    Extrai os IDs recusados pela validação de sync-equipamento-softwares
+
+    Args:
+        error: requests.HTTPError com resposta 422
+        software_ids: Lista de IDs enviada
+
+    Returns:
+        list: IDs desconhecidos pelo servidor (vazio se o erro for outro)
+    """
+    if error.response is None or error.response.status_code != 422:
+        return []
+    invalid = []
+    for field in _json_or_empty(error.response).get('errors', {}):
+        # Laravel identifica o item pelo índice: "software_ids.12"
+        prefix, _, index = field.partition('.')
+        if prefix == 'software_ids' and index.isdigit() and int(index) < len(software_ids):
+            invalid.append(software_ids[int(index)])
+    return invalid
+
+
+def _equipamento_missing(response):
+    """
+    Indica se o servidor recusou o equipamento_id enviado
+
+    A validação (exists:equipamentos,id) responde 422; um equipamento na
+    lixeira passa pela validação e o findOrFail responde 404, ou 500 nos
+    endpoints que capturam qualquer erro.
+
+    Args:
+        response: Resposta HTTP
+
+    Returns:
+        bool: True se o equipamento não existe mais no servidor
+    """
+    if response.status_code == 422:
+        return 'equipamento_id' in _json_or_empty(response).get('errors', {})
+    if response.status_code in (404, 500):
+        body = _json_or_empty(response)
+        # Mensagem do ModelNotFoundException: "No query results for model [App\Models\Equipamento] 5"
+        return 'Models\\Equipamento]' in f"{body.get('message', '')} {body.get('error', '')}"
+    return False
+
+
+def _json_or_empty(response):
+    """
+    Decodifica o corpo JSON de uma resposta, tolerando corpo inválido
+
+    Args:
+        response: Resposta HTTP
+
+    Returns:
+        dict: Corpo decodificado ou dicionário vazio
+    """
+    try:
+        data = response.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
@@ -0,0 +1,206 @@
+"""
+Compressão do corpo das requisições (Content-Encoding) negociada com o servidor
+"""
+import gzip
+import io
+import threading
+
+try:
+    import zstandard
+    _ZSTD_ERRORS = (zstandard.ZstdError,)
+except ImportError:  # zstd é opcional: sem o pacote, apenas gzip
+    zstandard = None
+    _ZSTD_ERRORS = ()
+
+
+# Ordem de preferência quando ambos os lados suportam mais de uma codificação
+PREFERENCE = ('zstd', 'gzip')
+
+# Limite do corpo descomprimido aceito pelo servidor local (proteção contra "zip bomb")
+MAX_DECOMPRESSED_BYTES = 64 * 1024 * 1024
+
+
+class BodyTooLargeError(ValueError):
+    """Corpo que excede o tamanho máximo depois de descomprimido (HTTP 413)"""
+
+
+def available_encodings():
+    """
+    Codificações que este computador consegue produzir
+
+    Returns:
+        tuple: Codificações disponíveis, na ordem de preferência
+    """
+    return tuple(e for e in PREFERENCE if e != 'zstd' or zstandard is not None)
+
+
+def compress(body, encoding):
+    """
+    Comprime o corpo de uma requisição
+
+    Args:
+        body: Bytes do corpo
+        encoding: 'gzip' ou 'zstd'
+
+    Returns:
+        bytes: Corpo comprimido
+    """
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    # Nível 6: quase a taxa do 9 em listas de softwares, com bem menos CPU
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def decompress(body, encoding, max_size=MAX_DECOMPRESSED_BYTES):
+    """
+    Descomprime um corpo recebido (usado pelo servidor local de testes)
+
+    Args:
+        body: Bytes comprimidos
+        encoding: Valor do header Content-Encoding
+        max_size: Tamanho máximo aceito após descomprimir
+
+    Returns:
+        bytes: Corpo original
+
+    Raises:
+        BodyTooLargeError: Se o corpo descomprimido exceder max_size
+        ValueError: Se a codificação não for suportada ou o corpo for inválido
+    """
+    encoding = (encoding or '').strip().lower()
+    if encoding in ('', 'identity'):
+        return body
+    if encoding not in PREFERENCE or (encoding == 'zstd' and zstandard is None):
+        raise ValueError(f"Content-Encoding não suportado: {encoding}")
+    try:
+        # Leitura em fluxo limitada a max_size + 1 bytes: um corpo que expande
+        # demais ("zip bomb") não chega a ser descomprimido inteiro na memória
+        if encoding == 'gzip':
+            with gzip.GzipFile(fileobj=io.BytesIO(body)) as stream:
+                data = stream.read(max_size + 1)
+        else:
+            with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body)) as stream:
+                data = stream.read(max_size + 1)
+    except (OSError, EOFError, *_ZSTD_ERRORS) as e:
+        raise ValueError(f"Corpo {encoding} inválido: {e}") from e
+    if len(data) > max_size:
+        raise BodyTooLargeError(f"Corpo descomprimido excede {max_size} bytes")
+    return data
+
+
+def parse_accept_encoding(value):
+    """
+    Interpreta o header Accept-Encoding anunciado pelo servidor (RFC 7694)
+
+    Args:
+        value: Valor do header (ex: "gzip, zstd;q=0.5")
+
+    Returns:
+        set: Codificações aceitas (q=0 é tratado como recusa)
+    """
+    accepted = set()
+    for item in (value or '').split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = params.strip()
+        if q.startswith('q=') and q[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        accepted.add(name)
+    return accepted
+
+
+def resolve_setting(setting):
+    """
+    Converte a opção api.compressao nas codificações permitidas
+
+    Args:
+        setting: 'auto', 'gzip', 'zstd', 'nenhuma' (ou None/False)
+
+    Returns:
+        tuple: Codificações permitidas, na ordem de preferência
+    """
+    if setting in (None, False) or str(setting).lower() in ('nenhuma', 'none', 'off', 'false', ''):
+        return ()
+    setting = str(setting).lower()
+    if setting == 'auto':
+        return available_encodings()
+    if setting == 'zstd' and zstandard is None:
+        # Pacote zstandard ausente: gzip ainda reduz bem o tráfego
+        return ('gzip',)
+    return (setting,) if setting in PREFERENCE else ()
+
+
+class RequestCompressor:
+    """Escolhe a codificação do corpo conforme o que o servidor anunciou"""
+
+    def __init__(self, setting='auto', min_bytes=1024):
+        """
+        Inicializa o compressor
+
+        Nada é comprimido até o servidor anunciar, no header Accept-Encoding de
+        alguma resposta, que aceita a codificação: um servidor sem suporte
+        leria o corpo comprimido como JSON inválido.
+
+        Args:
+            setting: Valor de api.compressao ('auto', 'gzip', 'zstd' ou 'nenhuma')
+            min_bytes: Corpos menores que isso são enviados sem compressão
+        """
+        self.allowed = resolve_setting(setting)
+        self.min_bytes = min_bytes
+        self._lock = threading.Lock()
+        self._server_encodings = set()
+        self._rejected = set()
+
+    def observe(self, response):
+        """
+        Registra as codificações anunciadas em uma resposta do servidor
+
+        Args:
+            response: Resposta HTTP
+        """
+        advertised = response.headers.get('Accept-Encoding')
+        if advertised is None or not self.allowed:
+            return
+        with self._lock:
+            self._server_encodings = parse_accept_encoding(advertised) - self._rejected
+
+    def reject(self, encoding):
+        """
+        Deixa de usar uma codificação recusada pelo servidor (415)
+
+        Args:
+            encoding: Codificação recusada
+        """
+        with self._lock:
+            self._rejected.add(encoding)
+            self._server_encodings.discard(encoding)
+
+    def encoding(self):
+        """
+        Codificação a usar no momento
+
+        Returns:
+            str: 'zstd', 'gzip' ou None (sem compressão)
+        """
+        with self._lock:
+            return next((e for e in self.allowed if e in self._server_encodings), None)
+
+    def encode(self, body):
+        """
+        Comprime o corpo se houver codificação negociada e ele for grande o bastante
+
+        Args:
+            body: Bytes do corpo (ou None)
+
+        Returns:
+            tuple: (corpo a enviar, codificação usada ou None)
+        """
+        if not body or len(body) < self.min_bytes:
+            return body, None
+        encoding = self.encoding()
+        if encoding is None:
+            return body, None
+        return compress(body, encoding), encoding
+
@@ -0,0 +1,235 @@
+"""
+Política de novas tentativas e circuit breaker para as requisições à API
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+
+
+class CircuitOpenError(requests.RequestException):
+    """Circuito aberto: o servidor falhou seguidamente e está em período de espera"""
+
+
+def full_jitter_delay(attempt, base_delay, max_delay):
+    """
+    Espera exponencial com "full jitter": sorteio entre 0 e base * 2^tentativa
+
+    Args:
+        attempt: Número da tentativa (0 = primeira nova tentativa)
+        base_delay: Espera base em segundos
+        max_delay: Espera máxima em segundos
+
+    Returns:
+        float: Segundos de espera
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def parse_retry_after(value, now=None):
+    """
+    Interpreta o header Retry-After (segundos ou data HTTP)
+
+    Args:
+        value: Valor do header
+        now: Data atual (para testes)
+
+    Returns:
+        float: Segundos de espera ou None se inválido
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+def _status_code(error):
+    """
+    Obtém o status HTTP associado a um erro, se houver
+
+    Args:
+        error: Exceção da requisição
+
+    Returns:
+        int: Status HTTP ou None
+    """
+    response = getattr(error, 'response', None)
+    return response.status_code if response is not None else None
+
+
+class RetryPolicy:
+    """Decide se e quanto esperar antes de repetir uma requisição"""
+
+    # 4xx que valem nova tentativa; os demais (400, 401, 404, 422...) não mudam repetindo
+    RETRYABLE_4XX = (408, 425, 429)
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=30.0, max_retry_after=120.0):
+        """
+        Inicializa a política
+
+        Args:
+            max_attempts: Número total de tentativas por requisição
+            base_delay: Espera base do backoff exponencial (segundos)
+            max_delay: Espera máxima do backoff (segundos)
+            max_retry_after: Maior Retry-After aceito do servidor (segundos)
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def is_retryable(self, error):
+        """
+        Verifica se o erro pode ser resolvido com uma nova tentativa
+
+        Args:
+            error: Exceção da requisição
+
+        Returns:
+            bool: True para falhas de rede, timeouts, 408/425/429 e 5xx
+        """
+        if isinstance(error, CircuitOpenError):
+            return False
+        status = _status_code(error)
+        if status is None:
+            return isinstance(error, (requests.ConnectionError, requests.Timeout))
+        return status in self.RETRYABLE_4XX or status >= 500
+
+    def is_server_failure(self, error):
+        """
+        Verifica se o erro indica servidor indisponível (conta para o circuit breaker)
+
+        Args:
+            error: Exceção da requisição
+
+        Returns:
+            bool: True para falhas de rede, timeouts e 5xx
+        """
+        status = _status_code(error)
+        if status is None:
+            return isinstance(error, (requests.ConnectionError, requests.Timeout))
+        return status >= 500
+
+    def delay(self, attempt, error):
+        """
+        Calcula a espera antes da próxima tentativa
+
+        Em 429/503 o header Retry-After do servidor tem prioridade.
+
+        Args:
+            attempt: Número da tentativa que falhou (0 = primeira)
+            error: Exceção da requisição
+
+        Returns:
+            float: Segundos de espera
+        """
+        if _status_code(error) in (429, 503):
+            retry_after = parse_retry_after(error.response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(retry_after, self.max_retry_after)
+        return full_jitter_delay(attempt, self.base_delay, self.max_delay)
+
+
+class CircuitBreaker:
+    """
+    Interrompe as chamadas após falhas consecutivas do servidor
+
+    Fechado: requisições normais. Aberto: requisições recusadas de imediato
+    durante o período de espera. Meio-aberto: após a espera, uma única
+    requisição de teste decide se o circuito fecha ou abre de novo. Um teste
+    sem resultado registrado expira depois de outro período de espera.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, cooldown=60.0):
+        """
+        Inicializa o circuit breaker
+
+        Args:
+            failure_threshold: Falhas consecutivas para abrir o circuito
+            cooldown: Segundos com o circuito aberto antes de testar de novo
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Verifica se uma requisição pode ser feita agora
+
+        Returns:
+            bool: False enquanto o circuito estiver aberto
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if ((self.state == self.OPEN and now - self.opened_at >= self.cooldown)
+                    or (self.state == self.HALF_OPEN and now - self.probe_started >= self.cooldown)):
+                # Deixa passar uma requisição de teste
+                self.state = self.HALF_OPEN
+                self.probe_started = now
+                return True
+            return False
+
+    def remaining(self):
+        """
+        Tempo restante do período de espera
+
+        Returns:
+            float: Segundos até o circuito aceitar uma requisição de teste
+        """
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        """
+        Registra uma resposta do servidor e fecha o circuito
+        """
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        """
+        Registra uma falha do servidor, abrindo o circuito se necessário
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """
+        Libera a requisição de teste que terminou sem resultado registrado
+
+        O circuito volta a aberto com o período de espera já cumprido, para
+        que a próxima requisição seja o novo teste.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic() - self.cooldown
@@ -0,0 +1,76 @@
+"""
+Seleção dos coletores de acordo com o sistema operacional
+"""
+import functools
+import sys
+
+
+class CollectorBackend:
+    """Coletores de hardware, rede e software de uma plataforma"""
+
+    name = None
+
+    # Suporta aviso de alterações de softwares (collectors.registry_watch)
+    watches_software = False
+
+    def collectors(self, software_filter=None):
+        """
+        Funções de coleta usadas pelo CollectorPipeline
+
+        Args:
+            software_filter: SoftwareFilter aplicado à lista de softwares
+
+        Returns:
+            dict: 'hardware', 'rede' e 'software' -> função sem argumentos
+        """
+        raise NotImplementedError
+
+
+class WindowsBackend(CollectorBackend):
+    """WMI e Registry"""
+
+    name = 'windows'
+    watches_software = True
+
+    def collectors(self, software_filter=None):
+        from collectors import hardware, network, software
+        return {
+            'hardware': hardware.collect_hardware,
+            'rede': network.collect_network,
+            'software': functools.partial(software.collect_software, software_filter=software_filter),
+        }
+
+
+class LinuxBackend(CollectorBackend):
+    """DMI (/sys), /proc e bancos de pacotes dpkg/rpm"""
+
+    name = 'linux'
+
+    def collectors(self, software_filter=None):
+        from collectors import linux
+        return {
+            'hardware': linux.collect_hardware,
+            'rede': linux.collect_network,
+            'software': functools.partial(linux.collect_software, software_filter=software_filter),
+        }
+
+
+def get_backend(platform_name=None):
+    """
+    Obtém os coletores da plataforma atual
+
+    Args:
+        platform_name: Valor de sys.platform (para testes)
+
+    Returns:
+        CollectorBackend: Backend da plataforma
+
+    Raises:
+        RuntimeError: Plataforma não suportada
+    """
+    platform_name = platform_name or sys.platform
+    if platform_name == 'win32':
+        return WindowsBackend()
+    if platform_name.startswith('linux'):
+        return LinuxBackend()
+    raise RuntimeError(f"Plataforma não suportada: {platform_name}")
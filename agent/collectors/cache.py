@@ -0,0 +1,101 @@
+"""
+Cache com validade por campo para os dados coletados
+"""
+import threading
+import time
+
+
+# Validade padrão por chave em segundos (None = enquanto o agente estiver rodando)
+DEFAULT_TTLS = {
+    'sistema': None,      # fabricante, modelo e número de série
+    'processador': None,
+    'disco': 3600,
+    'gateway': 60,
+}
+
+
+class TTLCache:
+    """Cache em memória em que cada chave tem a sua validade"""
+
+    def __init__(self, ttls=None):
+        """
+        Inicializa o cache
+
+        Args:
+            ttls: Validade por chave em segundos (None = não expira); chaves
+                ausentes não são cacheadas
+        """
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def configure(self, ttls):
+        """
+        Sobrescreve a validade de algumas chaves
+
+        Args:
+            ttls: Validade por chave em segundos (0 desativa o cache da chave)
+        """
+        with self._lock:
+            self.ttls.update(ttls or {})
+            self._entries.clear()
+
+    def get(self, key, loader):
+        """
+        Obtém o valor da chave, chamando loader() se ausente ou expirado
+
+        Erros do loader não são cacheados.
+
+        Args:
+            key: Nome da chave
+            loader: Função que lê o valor atual
+
+        Returns:
+            Valor cacheado ou recém-lido
+        """
+        if key not in self.ttls or self.ttls[key] == 0:
+            return loader()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or time.monotonic() < expires_at:
+                    self.hits += 1
+                    return value
+            self.misses += 1
+
+        value = loader()
+        ttl = self.ttls[key]
+        with self._lock:
+            self._entries[key] = (value, None if ttl is None else time.monotonic() + ttl)
+        return value
+
+    def invalidate(self, key=None):
+        """
+        Descarta uma chave (ou todas)
+
+        Args:
+            key: Nome da chave, ou None para limpar o cache
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """
+        Contadores de acertos e falhas
+
+        Returns:
+            dict: hits, misses e quantidade de entradas
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+# Cache compartilhado pelos coletores
+cache = TTLCache()
@@ -1,9 +1,55 @@
 """
-Coletor de informações de hardware do Windows
+Coletor de informações de hardware do Windows (WMI)
 """
-import wmi
 import psutil
 import platform
+from collectors.cache import cache
+from collectors.wmi_session import session
+
+
+def _system_info():
+    """
+    Lê fabricante, modelo e número de série (não mudam até o próximo boot)
+    
+    Returns:
+        dict: fabricante, modelo e numero_serie
+    """
+    system = session.query('Win32_ComputerSystem')[0]
+    bios = session.query('Win32_BIOS')[0]
+    return {
+        'fabricante': system.Manufacturer.strip(),
+        'modelo': system.Model.strip(),
+        'numero_serie': bios.SerialNumber.strip(),
+    }
+
+
+def _processor_name():
+    """
+    Lê o nome do processador
+    
+    Returns:
+        str: Nome do processador
+    """
+    return session.query('Win32_Processor')[0].Name.strip()
+
+
+def _disk_info():
+    """
+    Lê tamanho e tipo do primeiro disco
+    
+    Returns:
+        str: Descrição do disco (ex: "512GB SSD")
+    """
+    disks = session.query('Win32_DiskDrive')
+    if disks:
+        disk = disks[0]
+        disk_size = int(disk.Size) if disk.Size else 0
+        disk_size_gb = round(disk_size / (1024**3))
+        disk_type = "SSD" if "SSD" in disk.Model else "HDD"
+    else:
+        disk_size_gb = 0
+        disk_type = "Unknown"
+    return f"{disk_size_gb}GB {disk_type}"
 
 
 def collect_hardware():
@@ -12,52 +58,26 @@ def collect_hardware():
     
     Returns:
         dict: Dicionário com informações de hardware
+    
+    Raises:
+        Exception: Falha na consulta WMI (o pipeline registra o erro e agenda
+            uma nova tentativa, em vez de enviar um hardware vazio)
     """
-    try:
-        c = wmi.WMI()
-        
-        # Sistema
-        system = c.Win32_ComputerSystem()[0]
-        bios = c.Win32_BIOS()[0]
-        
-        # CPU
-        cpu = c.Win32_Processor()[0]
-        cpu_cores = psutil.cpu_count(logical=False)
-        
-        # RAM
-        total_ram = psutil.virtual_memory().total
-        total_ram_gb = round(total_ram / (1024**3))
-        
-        # Disco
-        disks = c.Win32_DiskDrive()
-        if disks:
-            disk = disks[0]
-            disk_size = int(disk.Size) if disk.Size else 0
-            disk_size_gb = round(disk_size / (1024**3))
-            disk_type = "SSD" if "SSD" in disk.Model else "HDD"
-        else:
-            disk_size_gb = 0
-            disk_type = "Unknown"
-        
-        return {
-            'hostname': platform.node(),
-            'fabricante': system.Manufacturer.strip(),
-            'modelo': system.Model.strip(),
-            'numero_serie': bios.SerialNumber.strip(),
-            'processador': f"{cpu.Name.strip()} ({cpu_cores} cores)",
-            'memoria_ram': f"{total_ram_gb}GB",
-            'disco': f"{disk_size_gb}GB {disk_type}",
-        }
-        
-    except Exception as e:
-        print(f"Erro ao coletar hardware: {e}")
-        return {
-            'hostname': platform.node(),
-            'fabricante': None,
-            'modelo': None,
-            'numero_serie': None,
-            'processador': None,
-            'memoria_ram': None,
-            'disco': None,
-        }
+    # Dados estáticos vêm do cache; só a primeira leitura consulta o WMI
+    system = cache.get('sistema', _system_info)
+    cpu_name = cache.get('processador', _processor_name)
+    disk = cache.get('disco', _disk_info)
+    cpu_cores = psutil.cpu_count(logical=False)
+    
+    # RAM
+    total_ram = psutil.virtual_memory().total
+    total_ram_gb = round(total_ram / (1024**3))
+    
+    return {
+        'hostname': platform.node(),
+        **system,
+        'processador': f"{cpu_name} ({cpu_cores} cores)",
+        'memoria_ram': f"{total_ram_gb}GB",
+        'disco': disk,
+    }
 
@@ -0,0 +1,432 @@
+"""
+Coletores para Linux (DMI, /proc e bancos de pacotes dpkg/rpm)
+"""
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import threading
+from datetime import datetime
+import psutil
+from collectors.cache import cache
+from collectors.network import primary_interface, snapshot_interfaces
+from utils.records import SoftwareRecord, unique_records
+
+
+DMI_DIR = '/sys/class/dmi/id'
+DPKG_STATUS = '/var/lib/dpkg/status'
+RPM_DB_FILES = ('/var/lib/rpm/rpmdb.sqlite', '/var/lib/rpm/Packages', '/usr/lib/sysimage/rpm/rpmdb.sqlite')
+PROC_ROUTE = '/proc/net/route'
+RESOLV_CONF = '/etc/resolv.conf'
+
+# Flags de /proc/net/route
+RTF_UP = 0x1
+RTF_GATEWAY = 0x2
+
+# Discos virtuais ignorados em /sys/block
+VIRTUAL_BLOCK_PREFIXES = ('loop', 'ram', 'zram', 'dm-', 'md', 'sr', 'fd')
+
+
+def _read_text(path):
+    """
+    Lê um arquivo texto pequeno (sysfs/procfs)
+
+    Args:
+        path: Caminho do arquivo
+
+    Returns:
+        str: Conteúdo sem espaços nas pontas ou None
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            value = f.read().strip()
+        return value or None
+    except OSError:
+        return None
+
+
+def _dmi(field, dmi_dir=DMI_DIR):
+    """
+    Lê um campo de /sys/class/dmi/id
+
+    Args:
+        field: Nome do campo (ex: 'sys_vendor')
+        dmi_dir: Diretório dos campos DMI
+
+    Returns:
+        str: Valor ou None
+    """
+    return _read_text(os.path.join(dmi_dir, field))
+
+
+def _system_info(dmi_dir=DMI_DIR):
+    """
+    Lê fabricante, modelo e número de série via DMI
+
+    product_serial só é legível pelo root; sem permissão, usa board_serial.
+
+    Args:
+        dmi_dir: Diretório dos campos DMI
+
+    Returns:
+        dict: fabricante, modelo e numero_serie
+    """
+    return {
+        'fabricante': _dmi('sys_vendor', dmi_dir),
+        'modelo': _dmi('product_name', dmi_dir),
+        'numero_serie': _dmi('product_serial', dmi_dir) or _dmi('board_serial', dmi_dir),
+    }
+
+
+def _processor_name():
+    """
+    Lê o nome do processador de /proc/cpuinfo
+
+    Returns:
+        str: Nome do processador ou None
+    """
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if line.startswith(('model name', 'Model', 'Hardware')):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or None
+
+
+def _disk_info(block_dir='/sys/block'):
+    """
+    Lê tamanho e tipo do primeiro disco físico em /sys/block
+
+    Args:
+        block_dir: Diretório dos dispositivos de bloco
+
+    Returns:
+        str: Descrição do disco (ex: "512GB SSD")
+    """
+    try:
+        devices = sorted(os.listdir(block_dir))
+    except OSError:
+        devices = []
+
+    for device in devices:
+        if device.startswith(VIRTUAL_BLOCK_PREFIXES):
+            continue
+        sectors = _read_text(os.path.join(block_dir, device, 'size'))
+        if not sectors or not sectors.isdigit() or int(sectors) == 0:
+            continue
+        # O tamanho em /sys/block é sempre em setores de 512 bytes
+        disk_size_gb = round(int(sectors) * 512 / (1024**3))
+        rotational = _read_text(os.path.join(block_dir, device, 'queue', 'rotational'))
+        disk_type = "HDD" if rotational == '1' else "SSD"
+        return f"{disk_size_gb}GB {disk_type}"
+
+    return "0GB Unknown"
+
+
+def collect_hardware():
+    """
+    Coleta informações de hardware do computador Linux
+
+    Returns:
+        dict: Dicionário com informações de hardware (mesmo formato do Windows)
+
+    Raises:
+        Exception: Falha na coleta (o pipeline registra o erro e agenda uma
+            nova tentativa)
+    """
+    system = cache.get('sistema', _system_info)
+    cpu_name = cache.get('processador', _processor_name)
+    disk = cache.get('disco', _disk_info)
+    cpu_cores = psutil.cpu_count(logical=False)
+
+    total_ram = psutil.virtual_memory().total
+    total_ram_gb = round(total_ram / (1024**3))
+
+    return {
+        'hostname': platform.node(),
+        **system,
+        'processador': f"{cpu_name} ({cpu_cores} cores)" if cpu_name else None,
+        'memoria_ram': f"{total_ram_gb}GB",
+        'disco': disk,
+    }
+
+
+def default_route(route_file=PROC_ROUTE):
+    """
+    Obtém a rota padrão de /proc/net/route
+
+    Args:
+        route_file: Caminho da tabela de rotas
+
+    Returns:
+        tuple: (interface, IP do gateway) ou (None, None)
+    """
+    best = None
+    try:
+        with open(route_file, 'r', encoding='ascii') as f:
+            next(f, None)  # cabeçalho
+            for line in f:
+                fields = line.split()
+                if len(fields) < 8 or fields[1] != '00000000' or fields[7] != '00000000':
+                    continue
+                flags = int(fields[3], 16)
+                if not flags & RTF_UP or not flags & RTF_GATEWAY:
+                    continue
+                metric = int(fields[6])
+                if best is None or metric < best[0]:
+                    # Endereço em hexadecimal na ordem de bytes do host (little-endian)
+                    gateway = socket.inet_ntoa(int(fields[2], 16).to_bytes(4, 'little'))
+                    best = (metric, fields[0], gateway)
+    except (OSError, ValueError):
+        pass
+
+    return (best[1], best[2]) if best else (None, None)
+
+
+def get_default_gateway():
+    """
+    Obtém o gateway padrão
+
+    Returns:
+        str: IP do gateway ou None
+    """
+    return default_route()[1]
+
+
+def get_dns_servers(resolv_conf=RESOLV_CONF):
+    """
+    Obtém servidores DNS de /etc/resolv.conf
+
+    Returns:
+        list: Lista de IPs dos servidores DNS
+    """
+    dns_servers = []
+    try:
+        with open(resolv_conf, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == 'nameserver':
+                    dns_servers.append(fields[1])
+    except OSError:
+        pass
+    return dns_servers
+
+
+def collect_network(interfaces=None):
+    """
+    Coleta informações de rede do computador Linux
+
+    IP e MAC são os da interface da rota padrão (gethostbyname costuma
+    retornar 127.0.1.1 em distribuições Debian).
+
+    Args:
+        interfaces: Resultado de snapshot_interfaces() (para testes)
+
+    Returns:
+        dict: Dicionário com informações de rede (mesmo formato do Windows)
+
+    Raises:
+        Exception: Falha ao ler as interfaces (o pipeline registra o erro e
+            agenda uma nova tentativa)
+    """
+    interface, gateway = cache.get('gateway', default_route)
+    interfaces = snapshot_interfaces() if interfaces is None else interfaces
+    primary, ip_local = primary_interface(interfaces, interface, gateway)
+
+    return {
+        'ip_local': ip_local,
+        'mac_address': primary.mac if primary else None,
+        'gateway': gateway,
+        'dns_servers': get_dns_servers(),
+    }
+
+
+def _file_signature(path):
+    """
+    Assinatura (mtime, tamanho) de um arquivo
+
+    Args:
+        path: Caminho do arquivo
+
+    Returns:
+        tuple: (mtime_ns, tamanho) ou None se não existir
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def parse_dpkg_status(lines):
+    """
+    Lê os pacotes instalados do arquivo de status do dpkg, linha a linha
+
+    Args:
+        lines: Iterável de linhas do arquivo (ex: o próprio arquivo aberto)
+
+    Yields:
+        SoftwareRecord: Pacote instalado
+    """
+    package = version = maintainer = status = None
+    for line in lines:
+        if line == '\n' or line == '':
+            if package and status and status.endswith(' installed'):
+                yield SoftwareRecord(package, version, maintainer)
+            package = version = maintainer = status = None
+            continue
+        if line[0] in ' \t':
+            # Continuação de campo multilinha (Description, Conffiles...)
+            continue
+        name, _, value = line.partition(':')
+        if name == 'Package':
+            package = value.strip()
+        elif name == 'Version':
+            version = value.strip()
+        elif name == 'Status':
+            status = value.strip()
+        elif name == 'Maintainer':
+            maintainer = value.strip()
+
+    if package and status and status.endswith(' installed'):
+        yield SoftwareRecord(package, version, maintainer)
+
+
+def _rpm_packages():
+    """
+    Lista os pacotes instalados via rpm
+
+    Returns:
+        list: Lista de SoftwareRecord
+    """
+    output = subprocess.run(
+        ['rpm', '-qa', '--queryformat', '%{NAME}\\t%{VERSION}-%{RELEASE}\\t%{VENDOR}\\t%{INSTALLTIME}\\n'],
+        capture_output=True, text=True, timeout=120, check=True,
+    ).stdout
+    return parse_rpm_output(output)
+
+
+def parse_rpm_output(output):
+    """
+    Interpreta a saída de rpm -qa (nome, versão, fornecedor e data separados por tab)
+
+    Args:
+        output: Saída do comando
+
+    Returns:
+        list: Lista de SoftwareRecord
+    """
+    softwares = []
+    for line in output.splitlines():
+        fields = line.split('\t')
+        if len(fields) != 4 or not fields[0]:
+            continue
+        nome, versao, vendor, installed = fields
+        data_instalacao = None
+        if installed.isdigit():
+            data_instalacao = datetime.fromtimestamp(int(installed)).strftime("%Y-%m-%d")
+        softwares.append(SoftwareRecord(
+            nome, versao, None if vendor == '(none)' else vendor, data_instalacao
+        ))
+    return softwares
+
+
+class PackageDatabase:
+    """
+    Pacotes instalados (dpkg e/ou rpm), relidos só quando o banco muda
+
+    A assinatura (mtime, tamanho) do arquivo de cada gerenciador é
+    comparada a cada coleta; se não mudou, a lista anterior é reaproveitada.
+    O cache é protegido por um lock (uma leitura abandonada por estourar o
+    prazo pode terminar junto com a da thread que a substituiu), mas a
+    leitura do banco em si fica fora dele.
+    """
+
+    def __init__(self, dpkg_status=DPKG_STATUS, rpm_db_files=RPM_DB_FILES):
+        """
+        Inicializa o banco de pacotes
+
+        Args:
+            dpkg_status: Caminho do arquivo de status do dpkg
+            rpm_db_files: Caminhos possíveis do banco do rpm
+        """
+        self.dpkg_status = dpkg_status
+        self.rpm_db_files = rpm_db_files
+        self.parses = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, source, signature, loader):
+        """
+        Reaproveita a lista de uma fonte se a assinatura não mudou
+
+        Args:
+            source: Nome da fonte ('dpkg' ou 'rpm')
+            signature: Assinatura atual do banco
+            loader: Função que lê os pacotes
+
+        Returns:
+            list: Pacotes da fonte
+        """
+        with self._lock:
+            cached = self._cache.get(source)
+            if cached and cached[0] == signature:
+                return cached[1]
+            self.parses += 1
+        packages = loader()
+        with self._lock:
+            self._cache[source] = (signature, packages)
+        return packages
+
+    def _load_dpkg(self):
+        """
+        Lê o arquivo de status do dpkg
+
+        Returns:
+            list: Pacotes instalados
+        """
+        with open(self.dpkg_status, 'r', encoding='utf-8', errors='replace') as f:
+            return list(parse_dpkg_status(f))
+
+    def packages(self):
+        """
+        Lista os pacotes instalados de todos os gerenciadores presentes
+
+        Returns:
+            list: Lista de SoftwareRecord
+        """
+        packages = []
+
+        signature = _file_signature(self.dpkg_status)
+        if signature:
+            packages.extend(self._cached('dpkg', signature, self._load_dpkg))
+
+        rpm_db = next((p for p in self.rpm_db_files if os.path.exists(p)), None)
+        if rpm_db and shutil.which('rpm'):
+            packages.extend(self._cached('rpm', _file_signature(rpm_db), _rpm_packages))
+
+        return packages
+
+
+# Banco compartilhado entre os ciclos (mantém a última leitura)
+_package_db = PackageDatabase()
+
+
+def collect_software(package_db=None, software_filter=None):
+    """
+    Coleta lista de pacotes instalados
+
+    Args:
+        package_db: PackageDatabase a usar (padrão: o compartilhado)
+        software_filter: SoftwareFilter a usar (padrão: nenhum filtro)
+
+    Returns:
+        list: Lista de SoftwareRecord sem duplicatas
+    """
+    package_db = package_db or _package_db
+    if software_filter is not None:
+        software_filter.reset()
+    return list(unique_records(package_db.packages(), software_filter))
@@ -1,76 +1,151 @@
 """
 Coletor de informações de rede
 """
+import ipaddress
 import psutil
 import socket
-import wmi
+from typing import NamedTuple, Optional, Tuple
+from collectors.cache import cache
+from collectors.wmi_session import session
 
 
-def collect_network():
+EMPTY_MACS = ('00:00:00:00:00:00', '00-00-00-00-00-00')
+
+
+class InterfaceInfo(NamedTuple):
+    """Endereços de uma interface de rede ativa"""
+
+    name: str
+    ipv4: Tuple[Tuple[str, Optional[str]], ...] = ()  # (endereço, máscara)
+    mac: Optional[str] = None
+    loopback: bool = False
+
+
+def snapshot_interfaces(addrs=None, stats=None):
     """
-    Coleta informações de rede do computador
-    
+    Lê todas as interfaces ativas de uma vez, sem consultas DNS
+
+    Args:
+        addrs: Resultado de psutil.net_if_addrs() (para testes)
+        stats: Resultado de psutil.net_if_stats() (para testes)
+
     Returns:
-        dict: Dicionário com informações de rede
+        dict: Nome da interface -> InterfaceInfo, em ordem alfabética
+    """
+    addrs = psutil.net_if_addrs() if addrs is None else addrs
+    stats = psutil.net_if_stats() if stats is None else stats
+
+    interfaces = {}
+    for name in sorted(addrs):
+        stat = stats.get(name)
+        if stat is not None and not stat.isup:
+            continue
+        ipv4 = []
+        mac = None
+        for addr in addrs[name]:
+            if addr.family == socket.AF_INET:
+                ipv4.append((addr.address, addr.netmask))
+            elif addr.family == psutil.AF_LINK and addr.address and addr.address not in EMPTY_MACS:
+                # Formato original (o servidor localiza o equipamento pelo MAC)
+                mac = addr.address
+        flags = getattr(stat, 'flags', '') or ''
+        loopback = (
+            'loopback' in flags.split(',')
+            or 'Loopback' in name
+            or any(address.startswith('127.') for address, _ in ipv4)
+        )
+        interfaces[name] = InterfaceInfo(name, tuple(ipv4), mac, loopback)
+    return interfaces
+
+
+def _in_subnet(address, netmask, gateway):
+    """
+    Verifica se o gateway está na sub-rede de um endereço
+
+    Args:
+        address: IPv4 da interface
+        netmask: Máscara da interface
+        gateway: IPv4 do gateway
+
+    Returns:
+        bool: True se o gateway é alcançável diretamente pela interface
     """
     try:
-        hostname = socket.gethostname()
-        
-        # IP local
-        try:
-            ip_local = socket.gethostbyname(hostname)
-        except:
-            ip_local = None
-        
-        # MAC Address (primeira interface ativa não-loopback)
-        mac_address = get_mac_address()
-        
-        # Gateway padrão
-        gateway = get_default_gateway()
-        
-        # DNS Servers (via Windows Registry)
-        dns_servers = get_dns_servers()
-        
-        return {
-            'ip_local': ip_local,
-            'mac_address': mac_address,
-            'gateway': gateway,
-            'dns_servers': dns_servers,
-        }
-        
-    except Exception as e:
-        print(f"Erro ao coletar informações de rede: {e}")
-        return {
-            'ip_local': None,
-            'mac_address': None,
-            'gateway': None,
-            'dns_servers': [],
-        }
+        network = ipaddress.IPv4Network(f"{address}/{netmask}", strict=False)
+        return ipaddress.IPv4Address(gateway) in network
+    except ValueError:
+        return False
 
 
-def get_mac_address():
+def primary_interface(interfaces, route_interface=None, gateway=None):
     """
-    Obtém o MAC Address da primeira interface de rede ativa
+    Escolhe a interface principal: a que leva a rota padrão
+
+    Sem o nome da interface da rota (Windows), usa a interface em cuja
+    sub-rede está o gateway. Sem rota padrão, a primeira interface (em ordem
+    alfabética) com IPv4 e MAC, para que a escolha não mude entre ciclos.
+
+    Args:
+        interfaces: Resultado de snapshot_interfaces()
+        route_interface: Nome da interface da rota padrão, se conhecido
+        gateway: IPv4 do gateway padrão, se conhecido
+
+    Returns:
+        tuple: (InterfaceInfo, IPv4 escolhido) ou (None, None)
+    """
+    candidates = [i for i in interfaces.values() if not i.loopback]
+
+    if route_interface in interfaces:
+        chosen = interfaces[route_interface]
+        for address, netmask in chosen.ipv4:
+            if gateway and _in_subnet(address, netmask, gateway):
+                return chosen, address
+        return chosen, chosen.ipv4[0][0] if chosen.ipv4 else None
+
+    if gateway:
+        for interface in candidates:
+            for address, netmask in interface.ipv4:
+                if _in_subnet(address, netmask, gateway):
+                    return interface, address
+
+    for interface in candidates:
+        if interface.ipv4 and interface.mac:
+            return interface, interface.ipv4[0][0]
+    return None, None
+
+
+def collect_network(interfaces=None):
+    """
+    Coleta informações de rede do computador
+    
+    IP e MAC são os da interface principal (a da rota padrão). Mudanças em
+    outras interfaces (VPN, máquinas virtuais...) não alteram o resultado.
+    
+    Args:
+        interfaces: Resultado de snapshot_interfaces() (para testes)
     
     Returns:
-        str: MAC Address ou None
+        dict: Dicionário com informações de rede
+    
+    Raises:
+        Exception: Falha ao ler as interfaces (o pipeline registra o erro e
+            agenda uma nova tentativa, em vez de enviar uma rede vazia)
     """
-    try:
-        for interface, addrs in psutil.net_if_addrs().items():
-            # Ignorar interface loopback
-            if 'Loopback' in interface:
-                continue
-                
-            for addr in addrs:
-                if addr.family == psutil.AF_LINK:
-                    mac = addr.address
-                    # Verificar se não é MAC vazio ou inválido
-                    if mac and mac != '00:00:00:00:00:00':
-                        return mac
-    except:
-        pass
+    # Gateway padrão
+    gateway = cache.get('gateway', get_default_gateway)
     
-    return None
+    interfaces = snapshot_interfaces() if interfaces is None else interfaces
+    primary, ip_local = primary_interface(interfaces, gateway=gateway)
+    
+    # DNS Servers (via Windows Registry)
+    dns_servers = get_dns_servers()
+    
+    return {
+        'ip_local': ip_local,
+        'mac_address': primary.mac if primary else None,
+        'gateway': gateway,
+        'dns_servers': dns_servers,
+    }
 
 
 def get_default_gateway():
@@ -78,15 +153,15 @@ def get_default_gateway():
     Obtém o gateway padrão usando WMI
     
     Returns:
-        str: IP do gateway ou None
+        str: IP do gateway ou None se nenhuma interface tiver gateway
+    
+    Raises:
+        Exception: Falha na consulta WMI (não é cacheada: a próxima coleta
+            tenta de novo, em vez de informar "sem gateway" até a validade expirar)
     """
-    try:
-        c = wmi.WMI()
-        for interface in c.Win32_NetworkAdapterConfiguration(IPEnabled=True):
-            if interface.DefaultIPGateway:
-                return interface.DefaultIPGateway[0]
-    except:
-        pass
+    for interface in session.query('Win32_NetworkAdapterConfiguration', IPEnabled=True):
+        if interface.DefaultIPGateway:
+            return interface.DefaultIPGateway[0]
     
     return None
 
@@ -0,0 +1,280 @@
+"""
+Execução concorrente dos coletores
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from utils.metrics import metrics
+
+try:
+    import pythoncom
+except ImportError:  # fora do Windows
+    pythoncom = None
+
+
+logger = logging.getLogger('LabAgent')
+
+
+class CollectorResult:
+    """Resultado de um coletor em um ciclo"""
+
+    def __init__(self, name, data=None, duration=0.0, error=None, stale=False):
+        """
+        Inicializa o resultado
+
+        Args:
+            name: Nome do coletor
+            data: Dados coletados
+            duration: Duração da coleta em segundos
+            error: Exceção lançada pelo coletor (ou o prazo estourado), se houver
+            stale: True se data é o último valor válido (coletor não respondeu a
+                tempo); error indica o motivo
+        """
+        self.name = name
+        self.data = data
+        self.duration = duration
+        self.error = error
+        self.stale = stale
+
+
+def _init_com_thread():
+    """
+    Inicializa COM na thread de coleta
+
+    Chamadas WMI feitas fora da thread principal exigem CoInitialize() na
+    própria thread. A inicialização vale enquanto a thread existir, o que
+    permite reaproveitar a conexão WMI da thread entre os ciclos.
+    """
+    if pythoncom is not None:
+        pythoncom.CoInitialize()
+
+
+def _timed(name, func):
+    """
+    Executa um coletor medindo a duração e capturando erros
+
+    Args:
+        name: Nome do coletor
+        func: Função do coletor
+
+    Returns:
+        CollectorResult: Resultado da coleta
+    """
+    started = time.monotonic()
+    try:
+        data = func()
+        return CollectorResult(name, data, time.monotonic() - started)
+    except Exception as e:
+        return CollectorResult(name, None, time.monotonic() - started, e)
+
+
+class _Worker:
+    """
+    Thread dedicada a um coletor
+
+    É uma thread daemon (e não um ThreadPoolExecutor) para que uma chamada
+    travada não impeça o encerramento do processo: não há como interromper
+    uma chamada COM travada, então a thread é apenas abandonada.
+    """
+
+    def __init__(self, name):
+        """
+        Inicia a thread
+
+        Args:
+            name: Nome do coletor
+        """
+        self.retired = False
+        self._jobs = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name=f"collector-{name}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        """
+        Loop da thread: executa os trabalhos até ser aposentada
+        """
+        _init_com_thread()
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            future, func = job
+            if future.set_running_or_notify_cancel():
+                future.set_result(func())
+            if self.retired:
+                # Chamada travada que terminou depois de a thread ser substituída
+                return
+
+    def submit(self, func):
+        """
+        Agenda uma função na thread
+
+        Args:
+            func: Função sem argumentos
+
+        Returns:
+            Future: Resultado da função
+        """
+        future = Future()
+        self._jobs.put((future, func))
+        return future
+
+    def retire(self):
+        """
+        Aposenta a thread (travada ou encerrando)
+        """
+        self.retired = True
+        self._jobs.put(None)
+
+
+class CollectorPipeline:
+    """
+    Executa os coletores em paralelo (ou em sequência) a cada ciclo
+
+    Cada coletor roda na sua própria thread e tem um prazo. Se o prazo
+    estourar (ex: consulta WMI travada), o ciclo segue com o último valor
+    válido do coletor, marcado como desatualizado e com o erro do prazo (para
+    que uma nova tentativa seja agendada), e a thread travada é substituída
+    por uma nova.
+    """
+
+    def __init__(self, collectors, parallel=True, timeouts=None, default_timeout=120, max_hung=3):
+        """
+        Inicializa o pipeline
+
+        Args:
+            collectors: Dicionário nome -> função do coletor (sem argumentos)
+            parallel: Executar os coletores simultaneamente
+            timeouts: Prazo por coletor em segundos
+            default_timeout: Prazo dos coletores sem prazo próprio (segundos)
+            max_hung: Threads travadas por coletor antes de parar de criar novas
+        """
+        self.collectors = collectors
+        self.parallel = parallel
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self.max_hung = max_hung
+        self._workers = {name: _Worker(name) for name in collectors}
+        self._hung = {name: [] for name in collectors}
+        self._last_good = {}
+
+    def _timeout(self, name):
+        """
+        Prazo de um coletor
+
+        Args:
+            name: Nome do coletor
+
+        Returns:
+            float: Prazo em segundos
+        """
+        return self.timeouts.get(name, self.default_timeout)
+
+    def _hung_count(self, name):
+        """
+        Quantidade de threads do coletor ainda travadas
+
+        Args:
+            name: Nome do coletor
+
+        Returns:
+            int: Threads abandonadas que continuam vivas
+        """
+        self._hung[name] = [w for w in self._hung[name] if w.thread.is_alive()]
+        return len(self._hung[name])
+
+    def _submit(self, name):
+        """
+        Agenda um coletor na sua thread
+
+        Args:
+            name: Nome do coletor
+
+        Returns:
+            Future: Resultado da coleta, ou None se há threads travadas demais
+        """
+        if self._hung_count(name) >= self.max_hung:
+            return None
+        func = self.collectors[name]
+        return self._workers[name].submit(lambda: _timed(name, func))
+
+    def _stale(self, name, duration, reason):
+        """
+        Resultado substituto quando o coletor não respondeu
+
+        Args:
+            name: Nome do coletor
+            duration: Tempo aguardado em segundos
+            reason: Descrição do problema
+
+        Returns:
+            CollectorResult: Erro com o último valor válido (se houver) marcado como desatualizado
+        """
+        error = TimeoutError(reason)
+        if name in self._last_good:
+            return CollectorResult(name, self._last_good[name], duration, error, stale=True)
+        return CollectorResult(name, None, duration, error)
+
+    def _collect(self, name, future, started):
+        """
+        Aguarda o resultado de um coletor dentro do prazo
+
+        Args:
+            name: Nome do coletor
+            future: Future retornado por _submit(), ou None
+            started: Início da coleta (time.monotonic())
+
+        Returns:
+            CollectorResult: Resultado da coleta
+        """
+        if future is None:
+            logger.error(f"❌ Coletor {name}: {self.max_hung} execuções ainda travadas, usando último valor conhecido")
+            return self._stale(name, 0.0, f"coletor {name} travado")
+
+        timeout = self._timeout(name)
+        try:
+            result = future.result(timeout=max(0.0, started + timeout - time.monotonic()))
+        except FutureTimeoutError:
+            # A chamada travada não pode ser interrompida: a thread é abandonada e substituída
+            self._workers[name].retire()
+            self._hung[name].append(self._workers[name])
+            self._workers[name] = _Worker(name)
+            metrics.inc('collector_timeouts_total', collector=name)
+            metrics.inc('collector_workers_recycled_total', collector=name)
+            logger.warning(f"⏱️ Coletor {name} excedeu o prazo de {timeout}s, usando último valor conhecido")
+            return self._stale(name, time.monotonic() - started, f"coletor {name} excedeu o prazo de {timeout}s")
+
+        if result.error is None:
+            self._last_good[name] = result.data
+        return result
+
+    def run(self, names=None):
+        """
+        Executa os coletores
+
+        Args:
+            names: Coletores a executar (None = todos)
+
+        Returns:
+            dict: Nome do coletor -> CollectorResult
+        """
+        selected = [name for name in self.collectors if names is None or name in names]
+
+        if not self.parallel:
+            results = {}
+            for name in selected:
+                results[name] = self._collect(name, self._submit(name), time.monotonic())
+            return results
+
+        started = time.monotonic()
+        futures = {name: self._submit(name) for name in selected}
+        return {name: self._collect(name, future, started) for name, future in futures.items()}
+
+    def close(self):
+        """
+        Encerra as threads do pipeline
+        """
+        for worker in self._workers.values():
+            worker.retire()
@@ -0,0 +1,256 @@
+"""
+Monitoramento das chaves Uninstall do Registry
+
+Em vez de varrer os softwares a cada ciclo, o agente é avisado pelo Windows
+(RegNotifyChangeKeyValue) quando algo é instalado ou removido. Instalações
+alteram várias chaves em sequência, então as notificações são agrupadas
+(debounce) e geram uma única nova varredura.
+"""
+import logging
+import threading
+import time
+from collectors.software import UNINSTALL_KEYS
+
+
+logger = logging.getLogger('LabAgent')
+
+
+class WatchBackend:
+    """Fonte de notificações de mudança"""
+
+    def wait(self, timeout):
+        """
+        Aguarda uma notificação
+
+        Args:
+            timeout: Tempo máximo de espera em segundos
+
+        Returns:
+            bool: True se houve mudança durante a espera
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Libera os recursos do backend
+        """
+
+
+class FakeWatchBackend(WatchBackend):
+    """Backend em memória, para testar o agrupamento fora do Windows"""
+
+    def __init__(self):
+        """
+        Inicializa o backend sem notificações pendentes
+        """
+        self._pending = 0
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def notify(self, count=1):
+        """
+        Simula mudanças no Registry
+
+        Args:
+            count: Quantidade de notificações
+        """
+        with self._cond:
+            self._pending += count
+            self._cond.notify_all()
+
+    def wait(self, timeout):
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            fired = self._pending > 0
+            self._pending = 0
+            return fired
+
+    def close(self):
+        self.closed = True
+
+
+class WinRegWatchBackend(WatchBackend):
+    """Notificações do Windows via RegNotifyChangeKeyValue (pywin32)"""
+
+    def __init__(self, key_paths=UNINSTALL_KEYS):
+        """
+        Abre as chaves e registra a notificação de cada uma
+
+        Args:
+            key_paths: Caminhos sob HKEY_LOCAL_MACHINE
+        """
+        import win32api
+        import win32con
+        import win32event
+
+        self._win32api = win32api
+        self._win32con = win32con
+        self._win32event = win32event
+        self._keys = []
+        self._events = []
+        try:
+            for path in key_paths:
+                try:
+                    key = win32api.RegOpenKeyEx(
+                        win32con.HKEY_LOCAL_MACHINE, path, 0, win32con.KEY_NOTIFY
+                    )
+                except win32api.error:
+                    # WOW6432Node não existe em Windows 32 bits
+                    continue
+                self._keys.append(key)
+                self._events.append(win32event.CreateEvent(None, False, False, None))
+                self._arm(len(self._keys) - 1)
+            if not self._keys:
+                raise OSError("nenhuma chave Uninstall encontrada")
+        except Exception:
+            self.close()
+            raise
+
+    def _arm(self, index):
+        """
+        (Re)registra a notificação de uma chave; cada registro dispara uma vez
+
+        Args:
+            index: Índice da chave
+        """
+        self._win32api.RegNotifyChangeKeyValue(
+            self._keys[index],
+            True,  # inclui subchaves
+            self._win32con.REG_NOTIFY_CHANGE_NAME | self._win32con.REG_NOTIFY_CHANGE_LAST_SET,
+            self._events[index],
+            True,  # assíncrono
+        )
+
+    def wait(self, timeout):
+        result = self._win32event.WaitForMultipleObjects(
+            self._events, False, int(timeout * 1000)
+        )
+        if result == self._win32event.WAIT_TIMEOUT:
+            return False
+        index = result - self._win32event.WAIT_OBJECT_0
+        if not 0 <= index < len(self._events):
+            raise OSError(f"falha ao aguardar notificação do Registry ({result})")
+        self._arm(index)
+        return True
+
+    def close(self):
+        for key in self._keys:
+            try:
+                self._win32api.RegCloseKey(key)
+            except Exception:
+                pass
+        for event in self._events:
+            try:
+                self._win32api.CloseHandle(event)
+            except Exception:
+                pass
+        self._keys = []
+        self._events = []
+
+
+def create_backend():
+    """
+    Cria o backend de notificações do sistema, se disponível
+
+    Returns:
+        WatchBackend: Backend do Windows, ou None (usar varredura periódica)
+    """
+    try:
+        return WinRegWatchBackend()
+    except ImportError:
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível monitorar o Registry: {e}")
+        return None
+
+
+class SoftwareWatcher(threading.Thread):
+    """Thread que agrupa as notificações e sinaliza quando reler os softwares"""
+
+    def __init__(self, backend, on_change=None, debounce=10.0, max_delay=60.0, poll_timeout=1.0):
+        """
+        Inicializa o monitor
+
+        Args:
+            backend: Instância de WatchBackend
+            on_change: Função chamada após cada grupo de mudanças
+            debounce: Silêncio (segundos) que encerra um grupo de notificações
+            max_delay: Duração máxima de um grupo, mesmo sem silêncio (segundos)
+            poll_timeout: Intervalo de verificação do pedido de parada (segundos)
+        """
+        super().__init__(name='software-watcher', daemon=True)
+        self.backend = backend
+        self.on_change = on_change
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_timeout = poll_timeout
+        self.notifications = 0
+        self.triggers = 0
+        self.failed = False
+        self._changed = threading.Event()
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """
+        Solicita o encerramento da thread
+        """
+        self._stop_event.set()
+
+    def active(self):
+        """
+        Verifica se o monitor está funcionando
+
+        Returns:
+            bool: False se parou (a varredura periódica deve ser usada)
+        """
+        return self.is_alive() and not self.failed
+
+    def consume_change(self):
+        """
+        Verifica e limpa o aviso de mudança
+
+        Returns:
+            bool: True se houve mudança desde a última chamada
+        """
+        changed = self._changed.is_set()
+        self._changed.clear()
+        return changed
+
+    def _coalesce(self):
+        """
+        Absorve as notificações seguintes até haver silêncio ou estourar max_delay
+        """
+        first = last = time.monotonic()
+        while not self._stop_event.is_set():
+            remaining = min(last + self.debounce, first + self.max_delay) - time.monotonic()
+            if remaining <= 0:
+                return
+            if self.backend.wait(min(remaining, self.poll_timeout)):
+                self.notifications += 1
+                last = time.monotonic()
+
+    def run(self):
+        """
+        Loop da thread: aguarda notificações e sinaliza cada grupo uma única vez
+        """
+        try:
+            while not self._stop_event.is_set():
+                if not self.backend.wait(self.poll_timeout):
+                    continue
+                self.notifications += 1
+                self._coalesce()
+                if self._stop_event.is_set():
+                    break
+
+                self.triggers += 1
+                self._changed.set()
+                if self.on_change:
+                    self.on_change()
+        except Exception as e:
+            self.failed = True
+            logger.warning(f"⚠️ Monitoramento do Registry interrompido ({e}); voltando à varredura periódica")
+            if self.on_change:
+                self.on_change()
+        finally:
+            self.backend.close()
@@ -1,83 +1,207 @@
 """
 Coletor de softwares instalados no Windows via Registry
 """
-import winreg
+import threading
 from datetime import datetime
+from collectors.software_filter import SoftwareFilter
+from utils.records import SoftwareRecord, unique_records
 
+try:
+    import winreg
+except ImportError:  # fora do Windows (testes com registry falso)
+    winreg = None
 
-def collect_software():
+
+# Caminhos do Registry onde ficam os softwares instalados
+UNINSTALL_KEYS = (
+    r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
+    r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall",
+)
+
+
+class IncrementalSoftwareScanner:
     """
-    Coleta lista de softwares instalados no Windows através do Registry
+    Varredura das chaves Uninstall que só relê as subchaves alteradas
     
-    Returns:
-        list: Lista de dicionários com informações dos softwares
+    Cada subchave é guardada junto com a data da última gravação
+    (QueryInfoKey); nas varreduras seguintes os valores só são lidos de
+    novo se a subchave for nova ou tiver sido modificada. Subchaves
+    removidas saem do cache. O cache é protegido por um lock: uma varredura
+    abandonada por estourar o prazo pode continuar rodando junto com a
+    varredura da thread que a substituiu.
     """
-    softwares = []
     
-    # Caminhos do Registry onde ficam os softwares instalados
-    keys = [
-        r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
-        r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
-    ]
+    def __init__(self, registry=None, key_paths=UNINSTALL_KEYS):
+        """
+        Inicializa o scanner
+        
+        Args:
+            registry: Módulo/objeto com a API do winreg (padrão: winreg)
+            key_paths: Caminhos sob HKEY_LOCAL_MACHINE
+        """
+        self.registry = registry or winreg
+        self.key_paths = key_paths
+        self.reads = 0
+        self.reused = 0
+        self._cache = {}
+        self._lock = threading.Lock()
     
-    for key_path in keys:
+    def scan(self):
+        """
+        Percorre os softwares instalados
+        
+        Yields:
+            SoftwareRecord: Registros brutos (sem filtro nem remoção de duplicatas)
+        """
+        for key_path in self.key_paths:
+            yield from self._scan_key(key_path)
+    
+    def _scan_key(self, key_path):
+        """
+        Varre uma chave Uninstall
+        
+        Args:
+            key_path: Caminho sob HKEY_LOCAL_MACHINE
+        
+        Yields:
+            SoftwareRecord: Registros das subchaves com DisplayName
+        """
+        reg = self.registry
         try:
-            key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path)
-            
-            for i in range(winreg.QueryInfoKey(key)[0]):
+            key = reg.OpenKey(reg.HKEY_LOCAL_MACHINE, key_path)
+        except OSError:
+            # Chave inexistente (ex: WOW6432Node em Windows 32 bits)
+            self._forget(key_path, set())
+            return
+        
+        seen = set()
+        try:
+            for i in range(reg.QueryInfoKey(key)[0]):
                 try:
-                    subkey_name = winreg.EnumKey(key, i)
-                    subkey = winreg.OpenKey(key, subkey_name)
-                    
-                    nome = get_value(subkey, "DisplayName")
-                    if not nome:
-                        continue
-                    
-                    # Filtrar entradas do sistema/updates do Windows
-                    if is_system_entry(nome):
-                        continue
-                    
-                    softwares.append({
-                        'nome': nome,
-                        'versao': get_value(subkey, "DisplayVersion"),
-                        'fabricante': get_value(subkey, "Publisher"),
-                        'data_instalacao': parse_install_date(get_value(subkey, "InstallDate")),
-                    })
-                    
-                    winreg.CloseKey(subkey)
-                except:
-                    continue
+                    subkey_name = reg.EnumKey(key, i)
+                except OSError:
+                    # Subchave removida durante a varredura
+                    break
+                seen.add(subkey_name)
+                record = self._read_subkey(key, key_path, subkey_name)
+                if record:
+                    yield record
+        finally:
+            reg.CloseKey(key)
+        
+        self._forget(key_path, seen)
+    
+    def _read_subkey(self, key, key_path, subkey_name):
+        """
+        Lê uma subchave, reaproveitando o cache se ela não mudou
+        
+        Args:
+            key: Handle da chave Uninstall
+            key_path: Caminho da chave Uninstall
+            subkey_name: Nome da subchave
+        
+        Returns:
+            SoftwareRecord: Registro do software ou None
+        """
+        reg = self.registry
+        try:
+            subkey = reg.OpenKey(key, subkey_name)
+        except OSError:
+            return None
+        
+        try:
+            last_write = reg.QueryInfoKey(subkey)[2]
+            with self._lock:
+                cached = self._cache.get((key_path, subkey_name))
+                if cached and cached[0] == last_write:
+                    self.reused += 1
+                    return cached[1]
+                self.reads += 1
             
-            winreg.CloseKey(key)
-        except:
-            continue
+            record = None
+            nome = get_value(subkey, "DisplayName", reg)
+            if nome:
+                record = SoftwareRecord(
+                    nome,
+                    get_value(subkey, "DisplayVersion", reg),
+                    get_value(subkey, "Publisher", reg),
+                    parse_install_date(get_value(subkey, "InstallDate", reg)),
+                )
+            with self._lock:
+                self._cache[(key_path, subkey_name)] = (last_write, record)
+            return record
+        except OSError:
+            return None
+        finally:
+            reg.CloseKey(subkey)
     
-    # Remover duplicatas (software pode aparecer em ambos os caminhos)
-    unique_softwares = []
-    seen = set()
+    def _forget(self, key_path, seen):
+        """
+        Remove do cache as subchaves que não existem mais
+        
+        Args:
+            key_path: Caminho da chave Uninstall
+            seen: Nomes das subchaves encontradas na varredura
+        """
+        with self._lock:
+            stale = [k for k in self._cache if k[0] == key_path and k[1] not in seen]
+            for k in stale:
+                del self._cache[k]
+
+
+# Scanner compartilhado entre os ciclos (mantém o cache de subchaves)
+_scanner = IncrementalSoftwareScanner()
+
+# Filtro com as regras padrão (usado se nenhum for configurado)
+_default_filter = SoftwareFilter()
+
+
+def collect_software(scanner=None, software_filter=None):
+    """
+    Coleta lista de softwares instalados no Windows através do Registry
     
-    for software in softwares:
-        key = (software['nome'], software['versao'])
-        if key not in seen:
-            seen.add(key)
-            unique_softwares.append(software)
+    Args:
+        scanner: IncrementalSoftwareScanner a usar (padrão: o compartilhado)
+        software_filter: SoftwareFilter a usar (padrão: regras padrão)
     
-    return unique_softwares
+    Returns:
+        list: Lista de SoftwareRecord
+    """
+    return list(iter_software(scanner, software_filter))
+
+
+def iter_software(scanner=None, software_filter=None):
+    """
+    Percorre os softwares instalados, filtrando e removendo duplicatas durante a varredura
+    
+    Args:
+        scanner: IncrementalSoftwareScanner a usar (padrão: o compartilhado)
+        software_filter: SoftwareFilter a usar (padrão: regras padrão)
+    
+    Yields:
+        SoftwareRecord: Softwares sem entradas do sistema nem duplicatas
+            (o mesmo software pode aparecer nos dois caminhos do Registry)
+    """
+    scanner = scanner or _scanner
+    software_filter = software_filter or _default_filter
+    software_filter.reset()
+    yield from unique_records(scanner.scan(), software_filter)
 
 
-def get_value(key, name):
+def get_value(key, name, registry=None):
     """
     Obtém valor de uma chave do Registry
     
     Args:
         key: Chave do Registry
         name: Nome do valor
+        registry: Módulo/objeto com a API do winreg (padrão: winreg)
     
     Returns:
         str: Valor ou None
     """
     try:
-        value = winreg.QueryValueEx(key, name)[0]
+        value = (registry or winreg).QueryValueEx(key, name)[0]
         return value if value else None
     except:
         return None
@@ -99,29 +223,3 @@ def parse_install_date(date_str):
         return datetime.strptime(date_str, "%Y%m%d").strftime("%Y-%m-%d")
     except:
         return None
-
-
-def is_system_entry(name):
-    """
-    Verifica se é uma entrada do sistema que deve ser ignorada
-    
-    Args:
-        name: Nome do software
-    
-    Returns:
-        bool: True se for entrada do sistema
-    """
-    ignore_patterns = [
-        'Update for',
-        'Hotfix for',
-        'Security Update',
-        'KB',
-        'Microsoft Visual C++',
-    ]
-    
-    for pattern in ignore_patterns:
-        if pattern in name:
-            return True
-    
-    return False
-
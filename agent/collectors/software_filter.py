@@ -0,0 +1,215 @@
+"""
+Filtro configurável de softwares (entradas do sistema, updates, componentes)
+"""
+import re
+from collections import Counter
+from typing import Callable, NamedTuple, Optional
+
+
+# Campos do software aos quais as regras se aplicam
+FIELDS = ('nome', 'fabricante')
+
+# Tipos de regra -> função que gera a expressão regular do valor
+OPERATORS = {
+    'contem': re.escape,
+    'comeca': lambda value: r'\A' + re.escape(value),
+    'igual': lambda value: r'\A' + re.escape(value) + r'\Z',
+    'regex': lambda value: value,
+}
+
+# Tipos de regra -> função que gera o teste direto do valor (sem regex
+# quando possível); "contem" não tem função: o operador in é aplicado
+# direto em _CompiledRules.match, sem o custo de uma chamada por regra
+PREDICATES = {
+    'comeca': lambda value: lambda text: text.startswith(value),
+    'igual': lambda value: lambda text: text == value,
+    'regex': lambda value: re.compile(value).search,
+}
+
+# A partir de quantas regras num campo a regex combinada compensa: abaixo
+# disso os testes diretos (substring, prefixo) custam o mesmo ou menos
+COMBINED_MIN_RULES = 8
+
+# Regras padrão (equivalentes ao antigo is_system_entry, mas "KB" só como
+# número de artigo: KB5034441 é update, "KeePass KBD Tool" não). O \b fica
+# num lookbehind depois do literal "KB" para a busca partir do literal;
+# com \b no início toda posição do nome é testada (3x mais lento)
+DEFAULT_EXCLUDE = (
+    {'nome_contem': 'Update for'},
+    {'nome_contem': 'Hotfix for'},
+    {'nome_contem': 'Security Update'},
+    {'nome_regex': r'KB(?<=\bKB)\d{6,7}\b'},
+    {'nome_contem': 'Microsoft Visual C++'},
+)
+
+
+class _Rule(NamedTuple):
+    """Regra interpretada"""
+
+    field: str
+    label: str
+    pattern: str
+    # Valor da regra, testado com "in" quando não há predicate ("contem")
+    value: str
+    predicate: Optional[Callable[[str], object]]
+
+
+def _parse_rule(rule):
+    """
+    Interpreta uma regra no formato {"<campo>_<tipo>": valor}
+
+    Args:
+        rule: Dicionário com uma única chave (ex: {'nome_regex': '^Driver'})
+
+    Returns:
+        _Rule: Campo, rótulo, expressão regular e teste direto da regra
+
+    Raises:
+        ValueError: Regra em formato inválido
+    """
+    if not isinstance(rule, dict) or len(rule) != 1:
+        raise ValueError(f"regra inválida: {rule!r}")
+    (name, value), = rule.items()
+    field, _, operator = str(name).partition('_')
+    if field not in FIELDS or operator not in OPERATORS or not isinstance(value, str):
+        raise ValueError(f"regra inválida: {rule!r}")
+
+    pattern = OPERATORS[operator](value)
+    try:
+        # Validada já como parte da regex combinada: flags globais como (?i)
+        # não são aceitas, use a forma local (?i:...)
+        re.compile(f"(?:{pattern})")
+    except re.error as e:
+        raise ValueError(f"regex inválida em {rule!r}: {e}")
+    predicate = PREDICATES[operator](value) if operator in PREDICATES else None
+    return _Rule(field, f"{name}: {value}", pattern, value, predicate)
+
+
+class _CompiledRules:
+    """Regras de uma lista (incluir/excluir) compiladas por campo"""
+
+    def __init__(self, rules):
+        """
+        Compila as regras
+
+        Args:
+            rules: Lista de regras no formato {"<campo>_<tipo>": valor}
+        """
+        by_field = {field: [] for field in FIELDS}
+        for rule in rules or ():
+            parsed = _parse_rule(rule)
+            by_field[parsed.field].append(parsed)
+
+        # Com muitas regras, uma única regex por campo decide se alguma casa
+        # (uma busca por software em vez de uma por regra); só nos acertos a
+        # regra é identificada, para os contadores. Grupos nomeados na regex
+        # combinada deixariam toda busca cerca de 2x mais lenta. Com poucas
+        # regras os testes diretos, um a um, custam o mesmo e dispensam a regex.
+        self.matchers = {}
+        for field, field_rules in by_field.items():
+            if not field_rules:
+                continue
+            search = None
+            if len(field_rules) >= COMBINED_MIN_RULES:
+                search = re.compile('|'.join(f"(?:{rule.pattern})" for rule in field_rules)).search
+            self.matchers[field] = (search, [(rule.label, rule.value, rule.predicate) for rule in field_rules])
+
+    def match(self, software):
+        """
+        Procura a regra que casa com o software
+
+        Args:
+            software: Dicionário com nome/fabricante
+
+        Returns:
+            str: Rótulo da regra ou None
+        """
+        for field, (search, each) in self.matchers.items():
+            value = software.get(field)
+            if not value or (search is not None and not search(value)):
+                continue
+            for label, needle, predicate in each:
+                if needle in value if predicate is None else predicate(value):
+                    return label
+        return None
+
+
+class SoftwareFilter:
+    """
+    Decide quais softwares são ignorados no inventário
+
+    Um software é ignorado se casar com alguma regra de "excluir" e com
+    nenhuma de "incluir". Cada regra conta quantas vezes foi aplicada na
+    coleta atual (reset() no início de cada coleta).
+    """
+
+    def __init__(self, exclude=DEFAULT_EXCLUDE, include=()):
+        """
+        Inicializa o filtro, compilando as regras
+
+        Args:
+            exclude: Regras que removem o software do inventário
+            include: Regras que mantêm o software mesmo se excluído
+
+        Raises:
+            ValueError: Regra em formato inválido
+        """
+        self._exclude = _CompiledRules(exclude)
+        self._include = _CompiledRules(include)
+        self.hits = Counter()
+
+    @classmethod
+    def from_config(cls, filtros):
+        """
+        Cria o filtro a partir da seção "filtros" do config.yaml
+
+        Args:
+            filtros: Dicionário com as listas "excluir" e "incluir" (None = padrão)
+
+        Returns:
+            SoftwareFilter: Filtro configurado
+
+        Raises:
+            ValueError: Regra em formato inválido
+        """
+        filtros = filtros or {}
+        exclude = filtros.get('excluir')
+        return cls(
+            exclude=DEFAULT_EXCLUDE if exclude is None else exclude,
+            include=filtros.get('incluir') or (),
+        )
+
+    def is_excluded(self, software):
+        """
+        Verifica se o software deve ficar fora do inventário
+
+        Args:
+            software: Dicionário com nome/fabricante
+
+        Returns:
+            bool: True se o software deve ser ignorado
+        """
+        rule = self._exclude.match(software)
+        if rule is None:
+            return False
+        kept_by = self._include.match(software)
+        if kept_by is not None:
+            self.hits[f"incluir {kept_by}"] += 1
+            return False
+        self.hits[f"excluir {rule}"] += 1
+        return True
+
+    def reset(self):
+        """
+        Zera os contadores por regra (chamado no início de cada coleta)
+        """
+        self.hits = Counter()
+
+    def stats(self):
+        """
+        Contadores por regra da última coleta
+
+        Returns:
+            dict: Rótulo da regra -> quantidade de softwares afetados
+        """
+        return dict(self.hits)
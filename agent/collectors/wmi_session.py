@@ -0,0 +1,63 @@
+"""
+Conexão WMI reutilizável entre ciclos de coleta
+"""
+import threading
+
+
+class WmiSession:
+    """
+    Mantém uma conexão WMI por thread, recriada após falhas de COM
+
+    Objetos COM pertencem à thread que os criou, por isso cada thread de
+    coleta tem a sua conexão; ela é reaproveitada em todos os ciclos.
+    """
+
+    def __init__(self):
+        """
+        Inicializa a sessão sem conectar (a conexão é aberta no primeiro uso)
+        """
+        self._local = threading.local()
+        self.connections = 0
+
+    def connection(self):
+        """
+        Obtém a conexão da thread atual, abrindo-a se necessário
+
+        Returns:
+            wmi.WMI: Conexão WMI
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            import wmi  # só existe no Windows
+            conn = wmi.WMI()
+            self._local.conn = conn
+            self.connections += 1
+        return conn
+
+    def reset(self):
+        """
+        Descarta a conexão da thread atual
+        """
+        self._local.conn = None
+
+    def query(self, wmi_class, **filters):
+        """
+        Consulta uma classe WMI, reconectando uma vez em caso de falha
+
+        Args:
+            wmi_class: Nome da classe (ex: 'Win32_BIOS')
+            **filters: Filtros da consulta (ex: IPEnabled=True)
+
+        Returns:
+            list: Instâncias retornadas
+        """
+        try:
+            return getattr(self.connection(), wmi_class)(**filters)
+        except Exception:
+            # Conexão inválida (serviço WMI reiniciado, RPC indisponível...)
+            self.reset()
+            return getattr(self.connection(), wmi_class)(**filters)
+
+
+# Sessão compartilhada pelos coletores
+session = WmiSession()
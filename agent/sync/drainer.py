@@ -0,0 +1,143 @@
+"""
+Envio em segundo plano dos snapshots pendentes no spool
+"""
+import logging
+import threading
+import time
+from api.retry import full_jitter_delay
+from utils.fingerprint import SECTIONS
+from utils.metrics import metrics
+from utils.records import SoftwareRecord
+
+
+logger = logging.getLogger('LabAgent')
+
+
+class SpoolDrainer(threading.Thread):
+    """Thread que esvazia o spool, com backoff exponencial e jitter em falhas"""
+
+    def __init__(self, spool, synchronizer, base_delay=5, max_delay=600):
+        """
+        Inicializa o drenador
+
+        Args:
+            spool: Instância de SyncSpool
+            synchronizer: Instância de InventorySynchronizer
+            base_delay: Espera base após a primeira falha (segundos)
+            max_delay: Espera máxima entre tentativas (segundos)
+        """
+        super().__init__(name='spool-drainer', daemon=True)
+        self.spool = spool
+        self.synchronizer = synchronizer
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failures = 0
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self):
+        """
+        Avisa que há snapshots novos (ignorado enquanto em backoff)
+        """
+        if self.failures == 0:
+            self._wake_event.set()
+
+    def stop(self):
+        """
+        Solicita o encerramento da thread
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def _next_delay(self):
+        """
+        Calcula a espera até a próxima tentativa (full jitter)
+
+        O sorteio espalha as reconexões de todos os agentes depois de uma
+        queda do servidor, em vez de todos tentarem ao mesmo tempo.
+
+        Returns:
+            float: Segundos até a próxima tentativa, ou None para aguardar wake()
+        """
+        if self.failures == 0:
+            return None
+        # Expoente limitado: numa queda longa base * 2**n estouraria o float
+        # (OverflowError) e mataria a thread; 2**32 já passa de qualquer max_delay
+        return full_jitter_delay(min(self.failures - 1, 32), self.base_delay, self.max_delay)
+
+    def run(self):
+        """
+        Loop da thread: drena o spool quando acordada ou quando o backoff expira
+        """
+        # Snapshots que sobraram de uma execução anterior
+        if self.spool.depth():
+            self._wake_event.set()
+
+        while not self._stop_event.is_set():
+            delay = self._next_delay()
+            self._wake_event.wait(delay)
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                break
+            if not self.spool.depth():
+                continue
+
+            try:
+                self.drain()
+                self.failures = 0
+                metrics.inc('syncs_total', result='ok')
+                metrics.set('last_sync_timestamp_seconds', time.time())
+            except Exception as e:
+                self.failures += 1
+                metrics.inc('syncs_total', result='error')
+                logger.error(f"❌ Erro durante sincronização: {e}", exc_info=self.failures == 1)
+                logger.info(f"Sincronização pendente mantida no spool ({self.spool.depth()} seções, tentativa {self.failures})")
+
+    def drain(self):
+        """
+        Envia os snapshots pendentes e confirma os que o servidor aceitou
+
+        Returns:
+            set: Seções sincronizadas
+        """
+        pending = self.spool.pending()
+        state = self.synchronizer.state
+        hashes = {section: state.get_hash(section) for section in SECTIONS}
+        equipamento_data = None
+        sw_data = []
+        reconcile = False
+
+        equipamento = pending.get('equipamento')
+        if equipamento:
+            equipamento_data = equipamento['payload']['data']
+            hashes.update(equipamento['payload']['hashes'])
+
+        software = pending.get('software')
+        if software:
+            # No spool cada software é uma lista [nome, versao, fabricante, data_instalacao]
+            sw_data = [SoftwareRecord.from_value(value) for value in software['payload']['data']]
+            hashes['software'] = software['payload']['hash']
+            reconcile = software['payload'].get('reconciliar', False)
+
+        if equipamento_data is None and not state.get('equipamento_id'):
+            # Softwares precisam do equipamento_id; o próximo ciclo de coleta
+            # enfileira o equipamento, já que não há ID confirmado
+            logger.info("⏳ Aguardando dados do equipamento para enviar os softwares")
+            return set()
+
+        synced = self.synchronizer.sync(equipamento_data, sw_data, hashes, reconcile=reconcile)
+        if synced:
+            logger.info("🎉 Sincronização concluída com sucesso!")
+            stats = self.synchronizer.client.connection_stats()
+            logger.info(f"Conexões HTTP: {stats['requests']} requisições, {stats['opened']} abertas, {stats['reused']} reutilizadas")
+
+        # Confirmar apenas os snapshots cujo hash agora é o confirmado pelo servidor
+        if equipamento and all(
+            state.get_hash(section) == value
+            for section, value in equipamento['payload']['hashes'].items()
+        ):
+            self.spool.ack('equipamento', equipamento['seq'])
+        if software and state.get_hash('software') == software['payload']['hash']:
+            self.spool.ack('software', software['seq'])
+
+        return synced
@@ -0,0 +1,395 @@
+"""
+Sincronização por seção dos dados coletados com a API Laravel
+"""
+import logging
+import requests
+from api.client import BaseMismatchError, EquipamentoNotFoundError, invalid_software_ids, match_software_ids
+from utils.inventory import (
+    DEFAULT_BUCKETS, InventoryTree, bucket_of, diff_inventory, inventory_hash, software_key, sort_keys,
+)
+from utils.software_cache import software_metadata
+
+
+logger = logging.getLogger('LabAgent')
+
+
+class InventorySynchronizer:
+    """Envia ao servidor apenas as seções cujo hash mudou"""
+
+    def __init__(self, client, state, batch_sizer, delta=True, max_in_flight=1, software_cache=None,
+                 reconcile=True, bucket_count=DEFAULT_BUCKETS):
+        """
+        Inicializa o sincronizador
+
+        Args:
+            client: Instância de LaravelAPIClient
+            state: Instância de SyncState com o último estado confirmado
+            batch_sizer: AdaptiveBatchSizer usado nos lotes de softwares
+            delta: Enviar apenas softwares adicionados/removidos quando possível
+            max_in_flight: Lotes de softwares enviados simultaneamente na sincronização completa
+            software_cache: SoftwareIdCache com IDs já resolvidos (None = enviar todos)
+            reconcile: Reparar divergências do servidor por buckets (árvore de Merkle)
+                antes de recorrer à sincronização completa
+            bucket_count: Quantidade de buckets da árvore de reconciliação
+        """
+        self.client = client
+        self.state = state
+        self.batch_sizer = batch_sizer
+        self.delta = delta
+        self.max_in_flight = max_in_flight
+        self.software_cache = software_cache
+        self.reconcile = reconcile
+        self.bucket_count = bucket_count
+
+    def changed_sections(self, hashes):
+        """
+        Compara os hashes atuais com os últimos confirmados
+
+        Args:
+            hashes: Hash por seção ('hardware', 'rede', 'software')
+
+        Returns:
+            set: Seções que mudaram desde a última sincronização
+        """
+        changed = {
+            section for section, value in hashes.items()
+            if value != self.state.get_hash(section)
+        }
+        # Sem ID conhecido o equipamento precisa ser (re)enviado
+        if not self.state.get('equipamento_id'):
+            changed.update({'hardware', 'rede'})
+        return changed
+
+    def sync(self, equipamento_data, sw_data, hashes, reconcile=False):
+        """
+        Sincroniza as seções alteradas
+
+        Args:
+            equipamento_data: Dados do equipamento (hardware + rede) com dados_hash
+            sw_data: Lista de softwares coletados
+            hashes: Hash por seção
+            reconcile: Conferir o inventário de softwares do servidor mesmo sem
+                mudança local (repara divergências como a restauração de um backup)
+
+        Returns:
+            set: Seções sincronizadas (vazio se nada mudou)
+        """
+        try:
+            return self._sync(equipamento_data, sw_data, hashes, reconcile)
+        except EquipamentoNotFoundError as e:
+            # Equipamento excluído ou banco restaurado: o ID salvo nunca mais
+            # seria aceito, então o equipamento é registrado de novo
+            logger.warning(f"⚠️ {e}; registrando o equipamento novamente")
+            self.state.forget_equipamento()
+            self._save()
+            if equipamento_data is None:
+                # Só softwares pendentes: o próximo ciclo de coleta reenvia o equipamento
+                return set()
+            return self._sync(equipamento_data, sw_data, hashes, reconcile)
+
+    def _sync(self, equipamento_data, sw_data, hashes, reconcile):
+        """
+        Sincroniza as seções alteradas (ver sync)
+
+        Raises:
+            EquipamentoNotFoundError: Se o servidor não conhecer o equipamento_id salvo
+        """
+        changed = self.changed_sections(hashes)
+        if reconcile and self.reconcile and sw_data and self.state.get('equipamento_id'):
+            changed.add('software')
+        if not changed:
+            return changed
+
+        logger.info(f"🔄 Mudanças detectadas ({', '.join(sorted(changed))}), sincronizando com servidor...")
+        relink = False
+
+        # 1. Equipamento (hardware e/ou rede)
+        if changed & {'hardware', 'rede'}:
+            logger.info("Sincronizando equipamento...")
+            eq_response = self.client.sync_equipamento(equipamento_data)
+            equipamento_id = eq_response['equipamento_id']
+            action = eq_response['action']
+            logger.info(f"✅ Equipamento {action}: ID {equipamento_id}")
+
+            # Equipamento novo ou restaurado perdeu o relacionamento com os softwares
+            relink = action in ('created', 'restored') or equipamento_id != self.state.get('equipamento_id')
+
+            self.state.set('equipamento_id', equipamento_id)
+            self.state.set_hash('hardware', hashes['hardware'])
+            self.state.set_hash('rede', hashes['rede'])
+            self._save()
+
+        equipamento_id = self.state.get('equipamento_id')
+
+        # 2. Softwares + relacionamento
+        if 'software' in changed:
+            if sw_data:
+                synced = False
+                if not relink and self.state.get('softwares') is not None:
+                    # Sem mudança local não há delta a enviar: apenas conferir o servidor
+                    local_change = hashes['software'] != self.state.get_hash('software')
+                    if self.delta and local_change:
+                        synced = self._sync_softwares_delta(equipamento_id, sw_data)
+                    # Sem delta, mudanças locais vão pela sincronização completa; a
+                    # conferência (periódica) continua usando os buckets
+                    if not synced and self.reconcile and (self.delta or not local_change):
+                        synced = self._reconcile_softwares(equipamento_id, sw_data)
+                        if synced is None:
+                            # Servidor sem reconciliação: só reenviar tudo se algo mudou aqui
+                            synced = not local_change
+                if not synced:
+                    self._sync_softwares_full(equipamento_id, sw_data)
+
+                self.state.set_hash('software', hashes['software'])
+                self._save()
+            else:
+                logger.warning("Nenhum software encontrado para sincronizar")
+        elif relink and self.state.get('software_ids'):
+            logger.info("Restaurando relacionamento equipamento-softwares...")
+            self.client.sync_equipamento_softwares(equipamento_id, self.state.get('software_ids'))
+            logger.info("✅ Relacionamento sincronizado")
+
+        return changed
+
+    def _sync_softwares_full(self, equipamento_id, sw_data):
+        """
+        Envia o inventário completo e substitui o relacionamento no servidor
+
+        Args:
+            equipamento_id: ID do equipamento
+            sw_data: Lista de softwares coletados
+        """
+        software_ids = self._resolve_software_ids(sw_data)
+
+        logger.info("Sincronizando relacionamento equipamento-softwares...")
+        try:
+            self.client.sync_equipamento_softwares(equipamento_id, software_ids)
+        except requests.HTTPError as e:
+            invalid = invalid_software_ids(e, software_ids)
+            if not invalid or self.software_cache is None:
+                raise
+            # IDs do cache que o servidor não conhece mais: descartar e resolver de novo
+            removed = self.software_cache.invalidate_ids(invalid)
+            logger.warning(f"Servidor recusou {len(invalid)} IDs do cache local ({removed} entradas descartadas)")
+            software_ids = self._resolve_software_ids(sw_data)
+            self.client.sync_equipamento_softwares(equipamento_id, software_ids)
+        logger.info("✅ Relacionamento sincronizado")
+
+        _, _, current_keys = diff_inventory(sw_data, [])
+        self.state.set('software_ids', software_ids)
+        self.state.set('softwares', sort_keys(current_keys))
+
+    def _resolve_software_ids(self, sw_data):
+        """
+        Obtém os IDs dos softwares, enviando ao servidor apenas os desconhecidos
+        ou cujos metadados (fabricante, data_instalacao) mudaram desde o envio
+
+        Args:
+            sw_data: Lista de softwares coletados
+
+        Returns:
+            list: IDs dos softwares (sem repetição)
+        """
+        software_ids = []
+        pending = sw_data
+
+        if self.software_cache is not None:
+            pending = []
+            seen = set()
+            for software in sw_data:
+                key = software_key(software)
+                if key is None or key in seen:
+                    continue
+                seen.add(key)
+                software_id = self.software_cache.get(key, software_metadata(software))
+                if software_id is None:
+                    pending.append(software)
+                else:
+                    software_ids.append(software_id)
+            logger.info(f"Softwares já conhecidos (cache local): {len(software_ids)}, a resolver no servidor: {len(pending)}")
+
+        if pending:
+            logger.info(f"Sincronizando {len(pending)} softwares em lotes (tamanho: {self.batch_sizer.size})...")
+            sw_response = self.client.sync_softwares(
+                pending, max_in_flight=self.max_in_flight, batch_sizer=self.batch_sizer
+            )
+            software_ids.extend(sw_response['software_ids'])
+            logger.info(f"✅ Softwares processados: {sw_response['total']} (erros: {sw_response.get('errors_count', 0)})")
+
+            logger.info(f"Tamanho de lote ajustado para {self.batch_sizer.size}")
+            self.state.set('batch_size', self.batch_sizer.size)
+            self._remember_ids(sw_response['resolved'])
+
+        return list(dict.fromkeys(software_ids))
+
+    def _remember_ids(self, resolved):
+        """
+        Registra no cache local os IDs resolvidos pelo servidor
+
+        Args:
+            resolved: Pares (software, software_id)
+        """
+        if self.software_cache is None or not resolved:
+            return
+        for software, software_id in resolved:
+            key = software_key(software)
+            if key is not None:
+                self.software_cache.put(key, software_id, software_metadata(software))
+        try:
+            self.software_cache.save()
+        except OSError as e:
+            logger.warning(f"Não foi possível salvar o cache de softwares: {e}")
+
+    def _metadata_changed(self, sw_data, added):
+        """
+        Softwares já enviados cujos metadados mudaram (segundo o cache local)
+
+        Args:
+            sw_data: Lista de softwares coletados
+            added: Softwares que já serão enviados como novos
+
+        Returns:
+            list: Softwares a reenviar
+        """
+        if self.software_cache is None:
+            return []
+        skip = {software_key(software) for software in added}
+        changed = []
+        for software in sw_data:
+            key = software_key(software)
+            if key is None or key in skip:
+                continue
+            skip.add(key)
+            if self.software_cache.metadata_changed(key, software_metadata(software)):
+                changed.append(software)
+        return changed
+
+    def _sync_softwares_delta(self, equipamento_id, sw_data):
+        """
+        Envia apenas os softwares adicionados e removidos desde o último inventário
+
+        Args:
+            equipamento_id: ID do equipamento
+            sw_data: Lista de softwares coletados
+
+        Returns:
+            bool: True se o delta foi aceito; False se é preciso sincronizar tudo
+
+        Raises:
+            EquipamentoNotFoundError: Se o servidor não conhecer o equipamento (422);
+                sync descarta o ID salvo e registra o equipamento de novo
+        """
+        previous_keys = self.state.get('softwares')
+        added, removed, current_keys = diff_inventory(sw_data, previous_keys)
+        # Fabricante/data de instalação alterados: reenviar para o servidor atualizar
+        # (o delta só vincula IDs, reenviar um software já vinculado não duplica)
+        added += self._metadata_changed(sw_data, added)
+
+        if added or removed:
+            logger.info(f"Sincronizando delta de softwares (+{len(added)} / -{len(removed)})...")
+            try:
+                response = self.client.sync_softwares_delta(
+                    equipamento_id, inventory_hash(tuple(k) for k in previous_keys), added, removed
+                )
+            except BaseMismatchError as e:
+                logger.warning(f"{e}; delta descartado")
+                return False
+            except requests.HTTPError as e:
+                # Equipamento inexistente já chega como EquipamentoNotFoundError:
+                # aqui o 404 é da rota (servidor sem o endpoint)
+                if e.response is not None and e.response.status_code == 404:
+                    logger.warning("Servidor não suporta sincronização por delta; usando sincronização completa")
+                    self.delta = False
+                    return False
+                raise
+
+            self._remember_ids(match_software_ids(added, {
+                'software_ids': response.get('added_ids', []),
+                'errors': response.get('errors', []),
+            }))
+
+            removed_ids = set(response.get('removed_ids', []))
+            software_ids = [i for i in self.state.get('software_ids', []) if i not in removed_ids]
+            software_ids.extend(i for i in response.get('added_ids', []) if i not in software_ids)
+            self.state.set('software_ids', software_ids)
+            logger.info(f"✅ Delta sincronizado (erros: {response.get('errors_count', 0)})")
+        else:
+            logger.info("✓ Inventário de softwares inalterado (apenas metadados mudaram)")
+
+        self.state.set('softwares', sort_keys(current_keys))
+        return True
+
+    def _reconcile_softwares(self, equipamento_id, sw_data):
+        """
+        Repara o inventário do servidor transferindo apenas os buckets divergentes
+
+        A raiz e os hashes dos buckets do inventário local são enviados; o
+        servidor responde quais buckets diferem dos seus e só os softwares
+        desses buckets são reenviados (o servidor substitui o conteúdo deles).
+
+        Args:
+            equipamento_id: ID do equipamento
+            sw_data: Lista de softwares coletados
+
+        Returns:
+            bool: True se o servidor ficou igual ao inventário local; False se é
+                preciso sincronizar tudo; None se o servidor não suporta reconciliação
+
+        Raises:
+            EquipamentoNotFoundError: Se o servidor não conhecer o equipamento (422)
+        """
+        by_key = {}
+        for software in sw_data:
+            key = software_key(software)
+            if key is not None and key not in by_key:
+                by_key[key] = software
+        tree = InventoryTree(by_key, self.bucket_count)
+
+        try:
+            response = self.client.reconcile_softwares(equipamento_id, tree)
+        except requests.HTTPError as e:
+            # Equipamento inexistente já chega como EquipamentoNotFoundError:
+            # aqui o 404 é da rota (servidor sem reconciliação)
+            if e.response is not None and e.response.status_code == 404:
+                logger.warning("Servidor não suporta reconciliação por buckets")
+                self.reconcile = False
+                return None
+            raise
+
+        if not response.get('match'):
+            differing = sorted(int(i) for i in response.get('buckets', []) if 0 <= int(i) < tree.bucket_count)
+            buckets = {index: [] for index in differing}
+            for key, software in by_key.items():
+                index = bucket_of(key, tree.bucket_count)
+                if index in buckets:
+                    buckets[index].append(software)
+            sent = [software for index in differing for software in buckets[index]]
+            logger.info(f"🌳 Inventário do servidor divergente em {len(differing)}/{tree.bucket_count} buckets; "
+                        f"reenviando {len(sent)} de {len(by_key)} softwares")
+
+            response = self.client.sync_software_buckets(equipamento_id, tree.bucket_count, buckets)
+            if response.get('root') != tree.root:
+                logger.warning("Inventário do servidor ainda divergente após a reconciliação; fazendo sincronização completa")
+                return False
+
+            resolved = match_software_ids(sent, response)
+            self._remember_ids(resolved)
+            removed_ids = set(response.get('removed_ids', []))
+            software_ids = [i for i in self.state.get('software_ids', []) if i not in removed_ids]
+            software_ids.extend(i for i in response.get('software_ids', []) if i not in software_ids)
+            self.state.set('software_ids', software_ids)
+            logger.info(f"✅ Inventário reconciliado ({len(sent)} softwares reenviados)")
+        else:
+            logger.info("✓ Inventário de softwares do servidor confere com o local")
+
+        self.state.set('softwares', sort_keys(by_key))
+        return True
+
+    def _save(self):
+        """
+        Persiste o estado sem interromper a sincronização em caso de falha
+        """
+        try:
+            self.state.save()
+        except OSError as e:
+            logger.warning(f"Não foi possível salvar o estado de sincronização: {e}")
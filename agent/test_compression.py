@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Teste da compressão do corpo das requisições com o servidor local (tools/stub_server.py)
+"""
+import logging
+from api.client import LaravelAPIClient
+from api.compression import (BodyTooLargeError, available_encodings, compress, decompress,
+                             parse_accept_encoding, resolve_setting)
+from tools.stub_server import StubServer
+from utils.records import SoftwareRecord
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def inventory(total):
+    """Inventário de exemplo"""
+    return [
+        SoftwareRecord(f"Microsoft Visual C++ 2015-2022 Redistributable {i}", f"14.{i}",
+                       "Microsoft Corporation", "2024-01-15")
+        for i in range(total)
+    ]
+
+
+def send(server):
+    """Sincroniza equipamento e softwares; devolve a resposta de sync-softwares"""
+    with LaravelAPIClient(server.url, 'teste') as client:
+        client.sync_equipamento({'hostname': 'LAB01-PC01', 'mac_address': 'AA-BB-CC-00-00-01'})
+        return client.sync_softwares(inventory(500), batch_size=500)
+
+
+def test_codec():
+    """gzip ida e volta e leitura do Accept-Encoding"""
+    body = b'{"softwares": []}' * 100
+    ok = check("gzip ida e volta", decompress(compress(body, 'gzip'), 'gzip') == body)
+    ok &= check("Accept-Encoding com q=0", parse_accept_encoding("gzip, zstd;q=0, br") == {'gzip', 'br'})
+    ok &= check("'nenhuma' desliga a compressão", resolve_setting('nenhuma') == ())
+    try:
+        decompress(b'lixo', 'gzip')
+        ok &= check("corpo inválido recusado", False)
+    except ValueError:
+        ok &= check("corpo inválido recusado", True)
+    return ok
+
+
+def test_decompression_limit():
+    """Corpo que expande além do limite é recusado sem ser descomprimido inteiro"""
+    bomb = b'\0' * (8 * 1024 * 1024)
+    ok = True
+    for encoding in available_encodings():
+        try:
+            decompress(compress(bomb, encoding), encoding, max_size=1024 * 1024)
+            ok &= check(f"{encoding}: corpo acima do limite recusado", False)
+        except BodyTooLargeError:
+            ok &= check(f"{encoding}: corpo acima do limite recusado", True)
+        ok &= check(f"{encoding}: corpo no limite aceito",
+                    decompress(compress(bomb[:1024], encoding), encoding, max_size=1024) == bomb[:1024])
+    return ok
+
+
+def test_compressed_after_negotiation():
+    """Lotes grandes vão comprimidos depois que o servidor anuncia suporte"""
+    server = StubServer(encodings=('gzip',)).start()
+    try:
+        plain = StubServer(encodings=()).start()
+        try:
+            expected = send(plain)
+            plain_bytes = plain.bytes_received['sync-softwares']
+        finally:
+            plain.stop()
+
+        response = send(server)
+        sent = server.bytes_received['sync-softwares']
+        ok = check("mesmos IDs com e sem compressão", response['software_ids'] == expected['software_ids'])
+        ok &= check("corpo comprimido bem menor", sent < plain_bytes / 4)
+        ok &= check("sync-equipamento pequeno vai sem compressão",
+                    server.bytes_received['sync-equipamento'] == plain.bytes_received['sync-equipamento'])
+        print(f"   sync-softwares: {plain_bytes} → {sent} bytes")
+    finally:
+        server.stop()
+    return ok
+
+
+def test_server_without_compression():
+    """Servidor sem suporte nunca recebe corpo comprimido"""
+    server = StubServer(encodings=()).start()
+    try:
+        response = send(server)
+        ok = check("sincronização concluída sem compressão", response['total'] == 500)
+    finally:
+        server.stop()
+    return ok
+
+
+def test_rejected_encoding_falls_back():
+    """415 (ex: proxy que recusa gzip) reenvia a mesma requisição sem compressão"""
+    server = StubServer(encodings=('gzip',)).start()
+    client = LaravelAPIClient(server.url, 'teste')
+    try:
+        client.sync_equipamento({'hostname': 'LAB01-PC01', 'mac_address': 'AA-BB-CC-00-00-01'})
+        # O servidor anunciou gzip, mas passa a recusá-lo
+        server.encodings = ()
+        server.reset_stats()
+        response = client.sync_softwares(inventory(500), batch_size=500)
+        ok = check("lote aceito após o 415", response['total'] == 500)
+        ok &= check("uma recusa e um reenvio", server.requests == {'sync-softwares': 2})
+        ok &= check("compressão desativada", client.compressor.encoding() is None)
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+if __name__ == "__main__":
+    logging.getLogger('LabAgent').setLevel(logging.WARNING)
+    results = [
+        test_codec(),
+        test_decompression_limit(),
+        test_compressed_after_negotiation(),
+        test_server_without_compression(),
+        test_rejected_encoding_falls_back(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
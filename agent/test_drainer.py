@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Teste do drenador do spool com o servidor local (tools/stub_server.py)
+"""
+import logging
+import os
+import tempfile
+from api.batching import AdaptiveBatchSizer
+from api.client import LaravelAPIClient
+from sync.drainer import SpoolDrainer
+from sync.synchronizer import InventorySynchronizer
+from tools.stub_server import StubServer
+from utils.fingerprint import section_hashes
+from utils.records import SoftwareRecord
+from utils.spool import SyncSpool
+from utils.state_store import SyncState
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def test_software_waits_for_equipamento():
+    """Snapshot de softwares sem equipamento_id aguarda o snapshot do equipamento"""
+    folder = tempfile.mkdtemp()
+    server = StubServer().start()
+    client = LaravelAPIClient(server.url, 'teste')
+    try:
+        state = SyncState(os.path.join(folder, 'sync_state.json'), 'teste')
+        synchronizer = InventorySynchronizer(client, state, AdaptiveBatchSizer.fixed(50))
+        spool = SyncSpool(os.path.join(folder, 'sync_spool.jsonl'))
+        drainer = SpoolDrainer(spool, synchronizer)
+
+        equipamento = {'hostname': 'LAB01-PC01', 'mac_address': 'AA-BB-CC-00-00-01', 'laboratorio_id': 1}
+        softwares = [SoftwareRecord(f"Aplicativo {i}", "1.0", "Fabricante", None) for i in range(10)]
+        hashes = section_hashes(equipamento, {}, softwares)
+        spool.put('software', {'data': softwares, 'hash': hashes['software']})
+
+        ok = check("nada sincronizado sem o equipamento", drainer.drain() == set())
+        ok &= check("nenhuma requisição enviada", not server.requests)
+        ok &= check("snapshot de softwares mantido no spool", spool.get('software') is not None)
+
+        spool.put('equipamento', {'data': {**equipamento, 'dados_hash': 'x'},
+                                  'hashes': {'hardware': hashes['hardware'], 'rede': hashes['rede']}})
+        synced = drainer.drain()
+        ok &= check("equipamento e softwares sincronizados juntos", {'hardware', 'software'} <= synced)
+        ok &= check("spool vazio", spool.depth() == 0)
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+def test_backoff_after_long_outage():
+    """Muitas falhas seguidas não estouram o cálculo da espera"""
+    folder = tempfile.mkdtemp()
+    spool = SyncSpool(os.path.join(folder, 'sync_spool.jsonl'))
+    drainer = SpoolDrainer(spool, synchronizer=None, base_delay=5.0, max_delay=600)
+    drainer.failures = 5000
+    delay = drainer._next_delay()
+    return check("espera limitada a max_delay", 0 <= delay <= 600)
+
+
+if __name__ == "__main__":
+    logging.getLogger('LabAgent').setLevel(logging.ERROR)
+    results = [
+        test_software_waits_for_equipamento(),
+        test_backoff_after_long_outage(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
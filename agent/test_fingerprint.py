@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Teste e micro-benchmark do hash de conjunto da lista de softwares
+"""
+import random
+import time
+from utils.fingerprint import SetHasher, generate_hash, section_hashes
+from utils.records import SoftwareRecord
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def inventory(total):
+    """Inventário de exemplo"""
+    return [
+        SoftwareRecord(f"Aplicativo {i}", f"1.{i}.0", "Fabricante Exemplo Ltda", "2024-01-15")
+        for i in range(total)
+    ]
+
+
+def timed(func, repeat):
+    """Tempo médio de func() em milissegundos"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def test_set_hash():
+    """Ordem não importa; conteúdo sim"""
+    records = inventory(100)
+    shuffled = records[:]
+    random.Random(1).shuffle(shuffled)
+    hasher = SetHasher()
+    base = hasher.hash(records)
+
+    ok = check("reordenar não altera o hash", SetHasher().hash(shuffled) == base)
+    changed = records[:]
+    changed[10] = changed[10]._replace(versao="9.9")
+    ok &= check("versão alterada altera o hash", hasher.hash(changed) != base)
+    ok &= check("software removido altera o hash", hasher.hash(records[1:]) != base)
+    ok &= check("software adicionado altera o hash", hasher.hash(records + [SoftwareRecord("Novo")]) != base)
+    ok &= check("parcelas de registros removidos descartadas", len(hasher._digests) == 101)
+    ok &= check("campos voláteis ignorados",
+                hasher.hash(changed, ['versao']) == hasher.hash(records, ['versao']))
+    ok &= check("dicionários legados têm o mesmo hash dos registros",
+                section_hashes({}, {}, [r.as_dict() for r in records])['software']
+                == section_hashes({}, {}, records)['software'])
+    return ok
+
+
+def test_incremental():
+    """Em um ciclo sem mudanças nenhum registro é serializado"""
+    records = inventory(1000)
+    hasher = SetHasher()
+    hasher.hash(records)
+    first = hasher.computed
+    hasher.hash(records)
+    ok = check("segunda chamada reaproveita todas as parcelas", hasher.computed == first == 1000)
+    records[0] = records[0]._replace(versao="2.0")
+    hasher.hash(records)
+    ok &= check("apenas o registro alterado é recalculado", hasher.computed == 1001)
+    return ok
+
+
+def benchmark(total, repeat=20):
+    """Compara com generate_hash(lista de dicionários) usado antes"""
+    records = inventory(total)
+    dicts = [r.as_dict() for r in records]
+    old = timed(lambda: generate_hash(dicts), repeat)
+    cold = timed(lambda: SetHasher().hash(records), repeat)
+    hasher = SetHasher()
+    hasher.hash(records)
+    warm = timed(lambda: hasher.hash(records), repeat)
+    print(f"   {total} softwares: generate_hash {old:.2f} ms, "
+          f"SetHasher 1ª vez {cold:.2f} ms, ciclos seguintes {warm:.2f} ms")
+    return check(f"ciclo sem mudanças mais rápido que generate_hash ({total})", warm < old)
+
+
+if __name__ == "__main__":
+    results = [
+        test_set_hash(),
+        test_incremental(),
+        benchmark(500),
+        benchmark(5000),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
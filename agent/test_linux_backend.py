@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Teste dos coletores Linux com arquivos de exemplo (roda em qualquer sistema)
+"""
+import os
+import tempfile
+from collectors.linux import (PackageDatabase, _disk_info, _system_info, default_route,
+                              get_dns_servers, parse_dpkg_status, parse_rpm_output)
+from utils.records import SoftwareRecord
+
+
+DPKG_STATUS = """\
+Package: bash
+Status: install ok installed
+Priority: required
+Maintainer: Matthias Klose <doko@debian.org>
+Version: 5.2.15-2+b2
+Description: GNU Bourne Again SHell
+ Bash is an sh-compatible command language interpreter.
+ .
+ Package: nao-e-um-pacote
+
+Package: vim-removido
+Status: deinstall ok config-files
+Maintainer: Debian Vim Maintainers <team+vim@tracker.debian.org>
+Version: 2:9.0.1378-2
+
+Package: curl
+Status: install ok installed
+Maintainer: Debian Curl Maintainers <team+curl@tracker.debian.org>
+Version: 7.88.1-10+deb12u5"""
+
+RPM_OUTPUT = (
+    "bash\t5.2.15-3.fc38\tFedora Project\t1700000000\n"
+    "gpg-pubkey\t3c3359c4-5c6ae44d\t(none)\t1700000001\n"
+    "quebrado\t1.0\n"
+    "\t1.0-1\tSem nome\t1700000002\n"
+    "sem-data\t2.0-1\tFedora Project\t(none)\n"
+)
+
+# Rota padrão pela wlan0 (métrica 600) e pela eth0 (métrica 100); a rota
+# da rede local e uma rota padrão desativada (flags 0002) são ignoradas
+PROC_ROUTE = """\
+Iface\tDestination\tGateway \tFlags\tRefCnt\tUse\tMetric\tMask\t\tMTU\tWindow\tIRTT
+wlan0\t00000000\t0101A8C0\t0003\t0\t0\t600\t00000000\t0\t0\t0
+eth0\t00000000\t01000A0A\t0003\t0\t0\t100\t00000000\t0\t0\t0
+eth0\t00000A0A\t00000000\t0001\t0\t0\t100\t00FFFFFF\t0\t0\t0
+eth1\t00000000\t01020A0A\t0002\t0\t0\t10\t00000000\t0\t0\t0
+"""
+
+RESOLV_CONF = """\
+# Gerado pelo NetworkManager
+search lab.local
+nameserver 10.10.0.53
+nameserver 8.8.8.8
+"""
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def write(folder, name, content):
+    """Cria um arquivo (e seus diretórios) com o conteúdo"""
+    path = os.path.join(folder, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
+
+
+def test_dpkg_status():
+    """Pacotes instalados do arquivo de status do dpkg"""
+    packages = list(parse_dpkg_status(line + '\n' for line in DPKG_STATUS.split('\n')))
+    ok = check("apenas pacotes instalados", [p.nome for p in packages] == ['bash', 'curl'])
+    ok &= check("versão e mantenedor", packages[0] == SoftwareRecord(
+        'bash', '5.2.15-2+b2', 'Matthias Klose <doko@debian.org>'))
+    ok &= check("último pacote sem linha em branco final", packages[1].versao == '7.88.1-10+deb12u5')
+    return ok
+
+
+def test_rpm_output():
+    """Pacotes da saída do rpm -qa"""
+    packages = parse_rpm_output(RPM_OUTPUT)
+    ok = check("linhas incompletas e sem nome ignoradas",
+               [p.nome for p in packages] == ['bash', 'gpg-pubkey', 'sem-data'])
+    ok &= check("versão com release", packages[0].versao == '5.2.15-3.fc38')
+    ok &= check("data de instalação", packages[0].data_instalacao is not None
+                and len(packages[0].data_instalacao) == 10)
+    ok &= check("fornecedor (none) vira None", packages[1].fabricante is None)
+    ok &= check("data inválida vira None", packages[2].data_instalacao is None)
+    return ok
+
+
+def test_default_route():
+    """Rota padrão de menor métrica em /proc/net/route"""
+    folder = tempfile.mkdtemp()
+    ok = check("interface e gateway da menor métrica",
+               default_route(write(folder, 'route', PROC_ROUTE)) == ('eth0', '10.10.0.1'))
+    header = PROC_ROUTE.split('\n')[0] + '\n'
+    ok &= check("sem rota padrão", default_route(write(folder, 'vazia', header)) == (None, None))
+    ok &= check("arquivo ausente", default_route(os.path.join(folder, 'nao-existe')) == (None, None))
+    ok &= check("servidores DNS", get_dns_servers(write(folder, 'resolv.conf', RESOLV_CONF))
+                == ['10.10.0.53', '8.8.8.8'])
+    return ok
+
+
+def test_disk_info():
+    """Primeiro disco físico em /sys/block"""
+    folder = tempfile.mkdtemp()
+    write(folder, 'loop0/size', '2097152')
+    write(folder, 'nvme0n1/size', str(512 * 1024**3 // 512))
+    write(folder, 'nvme0n1/queue/rotational', '0')
+    write(folder, 'sda/size', str(1024**4 // 512))
+    write(folder, 'sda/queue/rotational', '1')
+    ok = check("loop ignorado, primeiro disco em ordem alfabética", _disk_info(folder) == "512GB SSD")
+
+    folder = tempfile.mkdtemp()
+    write(folder, 'sda/size', '0')
+    write(folder, 'sdb/size', str(1024**4 // 512))
+    write(folder, 'sdb/queue/rotational', '1')
+    ok &= check("disco vazio ignorado, HDD", _disk_info(folder) == "1024GB HDD")
+    ok &= check("sem discos", _disk_info(os.path.join(folder, 'nao-existe')) == "0GB Unknown")
+    return ok
+
+
+def test_dmi():
+    """Fabricante, modelo e série via DMI"""
+    folder = tempfile.mkdtemp()
+    write(folder, 'sys_vendor', 'Dell Inc.\n')
+    write(folder, 'product_name', 'OptiPlex 7090\n')
+    write(folder, 'board_serial', '/ABC123/BR1234/\n')
+    ok = check("board_serial sem acesso ao product_serial", _system_info(folder) == {
+        'fabricante': 'Dell Inc.', 'modelo': 'OptiPlex 7090', 'numero_serie': '/ABC123/BR1234/',
+    })
+    write(folder, 'product_serial', 'SN7090\n')
+    ok &= check("product_serial preferido", _system_info(folder)['numero_serie'] == 'SN7090')
+    ok &= check("sem DMI", _system_info(os.path.join(folder, 'nao-existe')) == {
+        'fabricante': None, 'modelo': None, 'numero_serie': None,
+    })
+    return ok
+
+
+def test_package_database():
+    """Arquivo do dpkg relido só quando muda"""
+    folder = tempfile.mkdtemp()
+    status = write(folder, 'status', DPKG_STATUS + '\n')
+    db = PackageDatabase(dpkg_status=status, rpm_db_files=())
+    first = db.packages()
+    ok = check("pacotes lidos", [p.nome for p in first] == ['bash', 'curl'])
+    ok &= check("sem mudança, lista reaproveitada", db.packages() == first and db.parses == 1)
+
+    write(folder, 'status', DPKG_STATUS + "\n\nPackage: git\nStatus: install ok installed\nVersion: 1:2.39.2-1.1\n")
+    ok &= check("arquivo alterado é relido", [p.nome for p in db.packages()] == ['bash', 'curl', 'git']
+                and db.parses == 2)
+    ok &= check("sem dpkg nem rpm", PackageDatabase(os.path.join(folder, 'nao-existe'), ()).packages() == [])
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_dpkg_status(),
+        test_rpm_output(),
+        test_default_route(),
+        test_disk_info(),
+        test_dmi(),
+        test_package_database(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Teste do simulador de carga (tools/load_simulator.py) com o servidor local
+"""
+import logging
+from tools.load_simulator import FleetGenerator, LoadSimulator, percentile
+from tools.stub_server import StubServer
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def test_percentile():
+    """Percentil pelo posto mais próximo"""
+    values = list(range(1, 101))
+    ok = check("p50 de 1..100", percentile(values, 50) == 50)
+    ok &= check("p99 de 1..100", percentile(values, 99) == 99)
+    ok &= check("lista vazia", percentile([], 95) == 0.0)
+    return ok
+
+
+def test_fleet():
+    """Frota reprodutível, com a sobreposição pedida entre máquinas"""
+    fleet = FleetGenerator(seed=7, catalog_size=500, softwares=100, overlap=0.6)
+    a, b = fleet.machine(0), fleet.machine(1)
+    ok = check("mesma semente, mesma máquina",
+               FleetGenerator(seed=7, catalog_size=500, softwares=100, overlap=0.6).machine(0).softwares == a.softwares)
+    ok &= check("softwares por máquina", len(a.softwares) == 100 and len(set(a.softwares)) == 100)
+    shared = set(a.softwares) & set(b.softwares)
+    ok &= check("máquinas compartilham softwares do catálogo", 0 < len(shared) <= 60)
+    ok &= check("identificação única", a.rede['mac_address'] != b.rede['mac_address']
+                and a.hardware['numero_serie'] != b.hardware['numero_serie'])
+    before = list(a.softwares)
+    changes = a.apply_churn(0.05)
+    ok &= check("churn altera cerca de 5%", changes == 5 and len(set(before) - set(a.softwares)) == 5)
+    return ok
+
+
+def test_storm_and_steady():
+    """Tempestade cadastra todos; regime estável envia só deltas"""
+    server = StubServer().start()
+    fleet = FleetGenerator(seed=1, catalog_size=300, softwares=60)
+    simulator = LoadSimulator(server.url, 'teste', fleet, agents=10, concurrency=5)
+    try:
+        storm = simulator.storm()
+        ok = check("todos os agentes sincronizados", storm['syncs'] == {'ok': 10, 'error': 0})
+        ok &= check("um sync-equipamento por agente", storm['endpoints']['sync-equipamento']['requests'] == 10)
+        ok &= check("equipamentos criados no servidor", len(server.store.equipamentos) == 10)
+        ok &= check("sem erros", all(e['error_rate'] == 0 for e in storm['endpoints'].values()))
+
+        steady = simulator.steady(duration=1.0, interval=0.5, churn=0.05)
+        ok &= check("regime estável usa delta", set(steady['endpoints']) == {'sync-softwares-delta'})
+        stats = steady['endpoints']['sync-softwares-delta']
+        ok &= check("percentis ordenados", 0 < stats['p50'] <= stats['p95'] <= stats['p99'])
+    finally:
+        simulator.close()
+        server.stop()
+    return ok
+
+
+if __name__ == "__main__":
+    logging.getLogger('LabAgent').setLevel(logging.WARNING)
+    results = [
+        test_percentile(),
+        test_fleet(),
+        test_storm_and_steady(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
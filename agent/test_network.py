@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Teste da escolha da interface principal de rede (roda sem rede real)
+"""
+import socket
+from collections import namedtuple
+import psutil
+from collectors import network
+from collectors.network import primary_interface, snapshot_interfaces
+
+
+Addr = namedtuple('Addr', 'family address netmask broadcast ptp')
+Stat = namedtuple('Stat', 'isup duplex speed mtu flags')
+
+
+def nic(ip=None, netmask='255.255.255.0', mac=None):
+    """Endereços de uma interface no formato do psutil"""
+    addrs = []
+    if ip:
+        addrs.append(Addr(socket.AF_INET, ip, netmask, None, None))
+    if mac:
+        addrs.append(Addr(psutil.AF_LINK, mac, None, None, None))
+    return addrs
+
+
+def up(flags='up,broadcast,running'):
+    return Stat(True, 0, 1000, 1500, flags)
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def windows_like():
+    """Ethernet, adaptador de VM e loopback como no Windows"""
+    addrs = {
+        'Ethernet': nic('10.0.5.20', mac='AA-BB-CC-00-00-01'),
+        'VirtualBox Host-Only Network': nic('192.168.56.1', mac='0A-00-27-00-00-05'),
+        'Loopback Pseudo-Interface 1': nic('127.0.0.1', '255.0.0.0'),
+        'Wi-Fi': nic(mac='AA-BB-CC-00-00-02'),
+    }
+    stats = {name: up('') for name in addrs}
+    stats['Wi-Fi'] = Stat(False, 0, 0, 1500, '')
+    return addrs, stats
+
+
+def test_snapshot():
+    """Uma leitura de todas as interfaces ativas"""
+    interfaces = snapshot_interfaces(*windows_like())
+    ok = check("interfaces desligadas ignoradas", 'Wi-Fi' not in interfaces)
+    ok &= check("loopback identificada", interfaces['Loopback Pseudo-Interface 1'].loopback)
+    ok &= check("MAC no formato original", interfaces['Ethernet'].mac == 'AA-BB-CC-00-00-01')
+    return ok
+
+
+def test_primary_selection():
+    """A interface da rota padrão é a principal"""
+    interfaces = snapshot_interfaces(*windows_like())
+    primary, ip = primary_interface(interfaces, gateway='10.0.5.1')
+    ok = check("gateway na sub-rede da Ethernet", primary.name == 'Ethernet' and ip == '10.0.5.20')
+
+    primary, ip = primary_interface(interfaces, route_interface='VirtualBox Host-Only Network')
+    ok &= check("interface da rota padrão (Linux) tem prioridade", ip == '192.168.56.1')
+
+    first = primary_interface(interfaces)
+    addrs, stats = windows_like()
+    reordered = dict(reversed(list(addrs.items())))
+    ok &= check("sem rota padrão: escolha independe da ordem do psutil",
+                primary_interface(snapshot_interfaces(reordered, stats)) == first)
+    ok &= check("loopback nunca é a principal", not first[0].loopback)
+    return ok
+
+
+def test_secondary_changes_ignored():
+    """Mudanças em outras interfaces não alteram o resultado da coleta"""
+    network.cache.configure({'gateway': 0})
+    original_gateway = network.get_default_gateway
+    original_dns = network.get_dns_servers
+    original_lookup = socket.gethostbyname
+    network.get_default_gateway = lambda: '10.0.5.1'
+    network.get_dns_servers = lambda: ['10.0.0.53']
+    lookups = []
+    socket.gethostbyname = lambda name: lookups.append(name) or '127.0.0.1'
+    try:
+        addrs, stats = windows_like()
+        before = network.collect_network(snapshot_interfaces(addrs, stats))
+        addrs['VPN'] = nic('172.16.0.9', mac='00-FF-00-00-00-09')
+        addrs['VirtualBox Host-Only Network'] = nic('192.168.99.1', mac='0A-00-27-00-00-05')
+        stats['VPN'] = up('')
+        after = network.collect_network(snapshot_interfaces(addrs, stats))
+    finally:
+        network.get_default_gateway = original_gateway
+        network.get_dns_servers = original_dns
+        socket.gethostbyname = original_lookup
+        network.cache.configure({'gateway': 60})
+
+    ok = check("IP e MAC da interface principal",
+               before['ip_local'] == '10.0.5.20' and before['mac_address'] == 'AA-BB-CC-00-00-01')
+    ok &= check("VPN/VM alteradas não mudam os dados de rede", before == after)
+    ok &= check("nenhuma consulta DNS", not lookups)
+    return ok
+
+
+def test_gateway_failure_not_cached():
+    """Falha ao ler o gateway vira erro da coleta, sem ficar em cache como ausência de gateway"""
+    def broken():
+        raise OSError("WMI indisponível")
+
+    original_gateway = network.get_default_gateway
+    original_dns = network.get_dns_servers
+    network.get_dns_servers = lambda: []
+    network.cache.invalidate()
+    addrs, stats = windows_like()
+    try:
+        network.get_default_gateway = broken
+        try:
+            network.collect_network(snapshot_interfaces(addrs, stats))
+            ok = check("falha do gateway propagada", False)
+        except OSError:
+            ok = check("falha do gateway propagada", True)
+
+        network.get_default_gateway = lambda: '10.0.5.1'
+        result = network.collect_network(snapshot_interfaces(addrs, stats))
+        ok &= check("próxima coleta lê o gateway de novo", result['gateway'] == '10.0.5.1')
+    finally:
+        network.get_default_gateway = original_gateway
+        network.get_dns_servers = original_dns
+        network.cache.invalidate()
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_snapshot(),
+        test_primary_selection(),
+        test_secondary_changes_ignored(),
+        test_gateway_failure_not_cached(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Teste dos erros e prazos do pipeline de coletores (coletor com falha ou travado)
+"""
+import logging
+import threading
+from collectors import linux
+from collectors.cache import cache
+from collectors.pipeline import CollectorPipeline
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def test_timeout_reports_error():
+    """Prazo estourado devolve o último valor válido com erro (para agendar nova tentativa)"""
+    release = threading.Event()
+    calls = []
+
+    def hardware():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)
+        return {'modelo': f"PC{len(calls)}"}
+
+    def rede():
+        release.wait(5)
+        return {}
+
+    pipeline = CollectorPipeline({'hardware': hardware, 'rede': rede}, timeouts={'hardware': 0.2, 'rede': 0.2})
+    try:
+        first = pipeline.run(['hardware'])['hardware']
+        ok = check("primeira coleta sem erro", first.error is None and first.data == {'modelo': 'PC1'})
+
+        results = pipeline.run()
+        stale = results['hardware']
+        ok &= check("valor anterior marcado como desatualizado", stale.stale and stale.data == {'modelo': 'PC1'})
+        ok &= check("erro de prazo no resultado desatualizado", isinstance(stale.error, TimeoutError))
+        missing = results['rede']
+        ok &= check("sem valor anterior: erro sem dados",
+                    isinstance(missing.error, TimeoutError) and missing.data is None and not missing.stale)
+
+        release.set()
+        fresh = pipeline.run(['hardware'])['hardware']
+        ok &= check("thread substituta coleta de novo", fresh.error is None and fresh.data == {'modelo': 'PC3'})
+    finally:
+        release.set()
+        pipeline.close()
+    return ok
+
+
+def test_collector_failure_reports_error():
+    """Falha do coletor vira erro no resultado, e não um dicionário de Nones"""
+    def broken(*args, **kwargs):
+        raise OSError("interfaces indisponíveis")
+
+    snapshot = linux.snapshot_interfaces
+    linux.snapshot_interfaces = broken
+    cache.invalidate()
+    pipeline = CollectorPipeline({'rede': linux.collect_network})
+    try:
+        result = pipeline.run()['rede']
+        ok = check("erro registrado", isinstance(result.error, OSError))
+        ok &= check("sem dados", result.data is None)
+    finally:
+        linux.snapshot_interfaces = snapshot
+        pipeline.close()
+    return ok
+
+
+if __name__ == "__main__":
+    logging.getLogger('LabAgent').setLevel(logging.ERROR)
+    results = [
+        test_timeout_reports_error(),
+        test_collector_failure_reports_error(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
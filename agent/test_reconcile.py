@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Teste da reconciliação por buckets com o servidor local (tools/stub_server.py)
+"""
+import logging
+import os
+import tempfile
+from api.batching import AdaptiveBatchSizer
+from api.client import LaravelAPIClient
+from sync.synchronizer import InventorySynchronizer
+from tools.stub_server import ROUTES, StubServer
+from utils.fingerprint import section_hashes
+from utils.inventory import InventoryTree
+from utils.records import SoftwareRecord
+from utils.state_store import SyncState
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def inventory(total, start=0):
+    """Inventário de exemplo"""
+    return [
+        SoftwareRecord(f"Aplicativo {i}", f"1.{i}", "Fabricante Exemplo Ltda", "2024-01-15")
+        for i in range(start, start + total)
+    ]
+
+
+def setup(server, delta=True):
+    """Cliente e sincronizador apontando para o servidor local"""
+    client = LaravelAPIClient(server.url, 'teste')
+    state = SyncState(os.path.join(tempfile.mkdtemp(), 'sync_state.json'), 'teste')
+    synchronizer = InventorySynchronizer(client, state, AdaptiveBatchSizer.fixed(200), delta=delta)
+    return client, synchronizer
+
+
+def sync(synchronizer, softwares, reconcile=False):
+    """Sincroniza um equipamento fixo com a lista de softwares"""
+    equipamento = {'hostname': 'LAB01-PC01', 'mac_address': 'AA-BB-CC-00-00-01', 'laboratorio_id': 1}
+    hashes = section_hashes(equipamento, {}, softwares)
+    equipamento = {**equipamento, 'dados_hash': 'x'}
+    return synchronizer.sync(equipamento, softwares, hashes, reconcile=reconcile)
+
+
+def server_matches(server, synchronizer, softwares):
+    """O inventário do servidor é igual ao local"""
+    keys = server.store.installed_keys(synchronizer.state.get('equipamento_id'))
+    return keys == {(s.nome, s.versao) for s in softwares}
+
+
+def test_restore_repaired_by_buckets():
+    """Restauração de backup no servidor é reparada reenviando poucos buckets"""
+    # Sem compressão: compara o tamanho dos dados, não a taxa de compressão
+    server = StubServer(api_key='teste', encodings=()).start()
+    client, synchronizer = setup(server)
+    try:
+        softwares = inventory(2000)
+        sync(synchronizer, softwares)
+        full_bytes = server.bytes_received.get('sync-softwares', 0)
+        backup = server.store.snapshot()
+
+        # Instalações e remoções confirmadas pelo servidor...
+        softwares = softwares[3:] + inventory(5, start=5000)
+        sync(synchronizer, softwares)
+        ok = check("delta aceito antes da restauração", server_matches(server, synchronizer, softwares))
+
+        # ...perdidas com a restauração do backup do banco
+        server.store.restore(backup)
+        server.reset_stats()
+        sync(synchronizer, softwares, reconcile=True)
+        sent = server.bytes_received.get('sync-software-buckets', 0)
+        ok &= check("reconciliação repara o inventário do servidor", server_matches(server, synchronizer, softwares))
+        ok &= check("sem sincronização completa", 'sync-softwares' not in server.requests)
+        ok &= check("reenvio bem menor que o inventário completo", 0 < sent < full_bytes / 5)
+        print(f"   inventário completo: {full_bytes} bytes; buckets reenviados: {sent} bytes "
+              f"(+ {server.bytes_received['reconcile-softwares']} bytes de hashes)")
+
+        server.reset_stats()
+        sync(synchronizer, softwares, reconcile=True)
+        ok &= check("servidor em dia: apenas a raiz é conferida",
+                    server.requests == {'reconcile-softwares': 1})
+        ok &= check("IDs do relacionamento atualizados",
+                    set(synchronizer.state.get('software_ids'))
+                    == server.store.equipamentos[synchronizer.state.get('equipamento_id')]['software_ids'])
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+def test_delta_conflict_uses_buckets():
+    """Delta recusado (409) é resolvido por buckets, sem reenviar tudo"""
+    server = StubServer().start()
+    client, synchronizer = setup(server)
+    try:
+        softwares = inventory(1000)
+        sync(synchronizer, softwares)
+        backup = server.store.snapshot()
+        softwares = softwares[1:]
+        sync(synchronizer, softwares)
+        server.store.restore(backup)
+
+        server.reset_stats()
+        softwares = softwares + inventory(2, start=9000)
+        sync(synchronizer, softwares)
+        ok = check("409 no delta seguido de reconciliação",
+                   'sync-softwares-delta' in server.requests and 'sync-software-buckets' in server.requests)
+        ok &= check("inventário do servidor correto", server_matches(server, synchronizer, softwares))
+        ok &= check("sem sincronização completa", 'sync-softwares' not in server.requests)
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+def test_server_without_reconcile():
+    """Servidor antigo (404): a conferência periódica não vira sincronização completa"""
+    server = StubServer().start()
+    client, synchronizer = setup(server)
+    routes = dict(ROUTES)
+    try:
+        softwares = inventory(100)
+        sync(synchronizer, softwares)
+        del ROUTES['reconcile-softwares']
+        server.reset_stats()
+        sync(synchronizer, softwares, reconcile=True)
+        ok = check("reconciliação desativada após 404", synchronizer.reconcile is False)
+        ok &= check("nenhum reenvio do inventário", 'sync-softwares' not in server.requests)
+    finally:
+        ROUTES.clear()
+        ROUTES.update(routes)
+        client.close()
+        server.stop()
+    return ok
+
+
+def test_reconcile_without_delta():
+    """Com sync.delta desligado a conferência periódica continua usando os buckets"""
+    server = StubServer(api_key='teste').start()
+    client, synchronizer = setup(server, delta=False)
+    try:
+        softwares = inventory(2000)
+        sync(synchronizer, softwares)
+        backup = server.store.snapshot()
+        softwares = softwares[3:] + inventory(5, start=5000)
+        sync(synchronizer, softwares)
+        ok = check("mudança local enviada pela sincronização completa",
+                   'sync-softwares-delta' not in server.requests and server_matches(server, synchronizer, softwares))
+
+        server.store.restore(backup)
+        server.reset_stats()
+        sync(synchronizer, softwares, reconcile=True)
+        ok &= check("reconciliação repara o inventário do servidor", server_matches(server, synchronizer, softwares))
+        ok &= check("sem sincronização completa", 'sync-softwares' not in server.requests)
+
+        server.reset_stats()
+        sync(synchronizer, softwares, reconcile=True)
+        ok &= check("conferência sem divergência não reenvia softwares",
+                    set(server.requests) == {'reconcile-softwares'})
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+def test_server_restored_to_empty():
+    """Banco do servidor restaurado sem o equipamento: o agente o registra de novo"""
+    server = StubServer().start()
+    client, synchronizer = setup(server)
+    try:
+        empty = server.store.snapshot()
+        softwares = inventory(100)
+        sync(synchronizer, softwares)
+
+        server.store.restore(empty)
+        softwares = softwares[1:] + inventory(1, start=9000)
+        server.reset_stats()
+        sync(synchronizer, softwares)
+        ok = check("equipamento registrado de novo",
+                   'sync-equipamento' in server.requests and synchronizer.state.get('equipamento_id') in server.store.equipamentos)
+        ok &= check("inventário do servidor correto", server_matches(server, synchronizer, softwares))
+
+        server.reset_stats()
+        ok &= check("ciclo seguinte sem reenvio", not sync(synchronizer, softwares) and not server.requests)
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+def test_server_restored_during_reconcile():
+    """Equipamento some do servidor sem mudança local: a conferência não fica presa no 422"""
+    server = StubServer().start()
+    client, synchronizer = setup(server)
+    try:
+        empty = server.store.snapshot()
+        softwares = inventory(100)
+        sync(synchronizer, softwares)
+
+        # Só softwares pendentes (como no spool): o ID é descartado e o
+        # equipamento fica para o próximo ciclo
+        server.store.restore(empty)
+        hashes = {section: synchronizer.state.get_hash(section) for section in ('hardware', 'rede', 'software')}
+        synced = synchronizer.sync(None, softwares, hashes, reconcile=True)
+        ok = check("sem dados do equipamento: nada sincronizado", synced == set())
+        ok &= check("ID salvo descartado", synchronizer.state.get('equipamento_id') is None
+                    and synchronizer.state.get_hash('software') is None)
+
+        sync(synchronizer, softwares)
+        server.store.restore(empty)
+        server.reset_stats()
+        sync(synchronizer, softwares, reconcile=True)
+        ok &= check("conferência recusada registra o equipamento de novo",
+                    'reconcile-softwares' in server.requests and 'sync-equipamento' in server.requests)
+        ok &= check("inventário do servidor correto", server_matches(server, synchronizer, softwares))
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+def test_tree():
+    """Árvore independe da ordem e muda só nos buckets afetados"""
+    keys = [(s.nome, s.versao) for s in inventory(500)]
+    tree = InventoryTree(keys, 64)
+    ok = check("ordem não altera a raiz", InventoryTree(reversed(keys), 64).root == tree.root)
+    changed = InventoryTree(keys[1:], 64)
+    differing = [i for i in range(64) if changed.bucket_hashes[i] != tree.bucket_hashes[i]]
+    ok &= check("remover um software altera um único bucket", len(differing) == 1 and changed.root != tree.root)
+    return ok
+
+
+if __name__ == "__main__":
+    logging.getLogger('LabAgent').setLevel(logging.WARNING)
+    results = [
+        test_tree(),
+        test_restore_repaired_by_buckets(),
+        test_delta_conflict_uses_buckets(),
+        test_server_without_reconcile(),
+        test_reconcile_without_delta(),
+        test_server_restored_to_empty(),
+        test_server_restored_during_reconcile(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Teste da varredura incremental do Registry com um registry falso (roda fora do Windows)
+"""
+import sys
+import threading
+import time
+from collectors.software import IncrementalSoftwareScanner, UNINSTALL_KEYS, collect_software
+
+
+class FakeKey:
+    """Handle de chave do registry falso"""
+
+    def __init__(self, node):
+        self.node = node
+
+
+class FakeRegistry:
+    """Registry em memória com a mesma API usada do módulo winreg"""
+
+    HKEY_LOCAL_MACHINE = 'HKLM'
+
+    def __init__(self):
+        self.root = {'subkeys': {}, 'values': {}, 'last_write': 0}
+        self.open_handles = 0
+        self.value_queries = 0
+        self._clock = 0
+
+    def _touch(self, node):
+        self._clock += 1
+        node['last_write'] = self._clock
+
+    def set_key(self, path, values):
+        """Cria/altera uma chave com os valores informados"""
+        node = self.root
+        for part in path.split('\\'):
+            node = node['subkeys'].setdefault(part, {'subkeys': {}, 'values': {}, 'last_write': 0})
+        node['values'] = dict(values)
+        self._touch(node)
+
+    def delete_key(self, path):
+        """Remove uma chave"""
+        *parents, name = path.split('\\')
+        node = self.root
+        for part in parents:
+            node = node['subkeys'][part]
+        del node['subkeys'][name]
+
+    def OpenKey(self, key, sub_key):
+        node = self.root if key == self.HKEY_LOCAL_MACHINE else key.node
+        for part in sub_key.split('\\'):
+            if part not in node['subkeys']:
+                raise FileNotFoundError(sub_key)
+            node = node['subkeys'][part]
+        self.open_handles += 1
+        return FakeKey(node)
+
+    def CloseKey(self, key):
+        self.open_handles -= 1
+
+    def QueryInfoKey(self, key):
+        node = key.node
+        return len(node['subkeys']), len(node['values']), node['last_write']
+
+    def EnumKey(self, key, index):
+        names = sorted(key.node['subkeys'])
+        if index >= len(names):
+            raise OSError("No more data is available")
+        return names[index]
+
+    def QueryValueEx(self, key, name):
+        self.value_queries += 1
+        if name not in key.node['values']:
+            raise FileNotFoundError(name)
+        return key.node['values'][name], 1
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def build_registry(total):
+    """Registry com 'total' softwares divididos entre as duas chaves Uninstall"""
+    reg = FakeRegistry()
+    for i in range(total):
+        path = UNINSTALL_KEYS[i % 2]
+        reg.set_key(f"{path}\\App{i:05d}", {
+            'DisplayName': f"Aplicativo {i}",
+            'DisplayVersion': f"1.{i}",
+            'Publisher': "Fabricante",
+            'InstallDate': "20240115",
+        })
+    # Subchave sem DisplayName (componente interno) e update do Windows
+    reg.set_key(f"{UNINSTALL_KEYS[0]}\\Componente", {'SystemComponent': 1})
+    reg.set_key(f"{UNINSTALL_KEYS[0]}\\KB5034441", {'DisplayName': "Security Update for Windows (KB5034441)"})
+    return reg
+
+
+def test_incremental_scan(total=5000):
+    """Varreduras seguintes só leem subchaves novas ou alteradas"""
+    reg = build_registry(total)
+    scanner = IncrementalSoftwareScanner(registry=reg)
+
+    started = time.perf_counter()
+    first = collect_software(scanner)
+    first_time = time.perf_counter() - started
+    first_queries = reg.value_queries
+
+    ok = check(f"primeira varredura encontra {total} softwares", len(first) == total)
+    ok &= check("todos os handles fechados", reg.open_handles == 0)
+
+    reg.value_queries = 0
+    started = time.perf_counter()
+    second = collect_software(scanner)
+    second_time = time.perf_counter() - started
+    ok &= check("varredura sem mudanças não lê nenhum valor", reg.value_queries == 0 and second == first)
+    print(f"   {first_queries} leituras de valores na 1ª varredura ({first_time * 1000:.0f} ms), "
+          f"0 na 2ª ({second_time * 1000:.0f} ms)")
+
+    # Alterar um, remover outro, adicionar um novo
+    reg.set_key(f"{UNINSTALL_KEYS[0]}\\App00000", {'DisplayName': "Aplicativo 0", 'DisplayVersion': "2.0"})
+    reg.delete_key(f"{UNINSTALL_KEYS[1]}\\App00001")
+    reg.set_key(f"{UNINSTALL_KEYS[1]}\\Novo", {'DisplayName': "Novo App", 'DisplayVersion': "1.0"})
+
+    reg.value_queries = 0
+    reads_before = scanner.reads
+    third = collect_software(scanner)
+    by_name = {s.nome: s for s in third}
+    ok &= check("apenas as 2 subchaves novas/alteradas são relidas", scanner.reads - reads_before == 2)
+    ok &= check("versão alterada refletida", by_name['Aplicativo 0'].versao == "2.0")
+    ok &= check("software removido some da lista", 'Aplicativo 1' not in by_name)
+    ok &= check("software novo aparece na lista", 'Novo App' in by_name)
+    ok &= check("cache sem subchaves removidas",
+                (UNINSTALL_KEYS[1], 'App00001') not in scanner._cache)
+    ok &= check("todos os handles fechados após as varreduras", reg.open_handles == 0)
+    return ok
+
+
+def test_missing_key():
+    """Chave Uninstall inexistente não interrompe a varredura"""
+    reg = FakeRegistry()
+    reg.set_key(f"{UNINSTALL_KEYS[0]}\\App", {'DisplayName': "App", 'DisplayVersion': "1"})
+    result = collect_software(IncrementalSoftwareScanner(registry=reg))
+    return check("WOW6432Node ausente é ignorada", len(result) == 1 and reg.open_handles == 0)
+
+
+def test_concurrent_scans(rounds=20):
+    """Varredura abandonada (prazo estourado) rodando junto com a substituta"""
+    reg = build_registry(2000)
+    errors = []
+
+    def scan(scanner):
+        try:
+            collect_software(scanner)
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(rounds):
+            scanner = IncrementalSoftwareScanner(registry=reg)
+            threads = [threading.Thread(target=scan, args=(scanner,)) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    ok = check("varreduras simultâneas sem erro", not errors)
+    if errors:
+        print(f"   {errors[0]!r}")
+    ok &= check("cache completo", len(scanner._cache) == 2002)
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_incremental_scan(),
+        test_missing_key(),
+        test_concurrent_scans(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
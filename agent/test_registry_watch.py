@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Teste do agrupamento de notificações do monitor do Registry (roda fora do Windows)
+"""
+import time
+from collectors.registry_watch import FakeWatchBackend, SoftwareWatcher
+
+
+def start_watcher(debounce=0.2, max_delay=1.0):
+    """Cria o monitor com backend em memória"""
+    backend = FakeWatchBackend()
+    calls = []
+    watcher = SoftwareWatcher(
+        backend,
+        on_change=lambda: calls.append(time.monotonic()),
+        debounce=debounce,
+        max_delay=max_delay,
+        poll_timeout=0.05,
+    )
+    watcher.start()
+    return backend, watcher, calls
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def test_burst_is_coalesced():
+    """Várias notificações seguidas geram uma única releitura"""
+    backend, watcher, calls = start_watcher()
+    for _ in range(20):
+        backend.notify()
+        time.sleep(0.02)
+    time.sleep(0.5)
+    watcher.stop()
+    watcher.join()
+    ok = check("rajada de 20 notificações gera 1 releitura", len(calls) == 1)
+    ok &= check("aviso de mudança consumido uma vez", watcher.consume_change() and not watcher.consume_change())
+    ok &= check("backend fechado ao parar", backend.closed)
+    return ok
+
+
+def test_separate_bursts():
+    """Grupos separados por silêncio geram releituras separadas"""
+    backend, watcher, calls = start_watcher()
+    backend.notify()
+    time.sleep(0.5)
+    backend.notify(3)
+    time.sleep(0.5)
+    watcher.stop()
+    watcher.join()
+    return check("2 grupos separados geram 2 releituras", len(calls) == 2)
+
+
+def test_max_delay():
+    """Alterações contínuas não adiam a releitura além de max_delay"""
+    backend, watcher, calls = start_watcher(debounce=0.2, max_delay=0.5)
+    started = time.monotonic()
+    while time.monotonic() - started < 1.2:
+        backend.notify()
+        time.sleep(0.05)
+    time.sleep(0.4)
+    watcher.stop()
+    watcher.join()
+    first_delay = calls[0] - started if calls else None
+    ok = check("alterações contínuas geram releituras periódicas", len(calls) >= 2)
+    ok &= check("primeira releitura em até max_delay", first_delay is not None and first_delay < 0.7)
+    return ok
+
+
+def test_backend_failure():
+    """Falha do backend desativa o monitor (volta à varredura periódica)"""
+    class BrokenBackend(FakeWatchBackend):
+        def wait(self, timeout):
+            raise OSError("handle inválido")
+
+    calls = []
+    watcher = SoftwareWatcher(BrokenBackend(), on_change=lambda: calls.append(1), poll_timeout=0.05)
+    watcher.start()
+    watcher.join(timeout=1)
+    ok = check("monitor marcado como inativo", not watcher.active() and watcher.failed)
+    ok &= check("loop principal avisado da falha", calls == [1])
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_burst_is_coalesced(),
+        test_separate_bursts(),
+        test_max_delay(),
+        test_backend_failure(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
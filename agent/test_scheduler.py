@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Teste do agendador de coletas (cadências, deriva, acionamentos e parada)
+"""
+import threading
+import time
+from utils.scheduler import CadenceScheduler
+
+
+class FakeClock:
+    """Relógio controlado pelo teste"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def test_cadences():
+    """Cada coletor roda na sua cadência"""
+    clock = FakeClock()
+    scheduler = CadenceScheduler(clock=clock)
+    scheduler.add('hardware', 86400)
+    scheduler.add('rede', 300)
+    scheduler.add('software', None)
+
+    ok = check("primeiro ciclo roda todos os coletores", scheduler.claim() == ['hardware', 'rede', 'software'])
+    clock.now += 299
+    ok &= check("nada antes da cadência (softwares só quando acionados)", scheduler.claim() == [])
+    clock.now += 1
+    ok &= check("rede a cada 300s", scheduler.claim() == ['rede'])
+    ok &= check("próxima em 300s", scheduler.seconds_until_next() == 300)
+    return ok
+
+
+def test_fixed_rate():
+    """A duração do ciclo não desloca o próximo; atrasos longos são descartados"""
+    clock = FakeClock()
+    scheduler = CadenceScheduler(clock=clock)
+    scheduler.add('rede', 300)
+    start = clock.now
+    scheduler.claim()
+
+    clock.now += 300 + 40  # ciclo anterior demorou 40s além da cadência
+    scheduler.claim()
+    ok = check("sem deriva: próxima marcada pelo horário previsto",
+               clock.now + scheduler.seconds_until_next() == start + 600)
+
+    clock.now = start + 600 + 3 * 300 + 10  # máquina suspensa
+    ok &= check("execuções atrasadas viram uma só", scheduler.claim() == ['rede'] and scheduler.claim() == [])
+    ok &= check("execuções descartadas contadas", scheduler.stats()['rede']['missed'] == 3)
+    ok &= check("grade mantida após o atraso",
+                clock.now + scheduler.seconds_until_next() == start + 600 + 4 * 300)
+    return ok
+
+
+def test_trigger_and_retry():
+    """Acionamento externo e nova tentativa após falha"""
+    clock = FakeClock()
+    scheduler = CadenceScheduler(clock=clock)
+    scheduler.add('hardware', 86400)
+    scheduler.add('software', None)
+    scheduler.claim()
+
+    scheduler.trigger('software')
+    ok = check("acionamento roda apenas o coletor acionado", scheduler.claim() == ['software'])
+    scheduler.trigger('software')
+    ok &= check("acionamento durante a execução gera nova execução", scheduler.claim() == ['software'])
+    ok &= check("acionamento consumido", scheduler.claim() == [])
+
+    scheduler.run_within('hardware', 60)
+    clock.now += 60
+    ok &= check("nova tentativa antes da cadência diária", scheduler.claim() == ['hardware'])
+    ok &= check("cadência retomada após a tentativa", scheduler.seconds_until_next() == 86400)
+    return ok
+
+
+def test_wait_and_stop():
+    """wait() acorda com acionamento e termina prontamente com stop()"""
+    scheduler = CadenceScheduler(poll_timeout=0.05)
+    scheduler.add('rede', 3600, run_now=False)
+
+    threading.Timer(0.1, scheduler.trigger, args=('rede',)).start()
+    started = time.monotonic()
+    woke = scheduler.wait()
+    ok = check("acionamento acorda a espera", woke and time.monotonic() - started < 1 and scheduler.claim() == ['rede'])
+
+    threading.Timer(0.1, scheduler.stop).start()
+    started = time.monotonic()
+    woke = scheduler.wait()
+    ok &= check("stop() encerra a espera de 1 hora imediatamente",
+                not woke and time.monotonic() - started < 1)
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_cadences(),
+        test_fixed_rate(),
+        test_trigger_and_retry(),
+        test_wait_and_stop(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
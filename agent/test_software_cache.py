@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Teste do cache local de IDs de software com o servidor local (tools/stub_server.py)
+"""
+import logging
+import os
+import tempfile
+from api.batching import AdaptiveBatchSizer
+from api.client import LaravelAPIClient
+from sync.synchronizer import InventorySynchronizer
+from tools.stub_server import StubServer
+from utils.fingerprint import section_hashes
+from utils.records import SoftwareRecord
+from utils.software_cache import SoftwareIdCache
+from utils.state_store import SyncState
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def inventory(total):
+    """Inventário de exemplo"""
+    return [
+        SoftwareRecord(f"Aplicativo {i}", f"1.{i}", "Fabricante Exemplo Ltda", "2024-01-15")
+        for i in range(total)
+    ]
+
+
+def setup(server, delta):
+    """Cliente e sincronizador com cache de IDs, apontando para o servidor local"""
+    folder = tempfile.mkdtemp()
+    client = LaravelAPIClient(server.url, 'teste')
+    state = SyncState(os.path.join(folder, 'sync_state.json'), 'teste')
+    cache = SoftwareIdCache(os.path.join(folder, 'software_cache.json'))
+    synchronizer = InventorySynchronizer(client, state, AdaptiveBatchSizer.fixed(50), delta=delta,
+                                         software_cache=cache, reconcile=False)
+    return client, synchronizer
+
+
+def sync(synchronizer, softwares, hardware='PC01'):
+    """Sincroniza um equipamento fixo com a lista de softwares"""
+    equipamento = {'hostname': 'LAB01-PC01', 'mac_address': 'AA-BB-CC-00-00-01', 'laboratorio_id': 1,
+                   'modelo': hardware}
+    hashes = section_hashes(equipamento, {}, softwares)
+    return synchronizer.sync({**equipamento, 'dados_hash': 'x'}, softwares, hashes)
+
+
+def server_software(server, software):
+    """Registro do servidor para um SoftwareRecord"""
+    return server.store.softwares[server.store.software_ids[(software.nome, software.versao)]]
+
+
+def metadata_change_reaches_server(delta):
+    """Fabricante alterado em software com ID em cache chega ao servidor"""
+    mode = 'delta' if delta else 'completa'
+    server = StubServer().start()
+    client, synchronizer = setup(server, delta)
+    try:
+        softwares = inventory(100)
+        sync(synchronizer, softwares)
+        softwares[7] = softwares[7]._replace(fabricante="Novo Fabricante S.A.")
+        server.reset_stats()
+        if not delta:
+            # Sem delta, a sincronização completa resolve os IDs pelo cache
+            synchronizer.state.set_hash('software', None)
+        sync(synchronizer, softwares)
+        ok = check(f"{mode}: fabricante atualizado no servidor",
+                   server_software(server, softwares[7])['fabricante'] == "Novo Fabricante S.A.")
+        sent = server.bytes_received.get('sync-softwares', 0) + server.bytes_received.get('sync-softwares-delta', 0)
+        ok &= check(f"{mode}: apenas o software alterado é reenviado", 0 < sent < 1000)
+        server.reset_stats()
+        sync(synchronizer, softwares, hardware='PC01-NOVO')
+        ok &= check(f"{mode}: sem reenvio quando nada mudou nos softwares",
+                    'sync-softwares' not in server.requests and 'sync-softwares-delta' not in server.requests)
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+def test_metadata_change_reaches_server_full():
+    """Metadados alterados chegam ao servidor pela sincronização completa"""
+    return metadata_change_reaches_server(delta=False)
+
+
+def test_metadata_change_reaches_server_delta():
+    """Metadados alterados chegam ao servidor pelo delta"""
+    return metadata_change_reaches_server(delta=True)
+
+
+def test_trashed_software_restored():
+    """ID em cache de software na lixeira é descartado e o software restaurado"""
+    server = StubServer().start()
+    client, synchronizer = setup(server, delta=False)
+    try:
+        softwares = inventory(20)
+        sync(synchronizer, softwares)
+        trashed_id = server.store.software_ids[(softwares[3].nome, softwares[3].versao)]
+        server.store.trash_software(trashed_id)
+
+        synchronizer.state.set_hash('software', None)
+        sync(synchronizer, softwares)
+        equipamento = server.store.equipamentos[synchronizer.state.get('equipamento_id')]
+        ok = check("software restaurado", server.store.softwares[trashed_id]['trashed'] is False)
+        ok &= check("relacionamento completo", len(equipamento['software_ids']) == 20)
+        ok &= check("cache volta a ter o ID", synchronizer.software_cache.get(
+            (softwares[3].nome, softwares[3].versao)) == trashed_id)
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+if __name__ == "__main__":
+    logging.getLogger('LabAgent').setLevel(logging.ERROR)
+    results = [
+        test_metadata_change_reaches_server_delta(),
+        test_metadata_change_reaches_server_full(),
+        test_trashed_software_restored(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Teste e benchmark do filtro de softwares contra inventários sintéticos grandes
+"""
+import random
+import time
+import collectors.software_filter as software_filter
+from collectors.linux import collect_software
+from collectors.software_filter import SoftwareFilter
+from utils.records import SoftwareRecord
+
+
+# Implementação anterior (is_system_entry), para comparação
+OLD_PATTERNS = ['Update for', 'Hotfix for', 'Security Update', 'KB', 'Microsoft Visual C++']
+
+
+def old_is_system_entry(name):
+    """Busca linear por substring, como antes"""
+    for pattern in OLD_PATTERNS:
+        if pattern in name:
+            return True
+    return False
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def synthetic_inventory(total, seed=42):
+    """Inventário com nomes de software, updates e componentes variados"""
+    rng = random.Random(seed)
+    words = ['Adobe', 'Reader', 'Google', 'Chrome', 'Studio', 'Tools', 'Driver', 'Runtime',
+             'Office', 'Player', 'Pro', 'Suite', 'Client', 'Agent', 'SDK', 'Manager', 'KBase']
+    publishers = ['Adobe Inc.', 'Google LLC', 'Microsoft Corporation', 'Oracle', 'Intel', None]
+    inventory = []
+    for i in range(total):
+        kind = rng.random()
+        if kind < 0.05:
+            nome = f"Security Update for Windows (KB{rng.randint(100000, 9999999)})"
+        elif kind < 0.10:
+            nome = f"Microsoft Visual C++ 20{rng.randint(5, 22):02d} x64 Runtime - 14.{i}"
+        else:
+            nome = ' '.join(rng.choice(words) for _ in range(rng.randint(2, 5))) + f" {i}"
+        inventory.append({'nome': nome, 'versao': f"{i}.0", 'fabricante': rng.choice(publishers)})
+    return inventory
+
+
+def test_rules():
+    """Regras padrão e configuráveis"""
+    f = SoftwareFilter()
+    ok = check("update com número KB é ignorado",
+               f.is_excluded({'nome': "Security Update for Windows (KB5034441)"}))
+    ok &= check("KB5034441 isolado é ignorado", f.is_excluded({'nome': "KB5034441"}))
+    ok &= check("produto com 'KB' no nome é mantido",
+                not f.is_excluded({'nome': "KeePass KBD Tool"}) and not f.is_excluded({'nome': "MKBHD Wallpapers"}))
+    ok &= check("Visual C++ é ignorado",
+                f.is_excluded({'nome': "Microsoft Visual C++ 2015-2022 Redistributable (x64)"}))
+
+    custom = SoftwareFilter.from_config({
+        'excluir': [{'fabricante_igual': 'Intel'}, {'nome_comeca': 'Driver'}],
+        'incluir': [{'nome_regex': r'(?i:graphics)'}],
+    })
+    ok &= check("regra por fabricante (igual)", custom.is_excluded({'nome': "Chipset", 'fabricante': 'Intel'}))
+    ok &= check("igual não casa parcialmente", not custom.is_excluded({'nome': "X", 'fabricante': 'Intel Corp'}))
+    ok &= check("regra comeca", custom.is_excluded({'nome': "Driver Pack"}) and not custom.is_excluded({'nome': "My Driver"}))
+    ok &= check("incluir tem prioridade sobre excluir",
+                not custom.is_excluded({'nome': "Graphics Driver", 'fabricante': 'Intel'}))
+    ok &= check("contadores por regra", custom.stats() == {
+        'excluir fabricante_igual: Intel': 1,
+        'excluir nome_comeca: Driver': 1,
+        'incluir nome_regex: (?i:graphics)': 1,
+    })
+
+    for invalid in ({'nome_regex': '('}, {'nome_regex': '(?i)x'}, {'versao_igual': '1'}):
+        try:
+            SoftwareFilter.from_config({'excluir': [invalid]})
+            ok &= check(f"regra inválida rejeitada: {invalid}", False)
+        except ValueError:
+            ok &= check(f"regra inválida rejeitada: {invalid}", True)
+    return ok
+
+
+def test_paths_agree():
+    """Testes diretos (poucas regras) e regex combinada decidem igual"""
+    inventory = synthetic_inventory(5000)
+    rules = [{'nome_contem': 'Runtime'}, {'nome_comeca': 'Adobe'}, {'fabricante_igual': 'Intel'},
+             {'nome_regex': r'(?i:driver) \d+'}, {'nome_contem': 'Security Update'}]
+    original = software_filter.COMBINED_MIN_RULES
+    try:
+        software_filter.COMBINED_MIN_RULES = 100
+        simple = SoftwareFilter(exclude=rules)
+        software_filter.COMBINED_MIN_RULES = 1
+        combined = SoftwareFilter(exclude=rules)
+    finally:
+        software_filter.COMBINED_MIN_RULES = original
+    ok = check("testes diretos sem regex combinada",
+               all(search is None for search, _ in simple._exclude.matchers.values()))
+    ok &= check("mesmos softwares ignorados",
+                [simple.is_excluded(s) for s in inventory] == [combined.is_excluded(s) for s in inventory])
+    ok &= check("mesmos contadores", simple.stats() == combined.stats())
+    return ok
+
+
+def test_counters_per_collection():
+    """Contadores refletem só a última coleta"""
+    class Packages:
+        def packages(self):
+            return [SoftwareRecord("Security Update for Windows (KB5034441)", "1", None, None),
+                    SoftwareRecord("Editor", "2", None, None)]
+
+    f = SoftwareFilter()
+    for _ in range(3):
+        collected = collect_software(Packages(), f)
+    ok = check("software do sistema ignorado", [s.nome for s in collected] == ["Editor"])
+    ok &= check("contadores zerados a cada coleta", sum(f.stats().values()) == 1)
+    return ok
+
+
+def linear_filter(patterns):
+    """Busca linear por substring com uma lista arbitrária de padrões"""
+    def is_excluded(software):
+        name = software['nome']
+        for pattern in patterns:
+            if pattern in name:
+                return True
+        return False
+    return is_excluded
+
+
+def run_benchmark(label, inventory, old_is_excluded, new_filter):
+    """Mede as duas implementações sobre o mesmo inventário"""
+    started = time.perf_counter()
+    old_kept = [s for s in inventory if not old_is_excluded(s)]
+    old_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    new_kept = [s for s in inventory if not new_filter.is_excluded(s)]
+    new_time = time.perf_counter() - started
+
+    print(f"   {label}: busca linear {old_time * 1000:.1f} ms ({len(old_kept)} mantidos), "
+          f"filtro compilado {new_time * 1000:.1f} ms ({len(new_kept)} mantidos)")
+    return old_kept, new_kept
+
+
+def test_benchmark(total=50000):
+    """Compara o filtro compilado com a busca linear anterior"""
+    inventory = synthetic_inventory(total)
+
+    f = SoftwareFilter()
+    old_kept, new_kept = run_benchmark(
+        f"{total} softwares, 5 regras padrão", inventory,
+        lambda s: old_is_system_entry(s['nome']), f,
+    )
+    for rule, count in sorted(f.stats().items(), key=lambda item: -item[1]):
+        print(f"   {count:6d}  {rule}")
+    ok = check("filtro novo não descarta produtos com 'KB' no nome", len(new_kept) >= len(old_kept))
+
+    # Com muitas regras a busca linear cresce com o número de regras; a
+    # regex combinada continua fazendo uma única busca por software
+    many = OLD_PATTERNS[:3] + [f"Componente Interno {i}" for i in range(60)]
+    old_kept, new_kept = run_benchmark(
+        f"{total} softwares, {len(many)} regras", inventory, linear_filter(many),
+        SoftwareFilter(exclude=[{'nome_contem': p} for p in many]),
+    )
+    ok &= check("mesmo resultado com muitas regras", old_kept == new_kept)
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_rules(),
+        test_paths_agree(),
+        test_counters_per_collection(),
+        test_benchmark(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
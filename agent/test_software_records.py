@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Teste dos registros compactos de software: compatibilidade e uso de memória
+"""
+import json
+import tracemalloc
+from utils.fingerprint import SetHasher, generate_hash, section_hashes
+from utils.records import SoftwareRecord, to_dict, unique_records
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def raw_entries(total):
+    """Entradas como lidas do Registry (10% duplicadas)"""
+    for i in range(total):
+        n = i if i % 10 else i - 1
+        yield (f"Aplicativo {n}", f"1.{n}.0", "Fabricante Exemplo Ltda", "2024-01-15")
+
+
+def old_path(total):
+    """Caminho antigo: lista de dicionários, segunda lista sem duplicatas e hash"""
+    softwares = [
+        {'nome': nome, 'versao': versao, 'fabricante': fabricante, 'data_instalacao': data}
+        for nome, versao, fabricante, data in raw_entries(total)
+    ]
+    unique = []
+    seen = set()
+    for sw in softwares:
+        key = (sw['nome'], sw['versao'])
+        if key not in seen:
+            seen.add(key)
+            unique.append(sw)
+    return unique, generate_hash(unique)
+
+
+def new_path(total):
+    """Caminho novo: registros em fluxo, sem duplicatas, hash de conjunto"""
+    records = list(unique_records(SoftwareRecord(*entry) for entry in raw_entries(total)))
+    return records, SetHasher().hash(records)
+
+
+def measure(func, total):
+    """Executa func medindo o pico e a memória retida pelo resultado"""
+    tracemalloc.start()
+    result = func(total)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, peak
+
+
+def test_compatibility():
+    """Hash e formato da API iguais aos de antes"""
+    records = [SoftwareRecord("App", "1.0", "Fab", "2024-01-15"), SoftwareRecord("Outro")]
+    dicts = [r.as_dict() for r in records]
+    ok = check("hash da seção software não muda",
+                section_hashes({}, {}, records)['software'] == section_hashes({}, {}, dicts)['software'])
+    ok &= check("to_dict devolve o formato da API", to_dict(records[0]) == {
+        'nome': "App", 'versao': "1.0", 'fabricante': "Fab", 'data_instalacao': "2024-01-15"})
+    spooled = json.loads(json.dumps(records))
+    ok &= check("spool guarda listas e reconstrói os registros",
+                [SoftwareRecord.from_value(v) for v in spooled] == records)
+    ok &= check("linhas antigas do spool (dicionários) continuam legíveis",
+                SoftwareRecord.from_value(dicts[1]) == records[1])
+    return ok
+
+
+def test_memory(total=5000):
+    """Compara o uso de memória dos dois caminhos"""
+    (old, _), old_retained, old_peak = measure(old_path, total)
+    (new, new_hash), new_retained, new_peak = measure(new_path, total)
+
+    ok = check("mesmos softwares e mesmo hash da seção", [to_dict(r) for r in new] == old
+               and new_hash == section_hashes({}, {}, old)['software'])
+    print(f"   {total} entradas ({len(new)} únicas)")
+    print(f"   antigo: pico {old_peak / 1024:.0f} KiB, retido {old_retained / 1024:.0f} KiB")
+    print(f"   novo:   pico {new_peak / 1024:.0f} KiB, retido {new_retained / 1024:.0f} KiB")
+    ok &= check("pico de memória menor", new_peak < old_peak)
+    ok &= check("memória retida menor", new_retained < old_retained)
+    return ok
+
+
+if __name__ == "__main__":
+    results = [
+        test_compatibility(),
+        test_memory(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Teste do servidor local (tools/stub_server.py) e da injeção de falhas
+"""
+import logging
+import time
+import requests
+from api.batching import AdaptiveBatchSizer
+from api.client import LaravelAPIClient, invalid_software_ids
+from api.retry import CircuitBreaker, RetryPolicy
+from tools.stub_server import FaultInjector, StubServer
+from utils.records import SoftwareRecord
+
+
+def check(description, condition):
+    """Exibe o resultado de uma verificação"""
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def inventory(total):
+    """Inventário de exemplo"""
+    return [SoftwareRecord(f"Aplicativo {i}", f"1.{i}", "Fabricante Exemplo Ltda", "2024-01-15") for i in range(total)]
+
+
+def fast_client(server, attempts=3):
+    """Cliente com esperas curtas entre tentativas"""
+    return LaravelAPIClient(server.url, 'teste',
+                            retry_policy=RetryPolicy(max_attempts=attempts, base_delay=0.01, max_delay=0.02))
+
+
+EQUIPAMENTO = {'hostname': 'LAB01-PC01', 'numero_serie': 'SN123', 'mac_address': 'AA-BB-CC-00-00-01',
+               'laboratorio_id': 1, 'dados_hash': 'x'}
+
+
+def test_contracts():
+    """Mesmas respostas dos três endpoints do AgentController"""
+    server = StubServer(api_key='teste').start()
+    client = fast_client(server)
+    try:
+        created = client.sync_equipamento(EQUIPAMENTO)
+        updated = client.sync_equipamento({**EQUIPAMENTO, 'hostname': 'LAB01-PC01-NOVO'})
+        ok = check("equipamento criado e depois atualizado",
+                   created['action'] == 'created' and updated == {**created, 'action': 'updated'})
+        softwares = client.sync_softwares(inventory(30), batch_size=10)
+        ok &= check("IDs na ordem dos softwares", softwares['software_ids'] == list(range(1, 31)))
+        response = client.sync_equipamento_softwares(created['equipamento_id'], softwares['software_ids'])
+        ok &= check("relacionamento sincronizado", response['total_softwares'] == 30)
+        try:
+            client.sync_equipamento_softwares(created['equipamento_id'], [1, 999])
+            ok &= check("ID desconhecido recusado com 422", False)
+        except requests.HTTPError as e:
+            ok &= check("ID desconhecido recusado com 422", invalid_software_ids(e, [1, 999]) == [999])
+        wrong_key = LaravelAPIClient(server.url, 'errada')
+        try:
+            wrong_key.sync_equipamento(EQUIPAMENTO)
+            ok &= check("API Key inválida recusada", False)
+        except requests.HTTPError as e:
+            ok &= check("API Key inválida recusada", e.response.status_code == 401)
+        finally:
+            wrong_key.close()
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+def test_deterministic_faults():
+    """Mesma semente, mesmas falhas na mesma sequência de requisições"""
+    def draws(seed):
+        faults = FaultInjector(error_rate=0.2, throttle_rate=0.2, drop_rate=0.2, jitter=0.1, seed=seed)
+        return [faults.draw(endpoint, 100) for endpoint in ['sync-softwares', 'sync-equipamento'] * 50]
+
+    ok = check("sequência reproduzida", draws(7) == draws(7))
+    ok &= check("outra semente, outra sequência", draws(7) != draws(8))
+    faults = FaultInjector(seed=1)
+    first = [faults.draw('sync-softwares', 10) for _ in range(5)]
+    faults = FaultInjector(seed=1)
+    mixed = []
+    for _ in range(5):
+        faults.draw('sync-equipamento', 10)
+        mixed.append(faults.draw('sync-softwares', 10))
+    ok &= check("outros endpoints não alteram o sorteio", first == mixed)
+    return ok
+
+
+def test_retries_under_faults():
+    """Cliente conclui a sincronização com 5xx, 429 e conexões derrubadas"""
+    def run():
+        faults = FaultInjector(error_rate=0.15, throttle_rate=0.15, retry_after=0, drop_rate=0.1, seed=3)
+        server = StubServer(faults=faults).start()
+        client = fast_client(server, attempts=10)
+        try:
+            response = client.sync_softwares(inventory(200), batch_size=10)
+            return response, dict(faults.counts), dict(server.requests)
+        finally:
+            client.close()
+            server.stop()
+
+    response, counts, requests_seen = run()
+    ok = check("todos os softwares sincronizados", response['software_ids'] == list(range(1, 201)))
+    ok &= check("falhas de todos os tipos injetadas", set(counts) == {'error', 'throttle', 'drop'})
+    ok &= check("novas tentativas enviadas", requests_seen['sync-softwares'] == 20 + sum(counts.values()))
+    print(f"   falhas: {counts}")
+    ok &= check("execução reproduzível", run()[1] == counts)
+    return ok
+
+
+def test_adaptive_batches_retry_transient_faults():
+    """Lotes divisíveis repetem quedas de conexão e 429 em vez de abortar"""
+    ok = True
+    for description, options in (
+        ("conexões derrubadas", {'drop_rate': 0.3}),
+        ("429 com Retry-After", {'throttle_rate': 0.3, 'retry_after': 0}),
+    ):
+        faults = FaultInjector(seed=5, **options)
+        server = StubServer(faults=faults).start()
+        client = fast_client(server, attempts=5)
+        try:
+            sizer = AdaptiveBatchSizer(initial_size=25, min_size=5)
+            response = client.sync_softwares(inventory(200), batch_sizer=sizer)
+            ok &= check(f"{description}: todos os softwares sincronizados",
+                        response['software_ids'] == list(range(1, 201)) and sum(faults.counts.values()) > 0)
+            ok &= check(f"{description}: lote não dividido", sizer.size >= 25)
+        except requests.RequestException as e:
+            ok &= check(f"{description}: todos os softwares sincronizados ({e})", False)
+        finally:
+            client.close()
+            server.stop()
+
+    faults = FaultInjector(seed=5, error_rate=0.3)
+    server = StubServer(faults=faults).start()
+    client = fast_client(server, attempts=5)
+    try:
+        sizer = AdaptiveBatchSizer(initial_size=25, min_size=5)
+        response = client.sync_softwares(inventory(200), batch_sizer=sizer)
+        ok &= check("5xx: lotes divididos e reenviados",
+                    response['software_ids'] == list(range(1, 201)) and faults.counts['error'] > 0)
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+def test_circuit_probe_released():
+    """Requisição de teste que falha fora de RequestException não prende o circuito"""
+    server = StubServer().start()
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+    client = LaravelAPIClient(server.url, 'teste', circuit_breaker=breaker)
+    send = client._send
+
+    def broken_send(*args):
+        raise ValueError("falha local")
+
+    try:
+        breaker.record_failure()
+        time.sleep(0.06)
+        client._send = broken_send
+        try:
+            client.sync_equipamento(EQUIPAMENTO)
+        except ValueError:
+            pass
+        ok = check("teste sem resultado libera o circuito", breaker.state != CircuitBreaker.HALF_OPEN)
+        client._send = send
+        ok &= check("próxima requisição é o novo teste", client.sync_equipamento(EQUIPAMENTO)['action'] == 'created')
+        ok &= check("circuito fechado", breaker.state == CircuitBreaker.CLOSED)
+
+        # Sem liberação, o teste preso expira após outro período de espera
+        breaker.record_failure()
+        time.sleep(0.06)
+        ok &= check("primeiro teste liberado", breaker.allow())
+        ok &= check("segundo teste bloqueado enquanto o primeiro está em curso", not breaker.allow())
+        time.sleep(0.06)
+        ok &= check("teste preso expira", breaker.allow())
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+def test_body_limit_splits_batches():
+    """413 acima do limite de corpo faz o cliente dividir os lotes"""
+    faults = FaultInjector(max_body_bytes=2048)
+    server = StubServer(faults=faults, encodings=()).start()
+    client = fast_client(server)
+    try:
+        sizer = AdaptiveBatchSizer(initial_size=100, min_size=5)
+        response = client.sync_softwares(inventory(100), batch_sizer=sizer)
+        ok = check("lotes divididos até caber no limite", faults.counts.get('too_large', 0) > 0)
+        ok &= check("todos os softwares sincronizados", response['total'] == 100)
+        ok &= check("tamanho de lote reduzido", sizer.size < 100)
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+def test_latency():
+    """Latência injetada aparece no tempo de resposta"""
+    server = StubServer(faults=FaultInjector(latency=0.05, latency_per_kb=0.01)).start()
+    client = fast_client(server)
+    try:
+        started = time.monotonic()
+        client.sync_equipamento(EQUIPAMENTO)
+        ok = check("latência fixa aplicada", time.monotonic() - started >= 0.05)
+    finally:
+        client.close()
+        server.stop()
+    return ok
+
+
+if __name__ == "__main__":
+    logging.getLogger('LabAgent').setLevel(logging.ERROR)
+    results = [
+        test_contracts(),
+        test_deterministic_faults(),
+        test_retries_under_faults(),
+        test_adaptive_batches_retry_transient_faults(),
+        test_circuit_probe_released(),
+        test_body_limit_splits_batches(),
+        test_latency(),
+    ]
+    print("\n✅ Todos os testes passaram!" if all(results) else "\n❌ Há testes com falha!")
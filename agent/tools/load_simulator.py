@@ -0,0 +1,569 @@
+"""
+Simulador de carga: N agentes sincronizando ao mesmo tempo com a API
+
+Cada agente simulado tem hardware e inventário de softwares sintéticos e usa
+o mesmo caminho do agente real (LaravelAPIClient + InventorySynchronizer),
+então o servidor recebe exatamente as requisições de uma frota de verdade.
+
+Cenários:
+    tempestade  todos os agentes fazem a primeira sincronização ao mesmo
+                tempo (ex: início do semestre, laboratório inteiro ligado)
+    estavel     cada agente sincroniza a cada --intervalo segundos, com fases
+                espalhadas, e a cada ciclo uma fração (--churn) dos softwares
+                muda (atualizações, instalações e remoções)
+    ambos       tempestade seguida do regime estável (padrão)
+
+Ao final, cada fase mostra por endpoint: requisições, vazão, latência
+p50/p95/p99 e taxa de erro.
+
+Uso (a partir da pasta agent):
+    python -m tools.load_simulator --agentes 200
+    python -m tools.load_simulator --agentes 200 --latencia-ms 50 --taxa-429 0.05 --semente 1
+    python -m tools.load_simulator --url http://servidor/api/v1/agent --api-key CHAVE \\
+        --laboratorio-ids 1,2,3 --agentes 300 --cenario tempestade
+"""
+import argparse
+import heapq
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from api.batching import AdaptiveBatchSizer
+from api.client import LaravelAPIClient
+from sync.synchronizer import InventorySynchronizer
+from tools.stub_server import StubServer, add_fault_arguments, faults_from_args
+from utils.fingerprint import equipamento_hash, section_hashes
+from utils.records import SoftwareRecord
+from utils.software_cache import SoftwareIdCache
+from utils.state_store import SyncState
+
+
+logger = logging.getLogger('LabAgent')
+
+# Fabricantes e produtos usados no catálogo sintético
+VENDORS = (
+    ('Microsoft Corporation', ('Microsoft Visual C++ Redistributable', 'Microsoft Office', 'Microsoft Edge',
+                               'Microsoft Teams', 'Microsoft .NET Runtime', 'Visual Studio Code',
+                               'SQL Server Management Studio', 'Windows SDK')),
+    ('Google LLC', ('Google Chrome', 'Google Drive', 'Android Studio')),
+    ('Mozilla', ('Mozilla Firefox', 'Mozilla Thunderbird')),
+    ('Adobe Inc.', ('Adobe Acrobat Reader', 'Adobe Photoshop', 'Adobe Illustrator')),
+    ('Oracle Corporation', ('Java Runtime Environment', 'Oracle VM VirtualBox', 'MySQL Workbench')),
+    ('Python Software Foundation', ('Python', 'Python Launcher')),
+    ('JetBrains s.r.o.', ('PyCharm Community Edition', 'IntelliJ IDEA Community Edition')),
+    ('The Git Development Community', ('Git',)),
+    ('VideoLAN', ('VLC media player',)),
+    ('Autodesk, Inc.', ('AutoCAD', 'Autodesk Revit')),
+    ('Igor Pavlov', ('7-Zip',)),
+    ('The LibreOffice Community', ('LibreOffice',)),
+    ('Cisco Systems, Inc.', ('Cisco Packet Tracer',)),
+    ('Arduino LLC', ('Arduino IDE',)),
+)
+
+MODELS = (
+    ('Dell Inc.', 'OptiPlex 7090'), ('Dell Inc.', 'OptiPlex 3080'),
+    ('LENOVO', 'ThinkCentre M70q'), ('HP', 'ProDesk 400 G7'), ('Positivo Tecnologia SA', 'Master D3400'),
+)
+
+CPUS = (
+    'Intel(R) Core(TM) i5-10500 CPU @ 3.10GHz',
+    'Intel(R) Core(TM) i7-11700 @ 2.50GHz',
+    'AMD Ryzen 5 5600G with Radeon Graphics',
+)
+
+
+def percentile(values, p):
+    """
+    Percentil pelo método do posto mais próximo
+
+    Args:
+        values: Lista ordenada de valores
+        p: Percentil (0 a 100)
+
+    Returns:
+        float: Valor do percentil (0 se a lista estiver vazia)
+    """
+    if not values:
+        return 0.0
+    rank = max(int(-(-p * len(values) // 100)), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+class LoadRecorder:
+    """Latência e resultado de cada requisição, agrupados por fase e endpoint"""
+
+    def __init__(self):
+        """
+        Inicializa o registro vazio
+        """
+        self._lock = threading.Lock()
+        self.phases = {}
+        self._phase = None
+
+    def start_phase(self, name):
+        """
+        Inicia uma fase (as próximas amostras são atribuídas a ela)
+
+        Args:
+            name: Nome da fase
+        """
+        with self._lock:
+            self._phase = {
+                'started': time.monotonic(), 'finished': None,
+                'samples': {}, 'syncs': {'ok': 0, 'error': 0},
+            }
+            self.phases[name] = self._phase
+
+    def finish_phase(self):
+        """
+        Encerra a fase atual
+        """
+        with self._lock:
+            self._phase['finished'] = time.monotonic()
+
+    def record(self, endpoint, seconds, status, size):
+        """
+        Registra uma requisição
+
+        Args:
+            endpoint: Endpoint da API
+            seconds: Duração da requisição
+            status: Status HTTP ou 'error' (falha de rede/timeout)
+            size: Bytes do corpo JSON enviado
+        """
+        with self._lock:
+            self._phase['samples'].setdefault(endpoint, []).append((seconds, status, size))
+
+    def record_sync(self, ok):
+        """
+        Registra o resultado de um ciclo de sincronização de um agente
+
+        Args:
+            ok: Se o ciclo terminou sem erro
+        """
+        with self._lock:
+            self._phase['syncs']['ok' if ok else 'error'] += 1
+
+    def summary(self, name):
+        """
+        Resumo de uma fase
+
+        Args:
+            name: Nome da fase
+
+        Returns:
+            dict: duration, syncs e, por endpoint, requests, throughput,
+                p50/p95/p99 (ms), error_rate, status e bytes
+        """
+        with self._lock:
+            phase = self.phases[name]
+            samples = {endpoint: list(values) for endpoint, values in phase['samples'].items()}
+            syncs = dict(phase['syncs'])
+            duration = (phase['finished'] or time.monotonic()) - phase['started']
+
+        endpoints = {}
+        for endpoint, values in sorted(samples.items()):
+            latencies = sorted(seconds * 1000 for seconds, _, _ in values)
+            status = {}
+            for _, code, _ in values:
+                status[str(code)] = status.get(str(code), 0) + 1
+            # 409 faz parte do protocolo (delta com base divergente), não é falha
+            errors = sum(1 for _, code, _ in values if code == 'error' or (code >= 400 and code != 409))
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'throughput': len(values) / duration if duration > 0 else 0.0,
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'error_rate': errors / len(values),
+                'status': status,
+                'bytes': sum(size for _, _, size in values),
+            }
+        return {'duration': duration, 'syncs': syncs, 'endpoints': endpoints}
+
+
+class TimedClient(LaravelAPIClient):
+    """LaravelAPIClient que registra a latência de cada requisição enviada"""
+
+    def __init__(self, recorder, *args, **kwargs):
+        """
+        Inicializa o cliente
+
+        Args:
+            recorder: LoadRecorder que recebe as amostras
+            *args, **kwargs: Argumentos do LaravelAPIClient
+        """
+        super().__init__(*args, **kwargs)
+        self.recorder = recorder
+
+    def _send(self, method, url, endpoint, body):
+        """
+        Envia a requisição medindo a duração (cada nova tentativa é uma amostra)
+        """
+        started = time.monotonic()
+        try:
+            response = super()._send(method, url, endpoint, body)
+        except requests.RequestException:
+            self.recorder.record(endpoint, time.monotonic() - started, 'error', len(body or b''))
+            raise
+        self.recorder.record(endpoint, time.monotonic() - started, response.status_code, len(body or b''))
+        return response
+
+
+class FleetGenerator:
+    """Gera máquinas com hardware e softwares sintéticos, de forma reprodutível"""
+
+    def __init__(self, seed=42, catalog_size=1500, softwares=250, overlap=0.8, lab_ids=(1,)):
+        """
+        Inicializa o gerador
+
+        Args:
+            seed: Semente (mesma semente = mesma frota)
+            catalog_size: Softwares distintos no catálogo compartilhado
+            softwares: Softwares por máquina
+            overlap: Fração dos softwares de cada máquina tirada do catálogo
+                compartilhado (o restante é exclusivo da máquina)
+            lab_ids: IDs dos laboratórios (existentes no servidor) distribuídos
+                entre as máquinas
+        """
+        self.seed = seed
+        self.softwares = softwares
+        self.overlap = overlap
+        self.lab_ids = tuple(lab_ids)
+        self.catalog = self._catalog(random.Random(f"{seed}-catalogo"), catalog_size)
+        # Popularidade decrescente: poucos softwares estão em quase todas as máquinas
+        self.weights = [1.0 / (rank + 1) ** 0.7 for rank in range(len(self.catalog))]
+
+    @staticmethod
+    def _catalog(rng, size):
+        """Catálogo de softwares, cada um com uma versão fixa (a da imagem dos laboratórios)"""
+        products = [(vendor, name) for vendor, names in VENDORS for name in names]
+        catalog = []
+        for i in range(size):
+            vendor, name = products[i % len(products)]
+            generation = i // len(products)
+            if generation:
+                name = f"{name} {2010 + generation % 15} ({generation})"
+            version = f"{rng.randint(1, 30)}.{rng.randint(0, 20)}.{rng.randint(0, 40000)}"
+            catalog.append(SoftwareRecord(name, version, vendor, f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"))
+        return catalog
+
+    def machine(self, index):
+        """
+        Gera uma máquina
+
+        Args:
+            index: Número da máquina na frota
+
+        Returns:
+            SimulatedMachine: Máquina com hardware, rede e softwares
+        """
+        rng = random.Random(f"{self.seed}-{index}")
+        lab_id = self.lab_ids[index % len(self.lab_ids)]
+        hostname = f"SIM-LAB{lab_id:02d}-PC{index:04d}"
+        fabricante, modelo = rng.choice(MODELS)
+        hardware = {
+            'hostname': hostname,
+            'numero_serie': f"SIM{self.seed:04d}{index:06d}",
+            'fabricante': fabricante,
+            'modelo': modelo,
+            'processador': rng.choice(CPUS),
+            'memoria_ram': rng.choice(('8 GB', '16 GB', '32 GB')),
+            'disco': rng.choice(('256 GB', '512 GB', '1 TB')),
+            'laboratorio_id': lab_id,
+        }
+        rede = {
+            'ip_local': f"10.{lab_id % 256}.{index // 250 % 256}.{index % 250 + 2}",
+            # Bit "localmente administrado": não colide com placas reais
+            'mac_address': f"02-{self.seed % 256:02X}-" + '-'.join(f"{b:02X}" for b in index.to_bytes(4, 'big')),
+            'gateway': f"10.{lab_id % 256}.0.1",
+            'dns_servers': ['10.0.0.10', '10.0.0.11'],
+        }
+
+        shared = round(self.softwares * self.overlap)
+        # Amostragem ponderada sem reposição (Efraimidis-Spirakis)
+        keys = sorted(range(len(self.catalog)), key=lambda i: rng.random() ** (1.0 / self.weights[i]), reverse=True)
+        softwares = [self.catalog[i] for i in keys[:shared]]
+        softwares += [
+            SoftwareRecord(f"Ferramenta {hostname} {j}", f"1.0.{j}", 'Laboratório', '2024-02-01')
+            for j in range(self.softwares - len(softwares))
+        ]
+        return SimulatedMachine(hardware, rede, softwares, rng, self)
+
+
+class SimulatedMachine:
+    """Inventário de uma máquina simulada, que muda a cada ciclo conforme o churn"""
+
+    def __init__(self, hardware, rede, softwares, rng, fleet):
+        """
+        Inicializa a máquina
+
+        Args:
+            hardware: Dados de hardware (com laboratorio_id)
+            rede: Dados de rede
+            softwares: Lista de SoftwareRecord
+            rng: random.Random próprio da máquina
+            fleet: FleetGenerator (catálogo para novas instalações)
+        """
+        self.hardware = hardware
+        self.rede = rede
+        self.softwares = softwares
+        self.rng = rng
+        self.fleet = fleet
+        self._installed = 0
+
+    def apply_churn(self, rate):
+        """
+        Altera uma fração dos softwares: metade atualizações de versão, metade
+        remoções seguidas da instalação de outro software
+
+        Args:
+            rate: Fração esperada de softwares alterados
+
+        Returns:
+            int: Quantidade de alterações
+        """
+        expected = len(self.softwares) * rate
+        changes = int(expected) + (1 if self.rng.random() < expected - int(expected) else 0)
+        installed = {(s.nome, s.versao) for s in self.softwares}
+        for _ in range(changes):
+            index = self.rng.randrange(len(self.softwares))
+            old = self.softwares[index]
+            if self.rng.random() < 0.5:
+                new = old._replace(versao=f"{old.versao}.{self.rng.randint(1, 9)}")
+            else:
+                new = self.rng.choice(self.fleet.catalog)
+                if (new.nome, new.versao) in installed:
+                    self._installed += 1
+                    new = SoftwareRecord(f"Instalado {self.hardware['hostname']} {self._installed}",
+                                         '1.0', 'Laboratório', '2024-03-01')
+            installed.discard((old.nome, old.versao))
+            installed.add((new.nome, new.versao))
+            self.softwares[index] = new
+        return changes
+
+
+class SimulatedAgent:
+    """Um agente: máquina sintética + cliente + sincronizador com estado próprio"""
+
+    def __init__(self, machine, client, state_dir, delta=True):
+        """
+        Inicializa o agente
+
+        Args:
+            machine: SimulatedMachine
+            client: TimedClient exclusivo do agente
+            state_dir: Pasta do estado (sync_state.json e cache de IDs)
+            delta: Usar sincronização por delta
+        """
+        self.machine = machine
+        self.client = client
+        state = SyncState(os.path.join(state_dir, 'sync_state.json'), 'simulador')
+        cache = SoftwareIdCache(os.path.join(state_dir, 'software_cache.json'))
+        self.synchronizer = InventorySynchronizer(client, state, AdaptiveBatchSizer(), delta=delta,
+                                                  software_cache=cache)
+        self.busy = threading.Lock()
+
+    def cycle(self, churn=0.0):
+        """
+        Executa um ciclo de sincronização (como o do agent.py)
+
+        Args:
+            churn: Fração dos softwares alterados antes do ciclo
+
+        Returns:
+            set: Seções sincronizadas
+        """
+        if churn:
+            self.machine.apply_churn(churn)
+        softwares = list(self.machine.softwares)
+        hashes = section_hashes(self.machine.hardware, self.machine.rede, softwares)
+        equipamento_data = {**self.machine.hardware, **self.machine.rede, 'dados_hash': equipamento_hash(hashes)}
+        return self.synchronizer.sync(equipamento_data, softwares, hashes)
+
+
+class LoadSimulator:
+    """Executa os cenários de carga contra uma URL da API"""
+
+    def __init__(self, url, api_key, fleet, agents, concurrency=50, timeout=60):
+        """
+        Inicializa o simulador
+
+        Args:
+            url: URL base da API do agente
+            api_key: API Key enviada pelos agentes
+            fleet: FleetGenerator
+            agents: Quantidade de agentes simulados
+            concurrency: Máximo de agentes sincronizando ao mesmo tempo
+            timeout: Timeout de leitura das requisições (segundos)
+        """
+        self.recorder = LoadRecorder()
+        self.concurrency = concurrency
+        self.state_root = tempfile.mkdtemp(prefix='labagent-carga-')
+        self.agents = []
+        for index in range(agents):
+            state_dir = os.path.join(self.state_root, str(index))
+            os.makedirs(state_dir)
+            client = TimedClient(self.recorder, url, api_key, pool_size=1, read_timeout=timeout)
+            self.agents.append(SimulatedAgent(fleet.machine(index), client, state_dir))
+
+    def _run_cycle(self, agent, churn):
+        """Ciclo de um agente, registrando o resultado"""
+        if not agent.busy.acquire(blocking=False):
+            # Ciclo anterior ainda em andamento: o agente real também não sobrepõe ciclos
+            return
+        try:
+            agent.cycle(churn)
+            self.recorder.record_sync(True)
+        except Exception as e:
+            logger.debug(f"Agente {agent.machine.hardware['hostname']}: {e}")
+            self.recorder.record_sync(False)
+        finally:
+            agent.busy.release()
+
+    def storm(self):
+        """
+        Todos os agentes fazem a primeira sincronização de uma vez
+
+        Returns:
+            dict: Resumo da fase
+        """
+        self.recorder.start_phase('tempestade')
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='agente') as executor:
+            for agent in self.agents:
+                executor.submit(self._run_cycle, agent, 0.0)
+        self.recorder.finish_phase()
+        return self.recorder.summary('tempestade')
+
+    def steady(self, duration, interval, churn):
+        """
+        Regime estável: cada agente sincroniza a cada `interval` segundos,
+        com fases sorteadas para espalhar os ciclos
+
+        Args:
+            duration: Duração da fase (segundos)
+            interval: Intervalo entre ciclos de cada agente (segundos)
+            churn: Fração dos softwares alterados a cada ciclo
+
+        Returns:
+            dict: Resumo da fase
+        """
+        self.recorder.start_phase('estavel')
+        rng = random.Random(len(self.agents))
+        started = time.monotonic()
+        deadline = started + duration
+        queue = [(started + rng.uniform(0, interval), i) for i in range(len(self.agents))]
+        heapq.heapify(queue)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='agente') as executor:
+            while queue and queue[0][0] < deadline:
+                due, index = heapq.heappop(queue)
+                time.sleep(max(0.0, due - time.monotonic()))
+                executor.submit(self._run_cycle, self.agents[index], churn)
+                heapq.heappush(queue, (due + interval, index))
+        self.recorder.finish_phase()
+        return self.recorder.summary('estavel')
+
+    def close(self):
+        """
+        Fecha os clientes e apaga o estado temporário dos agentes
+        """
+        for agent in self.agents:
+            agent.client.close()
+        shutil.rmtree(self.state_root, ignore_errors=True)
+
+
+def format_summary(name, summary):
+    """
+    Formata o resumo de uma fase como tabela
+
+    Args:
+        name: Nome da fase
+        summary: Resumo retornado por LoadRecorder.summary()
+
+    Returns:
+        str: Tabela em texto
+    """
+    syncs = summary['syncs']
+    lines = [
+        f"=== {name}: {syncs['ok'] + syncs['error']} ciclos ({syncs['error']} com erro) em {summary['duration']:.1f}s ===",
+        f"{'endpoint':<28} {'req':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erros':>7} {'KB':>9}",
+    ]
+    for endpoint, stats in summary['endpoints'].items():
+        lines.append(
+            f"{endpoint:<28} {stats['requests']:>6} {stats['throughput']:>7.1f} {stats['p50']:>8.1f} "
+            f"{stats['p95']:>8.1f} {stats['p99']:>8.1f} {stats['error_rate']:>6.1%} {stats['bytes'] / 1024:>9.1f}"
+        )
+    if not summary['endpoints']:
+        lines.append("(nenhuma requisição)")
+    return '\n'.join(lines)
+
+
+def main():
+    """Executa os cenários escolhidos e exibe o resultado"""
+    parser = argparse.ArgumentParser(description="Simulador de carga de agentes contra a API")
+    parser.add_argument('--url', default=None,
+                        help="URL da API do agente (padrão: servidor local tools.stub_server)")
+    parser.add_argument('--api-key', default='simulador')
+    parser.add_argument('--agentes', type=int, default=100)
+    parser.add_argument('--concorrencia', type=int, default=50,
+                        help="Máximo de agentes sincronizando ao mesmo tempo")
+    parser.add_argument('--cenario', choices=('tempestade', 'estavel', 'ambos'), default='ambos')
+    parser.add_argument('--duracao', type=float, default=60, help="Duração do regime estável (segundos)")
+    parser.add_argument('--intervalo', type=float, default=10,
+                        help="Intervalo entre ciclos de cada agente no regime estável (segundos)")
+    parser.add_argument('--churn', type=float, default=0.01,
+                        help="Fração dos softwares alterados por ciclo no regime estável")
+    parser.add_argument('--softwares', type=int, default=250, help="Softwares por máquina")
+    parser.add_argument('--catalogo', type=int, default=1500, help="Softwares distintos no catálogo compartilhado")
+    parser.add_argument('--sobreposicao', type=float, default=0.8,
+                        help="Fração dos softwares de cada máquina vinda do catálogo compartilhado")
+    parser.add_argument('--laboratorio-ids', default='1', help="IDs de laboratórios existentes, separados por vírgula")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=60, help="Timeout de leitura das requisições (segundos)")
+    parser.add_argument('--json', default=None, help="Grava o resumo das fases neste arquivo")
+    parser.add_argument('--verbose', action='store_true')
+    # Falhas do servidor local (ignoradas com --url), sorteadas com a mesma --semente
+    add_fault_arguments(parser, seed=False)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(threadName)s - %(message)s')
+
+    server = None
+    url = args.url
+    if url is None:
+        server = StubServer(faults=faults_from_args(args)).start()
+        url = server.url
+        print(f"Usando servidor local em {url}")
+
+    fleet = FleetGenerator(args.semente, args.catalogo, args.softwares, args.sobreposicao,
+                           [int(i) for i in args.laboratorio_ids.split(',')])
+    simulator = LoadSimulator(url, args.api_key, fleet, args.agentes, args.concorrencia, args.timeout)
+    results = {}
+    try:
+        if args.cenario in ('tempestade', 'ambos'):
+            results['tempestade'] = simulator.storm()
+            print(format_summary('tempestade', results['tempestade']))
+        if args.cenario in ('estavel', 'ambos'):
+            results['estavel'] = simulator.steady(args.duracao, args.intervalo, args.churn)
+            print(format_summary('estavel', results['estavel']))
+    except KeyboardInterrupt:
+        print("Interrompido")
+    finally:
+        simulator.close()
+        if server is not None:
+            server.stop()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
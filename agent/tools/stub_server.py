@@ -0,0 +1,638 @@
+"""
+Servidor local que imita a API do agente (Laravel) para testes
+
+Implementa em memória os mesmos endpoints e regras do AgentController
+(sync-equipamento, sync-softwares, sync-softwares-delta,
+sync-equipamento-softwares, reconcile-softwares e sync-software-buckets).
+Falhas podem ser injetadas (latência, 5xx, 413, 429 e conexões derrubadas)
+para medir vazão e novas tentativas do cliente sem o Laravel.
+
+Uso (a partir da pasta agent):
+    python -m tools.stub_server --porta 8000 --api-key teste
+    python -m tools.stub_server --latencia-ms 80 --taxa-erro 0.05 --taxa-429 0.02 \
+        --taxa-queda 0.01 --max-corpo-kb 256 --semente 1
+"""
+import argparse
+import copy
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple, Optional
+from api.compression import BodyTooLargeError, available_encodings, decompress
+from utils.inventory import InventoryTree, bucket_of, inventory_hash, software_key
+
+
+logger = logging.getLogger('LabAgent')
+
+
+class ValidationError(Exception):
+    """Dados inválidos (resposta 422, como a validação do Laravel)"""
+
+    def __init__(self, errors):
+        super().__init__('Erro de validação')
+        self.errors = errors
+
+
+class InventoryStore:
+    """Banco em memória com equipamentos, softwares e o relacionamento entre eles"""
+
+    def __init__(self):
+        """
+        Inicializa o banco vazio
+        """
+        self.equipamentos = {}
+        self.softwares = {}
+        self.software_ids = {}
+        self._next_id = {'equipamento': 1, 'software': 1}
+        self._lock = threading.RLock()
+
+    def _new_id(self, table):
+        """Próximo ID de uma tabela (chamar com o lock)"""
+        new_id = self._next_id[table]
+        self._next_id[table] += 1
+        return new_id
+
+    def snapshot(self):
+        """
+        Cópia do banco (para simular a restauração de um backup)
+
+        Returns:
+            dict: Estado completo do banco
+        """
+        with self._lock:
+            return copy.deepcopy({
+                'equipamentos': self.equipamentos,
+                'softwares': self.softwares,
+                'software_ids': self.software_ids,
+                'next_id': self._next_id,
+            })
+
+    def restore(self, snapshot):
+        """
+        Restaura uma cópia feita com snapshot()
+
+        Args:
+            snapshot: Estado retornado por snapshot()
+        """
+        snapshot = copy.deepcopy(snapshot)
+        with self._lock:
+            self.equipamentos = snapshot['equipamentos']
+            self.softwares = snapshot['softwares']
+            self.software_ids = snapshot['software_ids']
+            self._next_id = snapshot['next_id']
+
+    def _equipamento(self, payload):
+        """Equipamento do payload ou erro de validação (exists:equipamentos,id)"""
+        equipamento = self.equipamentos.get(payload.get('equipamento_id'))
+        if equipamento is None:
+            raise ValidationError({'equipamento_id': ['The selected equipamento id is invalid.']})
+        return equipamento
+
+    def installed_keys(self, equipamento_id):
+        """
+        Chaves (nome, versao) dos softwares relacionados a um equipamento
+
+        Args:
+            equipamento_id: ID do equipamento
+
+        Returns:
+            set: Chaves dos softwares
+        """
+        with self._lock:
+            equipamento = self.equipamentos[equipamento_id]
+            return {self.softwares[i]['key'] for i in equipamento['software_ids']}
+
+    def upsert_software(self, data):
+        """
+        Cria ou atualiza um software (mesma normalização do servidor)
+
+        Args:
+            data: Dicionário enviado pelo agente
+
+        Returns:
+            int: ID do software ou None se o nome for vazio
+        """
+        key = software_key(data)
+        if key is None:
+            return None
+        software_id = self.software_ids.get(key)
+        if software_id is None:
+            software_id = self._new_id('software')
+            self.software_ids[key] = software_id
+            self.softwares[software_id] = {
+                'key': key, 'fabricante': data.get('fabricante'),
+                'data_instalacao': data.get('data_instalacao'), 'trashed': False,
+            }
+            return software_id
+        software = self.softwares[software_id]
+        # Software na lixeira é restaurado, como no servidor
+        software['trashed'] = False
+        if data.get('fabricante'):
+            software['fabricante'] = data['fabricante']
+        if data.get('data_instalacao'):
+            software['data_instalacao'] = data['data_instalacao']
+        return software_id
+
+    def trash_software(self, software_id):
+        """
+        Move um software para a lixeira (soft delete feito pelo painel)
+
+        Args:
+            software_id: ID do software
+        """
+        with self._lock:
+            self.softwares[software_id]['trashed'] = True
+
+    def sync_equipamento(self, payload):
+        """POST sync-equipamento: localiza por número de série ou MAC, ou cria"""
+        with self._lock:
+            found = next((
+                (eid, e) for eid, e in self.equipamentos.items()
+                if (payload.get('numero_serie') and e['data'].get('numero_serie') == payload['numero_serie'])
+                or (payload.get('mac_address') and e['data'].get('mac_address') == payload['mac_address'])
+            ), None)
+            if found is None:
+                equipamento_id = self._new_id('equipamento')
+                self.equipamentos[equipamento_id] = {'data': payload, 'software_ids': set()}
+                return {'equipamento_id': equipamento_id, 'action': 'created'}
+            equipamento_id, equipamento = found
+            equipamento['data'] = payload
+            return {'equipamento_id': equipamento_id, 'action': 'updated'}
+
+    def _upsert_all(self, softwares):
+        """
+        Cria/atualiza uma lista de softwares
+
+        Args:
+            softwares: Lista de dicionários enviados pelo agente
+
+        Returns:
+            tuple: (IDs na ordem dos itens, erros por índice)
+        """
+        software_ids = []
+        errors = []
+        for index, data in enumerate(softwares):
+            if not isinstance(data, dict) or not data.get('nome'):
+                errors.append({'index': index, 'nome': 'desconhecido', 'error': 'nome obrigatório'})
+                continue
+            software_id = self.upsert_software(data)
+            if software_id is not None:
+                software_ids.append(software_id)
+        return software_ids, errors
+
+    def sync_softwares(self, payload):
+        """POST sync-softwares: cria/atualiza os softwares e devolve os IDs"""
+        softwares = payload.get('softwares')
+        if not isinstance(softwares, list) or not softwares:
+            raise ValidationError({'softwares': ['The softwares field is required.']})
+        with self._lock:
+            software_ids, errors = self._upsert_all(softwares)
+        return {
+            'software_ids': software_ids,
+            'total': len(software_ids),
+            'errors_count': len(errors),
+            'errors': errors,
+        }
+
+    def sync_softwares_delta(self, payload):
+        """POST sync-softwares-delta: aplica o delta ou responde 409 se a base divergir"""
+        with self._lock:
+            equipamento = self._equipamento(payload)
+            current_hash = inventory_hash(self.installed_keys(payload['equipamento_id']))
+            if current_hash != payload.get('base_hash'):
+                return 409, {
+                    'message': 'Inventário base divergente, sincronização completa necessária',
+                    'base_hash': current_hash,
+                }
+
+            removed_ids = []
+            for data in payload.get('removed', []):
+                software_id = self.software_ids.get(software_key(data) or ())
+                if software_id in equipamento['software_ids']:
+                    removed_ids.append(software_id)
+            equipamento['software_ids'].difference_update(removed_ids)
+
+            added_ids, errors = self._upsert_all(payload.get('added', []))
+            equipamento['software_ids'].update(added_ids)
+            return 200, {
+                'added_ids': added_ids,
+                'removed_ids': removed_ids,
+                'hash': inventory_hash(self.installed_keys(payload['equipamento_id'])),
+                'total_softwares': len(equipamento['software_ids']),
+                'errors_count': len(errors),
+                'errors': errors,
+            }
+
+    def sync_equipamento_softwares(self, payload):
+        """POST sync-equipamento-softwares: substitui o relacionamento"""
+        with self._lock:
+            equipamento = self._equipamento(payload)
+            software_ids = payload.get('software_ids', [])
+            invalid = {
+                f"software_ids.{index}": ['The selected software_ids is invalid.']
+                for index, software_id in enumerate(software_ids)
+                if software_id not in self.softwares or self.softwares[software_id]['trashed']
+            }
+            if invalid:
+                raise ValidationError(invalid)
+            equipamento['software_ids'] = set(software_ids)
+        return {'message': 'Softwares sincronizados com sucesso', 'total_softwares': len(software_ids)}
+
+    @staticmethod
+    def _bucket_count(payload):
+        """bucket_count validado (1 a 4096)"""
+        bucket_count = payload.get('bucket_count')
+        if not isinstance(bucket_count, int) or not 1 <= bucket_count <= 4096:
+            raise ValidationError({'bucket_count': ['The bucket count must be between 1 and 4096.']})
+        return bucket_count
+
+    def reconcile_softwares(self, payload):
+        """POST reconcile-softwares: compara a raiz e lista os buckets divergentes"""
+        bucket_count = self._bucket_count(payload)
+        buckets = payload.get('buckets')
+        if not isinstance(buckets, list) or len(buckets) != bucket_count:
+            raise ValidationError({'buckets': [f'The buckets field must have {bucket_count} items.']})
+        with self._lock:
+            self._equipamento(payload)
+            tree = InventoryTree(self.installed_keys(payload['equipamento_id']), bucket_count)
+        if tree.root == payload.get('root'):
+            return {'match': True, 'root': tree.root, 'buckets': []}
+        differing = [i for i, value in enumerate(tree.bucket_hashes) if value != buckets[i]]
+        return {'match': False, 'root': tree.root, 'buckets': differing}
+
+    def sync_software_buckets(self, payload):
+        """POST sync-software-buckets: substitui o conteúdo dos buckets enviados"""
+        bucket_count = self._bucket_count(payload)
+        buckets = payload.get('buckets')
+        if not isinstance(buckets, dict):
+            raise ValidationError({'buckets': ['The buckets field must be an object.']})
+        with self._lock:
+            equipamento = self._equipamento(payload)
+            software_ids = []
+            errors = []
+            offset = 0
+            removed_ids = []
+            for index in sorted(buckets, key=int):
+                bucket = int(index)
+                ids, bucket_errors = self._upsert_all(buckets[index])
+                errors.extend({**e, 'index': e['index'] + offset} for e in bucket_errors)
+                offset += len(buckets[index])
+                software_ids.extend(ids)
+
+                # Softwares do bucket que não vieram na lista saem do equipamento
+                keep = set(ids)
+                stale = [
+                    i for i in equipamento['software_ids']
+                    if bucket_of(self.softwares[i]['key'], bucket_count) == bucket and i not in keep
+                ]
+                equipamento['software_ids'].difference_update(stale)
+                equipamento['software_ids'].update(ids)
+                removed_ids.extend(stale)
+
+            tree = InventoryTree(self.installed_keys(payload['equipamento_id']), bucket_count)
+        return {
+            'software_ids': software_ids,
+            'removed_ids': removed_ids,
+            'root': tree.root,
+            'total_softwares': len(equipamento['software_ids']),
+            'errors_count': len(errors),
+            'errors': errors,
+        }
+
+
+# Endpoint -> método do InventoryStore
+ROUTES = {
+    'sync-equipamento': 'sync_equipamento',
+    'sync-softwares': 'sync_softwares',
+    'sync-softwares-delta': 'sync_softwares_delta',
+    'sync-equipamento-softwares': 'sync_equipamento_softwares',
+    'reconcile-softwares': 'reconcile_softwares',
+    'sync-software-buckets': 'sync_software_buckets',
+}
+
+
+class Fault(NamedTuple):
+    """Falha sorteada para uma requisição"""
+
+    delay: float = 0.0  # segundos de espera antes de responder
+    # None (responder normalmente), 'error' (5xx), 'too_large' (413),
+    # 'throttle' (429) ou 'drop' (fechar a conexão sem resposta)
+    action: Optional[str] = None
+
+
+class FaultInjector:
+    """Sorteia latência e falhas de cada requisição de forma reprodutível"""
+
+    def __init__(self, latency=0.0, jitter=0.0, latency_per_kb=0.0, error_rate=0.0, error_status=500,
+                 throttle_rate=0.0, retry_after=1, drop_rate=0.0, max_body_bytes=None, seed=None):
+        """
+        Inicializa o injetor
+
+        Com uma semente, o sorteio da n-ésima requisição de cada endpoint é
+        sempre o mesmo: a mesma sequência de requisições recebe as mesmas
+        falhas em toda execução, mesmo com outros endpoints intercalados.
+
+        Args:
+            latency: Latência fixa (segundos)
+            jitter: Latência extra sorteada entre 0 e este valor (segundos)
+            latency_per_kb: Latência por KB do corpo (processamento de lotes grandes)
+            error_rate: Probabilidade de responder error_status
+            error_status: Status dos erros do servidor (ex: 500, 502, 503)
+            throttle_rate: Probabilidade de responder 429 com Retry-After
+            retry_after: Valor do Retry-After (segundos inteiros)
+            drop_rate: Probabilidade de fechar a conexão sem resposta (a
+                requisição já foi processada, como em uma queda da VPN)
+            max_body_bytes: Corpos maiores recebem 413 (None = sem limite),
+                como o client_max_body_size/post_max_size do servidor
+            seed: Semente do sorteio (None = aleatório)
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_per_kb = latency_per_kb
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle_rate = throttle_rate
+        self.retry_after = int(retry_after)
+        self.drop_rate = drop_rate
+        self.max_body_bytes = max_body_bytes
+        self.seed = seed
+        self.counts = {}
+        self._sequence = {}
+        self._lock = threading.Lock()
+
+    def _rng(self, endpoint):
+        """Gerador da próxima requisição do endpoint"""
+        with self._lock:
+            n = self._sequence.get(endpoint, 0)
+            self._sequence[endpoint] = n + 1
+        if self.seed is None:
+            return random.Random()
+        return random.Random(f"{self.seed}-{endpoint}-{n}")
+
+    def draw(self, endpoint, size):
+        """
+        Sorteia a falha de uma requisição
+
+        Args:
+            endpoint: Endpoint da requisição
+            size: Bytes do corpo recebido
+
+        Returns:
+            Fault: Espera e ação a aplicar
+        """
+        rng = self._rng(endpoint)
+        delay = self.latency + rng.uniform(0, self.jitter) + self.latency_per_kb * size / 1024
+        # Um único sorteio decide a ação, então as taxas não interferem entre si
+        roll = rng.random()
+        if self.max_body_bytes is not None and size > self.max_body_bytes:
+            action = 'too_large'
+        elif roll < self.error_rate:
+            action = 'error'
+        elif roll < self.error_rate + self.throttle_rate:
+            action = 'throttle'
+        elif roll < self.error_rate + self.throttle_rate + self.drop_rate:
+            action = 'drop'
+        else:
+            action = None
+        if action is not None:
+            with self._lock:
+                self.counts[action] = self.counts.get(action, 0) + 1
+        return Fault(delay, action)
+
+
+class StubServer:
+    """Servidor HTTP com o InventoryStore, em uma thread em segundo plano"""
+
+    def __init__(self, port=0, api_key=None, host='127.0.0.1', store=None, encodings=None, faults=None):
+        """
+        Inicializa o servidor (sem abrir a porta)
+
+        Args:
+            port: Porta TCP (0 = porta livre qualquer)
+            api_key: API Key exigida no header X-Agent-API-Key (None = qualquer)
+            host: Endereço de escuta
+            store: InventoryStore a usar (padrão: um novo, vazio)
+            encodings: Content-Encoding aceitos e anunciados em Accept-Encoding
+                (padrão: os disponíveis; vazio = servidor sem suporte a compressão)
+            faults: FaultInjector com latência e falhas a simular (None = nenhuma)
+        """
+        self.host = host
+        self.port = port
+        self.api_key = api_key
+        self.store = store or InventoryStore()
+        self.encodings = available_encodings() if encodings is None else tuple(encodings)
+        self.faults = faults
+        self.requests = {}
+        self.bytes_received = {}
+        self._stats_lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        """URL base a usar no LaravelAPIClient"""
+        return f"http://{self.host}:{self.port}/api/v1/agent"
+
+    def _record(self, endpoint, size):
+        """Conta uma requisição e os bytes recebidos"""
+        with self._stats_lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.bytes_received[endpoint] = self.bytes_received.get(endpoint, 0) + size
+
+    def reset_stats(self):
+        """
+        Zera os contadores de requisições e bytes
+        """
+        with self._stats_lock:
+            self.requests.clear()
+            self.bytes_received.clear()
+
+    def handle(self, endpoint, headers, body):
+        """
+        Processa uma requisição
+
+        Args:
+            endpoint: Último segmento do caminho (ex: 'sync-softwares')
+            headers: Headers da requisição
+            body: Corpo da requisição (bytes, possivelmente comprimido)
+
+        Returns:
+            tuple: (status HTTP, corpo da resposta em dicionário)
+        """
+        self._record(endpoint, len(body))
+        if self.api_key is not None and headers.get('X-Agent-API-Key') != self.api_key:
+            return 401, {'message': 'API Key inválida'}
+        method = ROUTES.get(endpoint)
+        if method is None:
+            return 404, {'message': 'Not Found'}
+        encoding = (headers.get('Content-Encoding') or 'identity').strip().lower()
+        if encoding != 'identity' and encoding not in self.encodings:
+            return 415, {'message': f'Content-Encoding não suportado: {encoding}'}
+        try:
+            payload = json.loads(decompress(body, encoding) or b'{}')
+        except BodyTooLargeError:
+            return 413, {'message': 'Corpo descomprimido muito grande'}
+        except ValueError:
+            return 400, {'message': 'JSON inválido'}
+        try:
+            result = getattr(self.store, method)(payload)
+        except ValidationError as e:
+            return 422, {'message': 'Erro de validação', 'errors': e.errors}
+        return result if isinstance(result, tuple) else (200, result)
+
+    def respond(self, endpoint, headers, body):
+        """
+        Processa uma requisição aplicando as falhas injetadas
+
+        Args:
+            endpoint: Último segmento do caminho
+            headers: Headers da requisição
+            body: Corpo da requisição (bytes)
+
+        Returns:
+            tuple: (status, corpo, headers extras) ou None para derrubar a conexão
+        """
+        if self.faults is None:
+            return self.handle(endpoint, headers, body) + ({},)
+        fault = self.faults.draw(endpoint, len(body))
+        time.sleep(fault.delay)
+        if fault.action in ('too_large', 'error', 'throttle'):
+            # Recusada antes de chegar ao controller: nada é gravado
+            self._record(endpoint, len(body))
+            if fault.action == 'too_large':
+                return 413, {'message': 'Payload Too Large'}, {}
+            if fault.action == 'error':
+                return self.faults.error_status, {'message': 'Server Error'}, {}
+            return 429, {'message': 'Too Many Attempts.'}, {'Retry-After': str(self.faults.retry_after)}
+        result = self.handle(endpoint, headers, body)
+        return None if fault.action == 'drop' else result + ({},)
+
+    def _handler(self):
+        """Classe de handler ligada a este servidor"""
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length)
+                endpoint = self.path.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+                result = owner.respond(endpoint, self.headers, body)
+                if result is None:
+                    # Conexão derrubada: nenhum byte de resposta
+                    self.close_connection = True
+                    return
+                self.send_json(*result)
+
+            def send_json(self, status, data, headers=None):
+                payload = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                if owner.encodings:
+                    self.send_header('Accept-Encoding', ', '.join(owner.encodings))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(f"stub_server: {format % args}")
+
+        return Handler
+
+    def start(self):
+        """
+        Abre a porta e atende em segundo plano
+
+        Returns:
+            StubServer: O próprio servidor (porta real em self.port)
+        """
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='stub-server', daemon=True).start()
+        return self
+
+    def stop(self):
+        """
+        Encerra o servidor
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def add_fault_arguments(parser, seed=True):
+    """
+    Adiciona ao argparse as opções de injeção de falhas
+
+    Args:
+        parser: argparse.ArgumentParser
+        seed: Incluir --semente (False se o programa já tiver a sua)
+    """
+    parser.add_argument('--latencia-ms', type=float, default=0, help="Latência fixa de cada resposta")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Latência extra sorteada até este valor")
+    parser.add_argument('--latencia-por-kb-ms', type=float, default=0, help="Latência por KB do corpo recebido")
+    parser.add_argument('--taxa-erro', type=float, default=0, help="Fração de respostas 5xx")
+    parser.add_argument('--status-erro', type=int, default=500, help="Status usado nos erros do servidor")
+    parser.add_argument('--taxa-429', type=float, default=0, help="Fração de respostas 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After dos 429 (segundos)")
+    parser.add_argument('--taxa-queda', type=float, default=0, help="Fração de conexões derrubadas sem resposta")
+    parser.add_argument('--max-corpo-kb', type=float, default=None, help="Corpos maiores recebem 413")
+    if seed:
+        parser.add_argument('--semente', type=int, default=None, help="Semente para falhas reprodutíveis")
+
+
+def faults_from_args(args):
+    """
+    Cria o FaultInjector a partir das opções de add_fault_arguments()
+
+    Args:
+        args: Resultado de parser.parse_args()
+
+    Returns:
+        FaultInjector: Injetor configurado
+    """
+    return FaultInjector(
+        latency=args.latencia_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        latency_per_kb=args.latencia_por_kb_ms / 1000,
+        error_rate=args.taxa_erro,
+        error_status=args.status_erro,
+        throttle_rate=args.taxa_429,
+        retry_after=args.retry_after,
+        drop_rate=args.taxa_queda,
+        max_body_bytes=int(args.max_corpo_kb * 1024) if args.max_corpo_kb is not None else None,
+        seed=args.semente,
+    )
+
+
+def main():
+    """Executa o servidor até Ctrl+C"""
+    parser = argparse.ArgumentParser(description="Servidor local que imita a API do agente")
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--api-key', default=None)
+    parser.add_argument('--sem-compressao', action='store_true',
+                        help="Recusa Content-Encoding (como um servidor antigo)")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    encodings = () if args.sem_compressao else None
+    faults = faults_from_args(args)
+    server = StubServer(args.porta, args.api_key, args.host, encodings=encodings, faults=faults).start()
+    print(f"Servidor de testes em {server.url} (Ctrl+C para parar)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
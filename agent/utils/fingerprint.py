@@ -0,0 +1,173 @@
+"""
+Impressões digitais (hashes) das seções coletadas para detecção de mudanças
+"""
+import hashlib
+import json
+from utils.records import SoftwareRecord
+
+
+# Hash de conjunto: soma dos SHA256 dos itens módulo 2^256
+SET_HASH_MASK = (1 << 256) - 1
+
+# JSON compacto e sem escapes: a forma canônica de um registro
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+# Seções com hash independente. Cada seção é sincronizada apenas quando o
+# seu próprio hash muda.
+SECTIONS = ('hardware', 'rede', 'software')
+
+
+def generate_hash(data):
+    """
+    Gera hash SHA256 dos dados para detectar mudanças
+
+    Args:
+        data: Dicionário com dados
+
+    Returns:
+        str: Hash SHA256 dos dados
+    """
+    json_str = json.dumps(data, sort_keys=True)
+    return hashlib.sha256(json_str.encode()).hexdigest()
+
+
+def canonical_bytes(record, keep=None):
+    """
+    Forma canônica de um registro (sempre os mesmos bytes para os mesmos dados)
+
+    Args:
+        record: SoftwareRecord ou tupla de campos em ordem fixa
+        keep: Índices dos campos considerados (None = todos)
+
+    Returns:
+        bytes: JSON compacto da lista de campos
+    """
+    if keep is not None:
+        record = [record[i] for i in keep]
+    return _encode(record).encode('utf-8')
+
+
+class SetHasher:
+    """
+    Hash de um conjunto de registros, independente da ordem
+
+    Cada registro contribui com o SHA256 da sua forma canônica e o resultado
+    é a soma dessas parcelas módulo 2^256, então reordenar a lista (como o
+    Registry às vezes faz) não altera o hash. A parcela de cada registro é
+    guardada entre as chamadas: como os registros são tuplas imutáveis, em
+    um ciclo sem mudanças nenhum registro é serializado de novo. Parcelas de
+    registros que sumiram são descartadas a cada chamada.
+    """
+
+    def __init__(self, fields=SoftwareRecord._fields):
+        """
+        Inicializa o hasher
+
+        Args:
+            fields: Nomes dos campos dos registros, em ordem
+        """
+        self.fields = tuple(fields)
+        self.computed = 0
+        self._volatile = frozenset()
+        self._keep = None
+        self._digests = {}
+
+    def _configure(self, volatile_fields):
+        """
+        Ajusta os campos ignorados (descarta as parcelas guardadas se mudarem)
+
+        Args:
+            volatile_fields: Campos ignorados no cálculo
+        """
+        volatile = frozenset(volatile_fields or ())
+        if volatile == self._volatile:
+            return
+        self._volatile = volatile
+        self._keep = [i for i, f in enumerate(self.fields) if f not in volatile] if volatile else None
+        self._digests = {}
+
+    def hash(self, records, volatile_fields=()):
+        """
+        Calcula o hash do conjunto
+
+        Args:
+            records: Iterável de registros (tuplas na ordem de fields)
+            volatile_fields: Campos ignorados no cálculo
+
+        Returns:
+            str: Hash hexadecimal de 64 dígitos
+        """
+        self._configure(volatile_fields)
+        keep = self._keep
+        cached = self._digests.get
+        sha256 = hashlib.sha256
+        from_bytes = int.from_bytes
+        digests = {}
+        total = 0
+        for record in records:
+            digest = cached(record)
+            if digest is None:
+                digest = from_bytes(sha256(canonical_bytes(record, keep)).digest(), 'big')
+                self.computed += 1
+            digests[record] = digest
+            total += digest
+        self._digests = digests
+        return format(total & SET_HASH_MASK, '064x')
+
+
+# Hasher compartilhado da lista de softwares (mantém as parcelas entre ciclos)
+software_hasher = SetHasher()
+
+
+def strip_volatile(data, volatile_fields):
+    """
+    Remove campos voláteis de um registro antes de calcular o hash
+
+    Args:
+        data: Dicionário com dados
+        volatile_fields: Conjunto de nomes de campos a ignorar
+
+    Returns:
+        dict: Cópia dos dados sem os campos voláteis
+    """
+    if not volatile_fields:
+        return data
+    return {k: v for k, v in data.items() if k not in volatile_fields}
+
+
+def section_hashes(hw_data, net_data, sw_data, volatile_fields=()):
+    """
+    Calcula um hash independente para cada seção coletada
+
+    Args:
+        hw_data: Dados de hardware (inclui laboratorio_id)
+        net_data: Dados de rede
+        sw_data: Softwares (SoftwareRecord ou dicionários); o hash independe da ordem
+        volatile_fields: Campos ignorados no cálculo (ex: ['ip_local', 'data_instalacao'])
+
+    Returns:
+        dict: Hash por seção ('hardware', 'rede', 'software')
+    """
+    volatile_fields = set(volatile_fields or ())
+    return {
+        'hardware': generate_hash(strip_volatile(hw_data, volatile_fields)),
+        'rede': generate_hash(strip_volatile(net_data, volatile_fields)),
+        'software': software_hasher.hash(
+            (SoftwareRecord.from_value(sw) if isinstance(sw, dict) else sw for sw in sw_data),
+            volatile_fields,
+        ),
+    }
+
+
+def equipamento_hash(hashes):
+    """
+    Combina os hashes de hardware e rede no dados_hash enviado ao servidor
+
+    Args:
+        hashes: Dicionário retornado por section_hashes()
+
+    Returns:
+        str: Hash SHA256 combinado
+    """
+    return generate_hash({'hardware': hashes['hardware'], 'rede': hashes['rede']})
@@ -0,0 +1,159 @@
+"""
+Comparação do inventário de softwares com o último inventário confirmado
+"""
+import hashlib
+
+
+# Caracteres removidos pelo trim() do PHP; o servidor normaliza dessa forma
+_PHP_TRIM_CHARS = ' \t\n\r\0\x0b'
+
+
+def _normalize(value):
+    """
+    Normaliza um campo como o servidor faz (trim + limite de 255 caracteres)
+
+    Args:
+        value: Valor original
+
+    Returns:
+        str: Valor normalizado ou None se vazio
+    """
+    if value is None:
+        return None
+    value = str(value).strip(_PHP_TRIM_CHARS)
+    # empty() do PHP também considera "0" vazio
+    if not value or value == '0':
+        return None
+    return value[:255]
+
+
+def software_key(software):
+    """
+    Gera a chave (nome, versao) de um software, normalizada como no servidor
+
+    Args:
+        software: SoftwareRecord ou dicionário com 'nome' e 'versao'
+
+    Returns:
+        tuple: (nome, versao) ou None se o nome for vazio
+    """
+    nome = _normalize(software.get('nome'))
+    if nome is None:
+        return None
+    return (nome, _normalize(software.get('versao')))
+
+
+def sort_keys(keys):
+    """
+    Ordena chaves (nome, versao) de forma estável (versão None antes das demais)
+
+    Args:
+        keys: Iterável de chaves
+
+    Returns:
+        list: Chaves ordenadas
+    """
+    return sorted(keys, key=lambda k: (k[0], k[1] or ''))
+
+
+def inventory_hash(keys):
+    """
+    Calcula o hash de um inventário, igual ao calculado pelo servidor
+
+    Args:
+        keys: Iterável de chaves (nome, versao)
+
+    Returns:
+        str: SHA256 das linhas "nome\\tversao" ordenadas
+    """
+    lines = sorted({f"{nome}\t{versao or ''}" for nome, versao in keys})
+    return hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+
+
+def diff_inventory(softwares, previous_keys):
+    """
+    Compara os softwares coletados com o último inventário confirmado
+
+    Args:
+        softwares: Iterável de softwares coletados
+        previous_keys: Iterável de chaves (nome, versao) confirmadas
+
+    Returns:
+        tuple: (adicionados, removidos, chaves_atuais) onde adicionados é a lista
+               de softwares novos, removidos a lista de chaves desinstaladas e
+               chaves_atuais o conjunto de chaves do inventário atual
+    """
+    previous = {tuple(key) for key in previous_keys}
+    current = set()
+    added = []
+
+    for software in softwares:
+        key = software_key(software)
+        if key is None or key in current:
+            continue
+        current.add(key)
+        if key not in previous:
+            added.append(software)
+
+    removed = sort_keys(key for key in previous if key not in current)
+    return added, removed, current
+
+
+# Quantidade padrão de buckets da árvore de reconciliação
+DEFAULT_BUCKETS = 64
+
+
+def key_line(key):
+    """
+    Linha canônica de uma chave, a mesma usada pelo servidor
+
+    Args:
+        key: Chave (nome, versao)
+
+    Returns:
+        str: "nome\\tversao"
+    """
+    nome, versao = key
+    return f"{nome}\t{versao or ''}"
+
+
+def bucket_of(key, bucket_count):
+    """
+    Bucket de uma chave: primeiros 32 bits do SHA256 da linha, módulo bucket_count
+
+    Args:
+        key: Chave (nome, versao)
+        bucket_count: Quantidade de buckets
+
+    Returns:
+        int: Índice do bucket
+    """
+    digest = hashlib.sha256(key_line(key).encode('utf-8')).hexdigest()
+    return int(digest[:8], 16) % bucket_count
+
+
+class InventoryTree:
+    """
+    Árvore de Merkle rasa (raiz + buckets) de um inventário de softwares
+
+    Cada chave cai em um bucket pelo hash da sua linha; o hash do bucket é
+    o inventory_hash() das suas chaves e a raiz é o SHA256 dos hashes dos
+    buckets em ordem. Agente e servidor calculam a mesma árvore, então basta
+    comparar a raiz e, se divergir, transferir apenas os buckets diferentes.
+    """
+
+    def __init__(self, keys, bucket_count=DEFAULT_BUCKETS):
+        """
+        Monta a árvore
+
+        Args:
+            keys: Iterável de chaves (nome, versao)
+            bucket_count: Quantidade de buckets
+        """
+        self.bucket_count = bucket_count
+        self.buckets = [set() for _ in range(bucket_count)]
+        for key in keys:
+            key = tuple(key)
+            self.buckets[bucket_of(key, bucket_count)].add(key)
+        self.bucket_hashes = [inventory_hash(bucket) for bucket in self.buckets]
+        self.root = hashlib.sha256('\n'.join(self.bucket_hashes).encode('ascii')).hexdigest()
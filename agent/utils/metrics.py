@@ -0,0 +1,316 @@
+"""
+Métricas do agente (tempos por etapa e contadores)
+
+As métricas ficam em memória e podem ser exportadas em formato Prometheus,
+em um arquivo texto (textfile collector do node_exporter/windows_exporter)
+e/ou por um endpoint HTTP acessível apenas pela própria máquina.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.state_store import write_text_atomic
+
+
+logger = logging.getLogger('LabAgent')
+
+# Descrição de cada métrica: nome -> (tipo, ajuda)
+METRICS = {
+    'cycles_total': ('counter', 'Ciclos de coleta por resultado (changed, unchanged, error)'),
+    'collector_runs_missed_total': ('counter', 'Execuções agendadas descartadas por atraso (ex: máquina suspensa)'),
+    'collector_duration_seconds': ('summary', 'Duração de cada coletor'),
+    'collector_errors_total': ('counter', 'Falhas de cada coletor'),
+    'collector_timeouts_total': ('counter', 'Coletas que excederam o prazo (último valor reaproveitado)'),
+    'collector_workers_recycled_total': ('counter', 'Threads de coleta travadas substituídas'),
+    'hash_duration_seconds': ('summary', 'Duração do cálculo dos hashes'),
+    'http_requests_total': ('counter', 'Requisições HTTP por endpoint e status'),
+    'http_request_duration_seconds': ('summary', 'Duração das requisições HTTP'),
+    'http_request_bytes_total': ('counter', 'Bytes enviados no corpo das requisições'),
+    'http_request_uncompressed_bytes_total': ('counter', 'Bytes do corpo das requisições antes da compressão'),
+    'http_compression_rejected_total': ('counter', 'Requisições comprimidas recusadas pelo servidor (415)'),
+    'http_retries_total': ('counter', 'Novas tentativas de requisições HTTP'),
+    'http_circuit_open_total': ('counter', 'Requisições recusadas com o circuito aberto'),
+    'software_batches_total': ('counter', 'Lotes de softwares enviados (ok) ou divididos (split)'),
+    'software_batch_size': ('gauge', 'Tamanho atual do lote de softwares'),
+    'syncs_total': ('counter', 'Sincronizações por resultado (ok, error)'),
+    'last_sync_timestamp_seconds': ('gauge', 'Horário (epoch) da última sincronização bem-sucedida'),
+    'spool_depth': ('gauge', 'Seções aguardando envio no spool'),
+}
+
+
+def _escape(value):
+    """
+    Escapa o valor de um label no formato Prometheus
+
+    Args:
+        value: Valor do label
+
+    Returns:
+        str: Valor escapado
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    """
+    Formata os labels de uma amostra
+
+    Args:
+        labels: Tupla ordenada de pares (nome, valor)
+
+    Returns:
+        str: '{a="1",b="2"}' ou vazio
+    """
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class MetricsRegistry:
+    """Contadores, gauges e resumos de duração, seguros entre threads"""
+
+    def __init__(self, prefix='labagent_'):
+        """
+        Inicializa o registro vazio
+
+        Args:
+            prefix: Prefixo dos nomes exportados
+        """
+        self.prefix = prefix
+        self._counters = {}
+        self._gauges = {}
+        self._summaries = {}
+        self._callbacks = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """
+        Incrementa um contador
+
+        Args:
+            name: Nome da métrica
+            value: Incremento
+            **labels: Labels da amostra
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """
+        Define o valor de um gauge
+
+        Args:
+            name: Nome da métrica
+            value: Valor atual
+            **labels: Labels da amostra
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def gauge_callback(self, name, func):
+        """
+        Registra um gauge calculado no momento da exportação
+
+        Args:
+            name: Nome da métrica
+            func: Função sem argumentos que retorna o valor
+        """
+        with self._lock:
+            self._callbacks[name] = func
+
+    def observe(self, name, seconds, **labels):
+        """
+        Registra uma duração
+
+        Args:
+            name: Nome da métrica
+            seconds: Duração em segundos
+            **labels: Labels da amostra
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.setdefault(key, [0, 0.0, 0.0])
+            summary[0] += 1
+            summary[1] += seconds
+            summary[2] = seconds
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Mede a duração de um bloco com observe()
+
+        Args:
+            name: Nome da métrica
+            **labels: Labels da amostra
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, **labels)
+
+    def _collect(self):
+        """
+        Copia os valores atuais (incluindo os gauges calculados)
+
+        Returns:
+            tuple: (contadores, gauges, resumos)
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            summaries = {key: list(value) for key, value in self._summaries.items()}
+            callbacks = dict(self._callbacks)
+
+        for name, func in callbacks.items():
+            try:
+                gauges[(name, ())] = func()
+            except Exception:
+                continue
+        return counters, gauges, summaries
+
+    def render(self):
+        """
+        Exporta as métricas no formato texto do Prometheus
+
+        Returns:
+            str: Métricas em formato de exposição
+        """
+        counters, gauges, summaries = self._collect()
+        samples = {}
+        for (name, labels), value in counters.items():
+            samples.setdefault(name, []).append(f"{self.prefix}{name}{_format_labels(labels)} {value}")
+        for (name, labels), value in gauges.items():
+            samples.setdefault(name, []).append(f"{self.prefix}{name}{_format_labels(labels)} {value}")
+        for (name, labels), (count, total, _) in summaries.items():
+            samples.setdefault(name, []).extend([
+                f"{self.prefix}{name}_count{_format_labels(labels)} {count}",
+                f"{self.prefix}{name}_sum{_format_labels(labels)} {total:.6f}",
+            ])
+
+        lines = []
+        for name in sorted(samples):
+            kind, help_text = METRICS.get(name, ('untyped', ''))
+            if help_text:
+                lines.append(f"# HELP {self.prefix}{name} {help_text}")
+            lines.append(f"# TYPE {self.prefix}{name} {kind}")
+            lines.extend(sorted(samples[name]))
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """
+        Valores atuais em formato JSON-serializável
+
+        Returns:
+            dict: counters, gauges e summaries (count, sum, last) por métrica
+        """
+        counters, gauges, summaries = self._collect()
+
+        def label_key(labels):
+            return ','.join(f"{k}={v}" for k, v in labels) or '_'
+
+        result = {'counters': {}, 'gauges': {}, 'summaries': {}}
+        for (name, labels), value in counters.items():
+            result['counters'].setdefault(name, {})[label_key(labels)] = value
+        for (name, labels), value in gauges.items():
+            result['gauges'].setdefault(name, {})[label_key(labels)] = value
+        for (name, labels), (count, total, last) in summaries.items():
+            result['summaries'].setdefault(name, {})[label_key(labels)] = {
+                'count': count, 'sum': round(total, 6), 'last': round(last, 6),
+            }
+        return result
+
+    def write_textfile(self, path):
+        """
+        Grava as métricas em arquivo (atômico, para o textfile collector)
+
+        Args:
+            path: Caminho do arquivo .prom
+        """
+        write_text_atomic(path, self.render())
+
+
+# Registro compartilhado pelo agente
+metrics = MetricsRegistry()
+
+
+class StatusServer:
+    """Endpoint HTTP local com /metrics (Prometheus) e /status (JSON)"""
+
+    def __init__(self, registry, port, status=None, host='127.0.0.1'):
+        """
+        Inicializa o servidor (sem abrir a porta)
+
+        Args:
+            registry: Instância de MetricsRegistry
+            port: Porta TCP
+            status: Função sem argumentos que retorna o resumo de /status
+            host: Endereço de escuta (padrão: apenas a própria máquina)
+        """
+        self.registry = registry
+        self.port = port
+        self.status = status or dict
+        self.host = host
+        self._server = None
+
+    def _handler(self):
+        """
+        Cria a classe de handler ligada a este servidor
+
+        Returns:
+            type: Subclasse de BaseHTTPRequestHandler
+        """
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body = owner.registry.render().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif path == '/status':
+                    data = {**owner.status(), 'metrics': owner.registry.snapshot()}
+                    body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+                    content_type = 'application/json; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Sem log a cada consulta
+                pass
+
+        return Handler
+
+    def start(self):
+        """
+        Abre a porta e atende em uma thread em segundo plano
+
+        Returns:
+            bool: False se a porta não pôde ser aberta
+        """
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        except OSError as e:
+            logger.warning(f"⚠️ Endpoint de status não iniciado em {self.host}:{self.port}: {e}")
+            return False
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='status-server', daemon=True).start()
+        return True
+
+    def stop(self):
+        """
+        Encerra o servidor
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
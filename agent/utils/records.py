@@ -0,0 +1,90 @@
+"""
+Registro compacto de software instalado
+"""
+from typing import NamedTuple, Optional
+
+
+class SoftwareRecord(NamedTuple):
+    """
+    Software instalado, armazenado como tupla
+
+    Ocupa bem menos memória que um dicionário por software. Em JSON (spool)
+    vira uma lista [nome, versao, fabricante, data_instalacao]; para a API
+    use as_dict().
+    """
+
+    nome: str
+    versao: Optional[str] = None
+    fabricante: Optional[str] = None
+    data_instalacao: Optional[str] = None
+
+    def get(self, field, default=None):
+        """
+        Acesso por nome de campo, como em um dicionário
+
+        Args:
+            field: Nome do campo
+            default: Valor se o campo não existir
+
+        Returns:
+            Valor do campo
+        """
+        return getattr(self, field, default)
+
+    def as_dict(self):
+        """
+        Converte para o formato enviado à API
+
+        Returns:
+            dict: nome, versao, fabricante e data_instalacao
+        """
+        return self._asdict()
+
+    @classmethod
+    def from_value(cls, value):
+        """
+        Reconstrói um registro a partir do JSON (lista ou dicionário legado)
+
+        Args:
+            value: Lista/tupla de campos ou dicionário
+
+        Returns:
+            SoftwareRecord: Registro
+        """
+        if isinstance(value, dict):
+            return cls(*(value.get(field) for field in cls._fields))
+        return cls(*value)
+
+
+def to_dict(software):
+    """
+    Converte um software para o formato da API
+
+    Args:
+        software: SoftwareRecord ou dicionário
+
+    Returns:
+        dict: Dicionário do software
+    """
+    return software.as_dict() if isinstance(software, SoftwareRecord) else software
+
+
+def unique_records(records, software_filter=None):
+    """
+    Filtra e remove duplicatas (nome, versao) à medida que os registros chegam
+
+    Args:
+        records: Iterável de SoftwareRecord
+        software_filter: SoftwareFilter aplicado a cada registro (opcional)
+
+    Yields:
+        SoftwareRecord: Registros na ordem original, sem repetição
+    """
+    seen = set()
+    for record in records:
+        if software_filter is not None and software_filter.is_excluded(record):
+            continue
+        key = (record.nome, record.versao)
+        if key not in seen:
+            seen.add(key)
+            yield record
@@ -0,0 +1,221 @@
+"""
+Agendamento das coletas com uma cadência por coletor
+"""
+import threading
+import time
+from utils.metrics import metrics
+
+
+class _Job:
+    """Estado de agendamento de um coletor"""
+
+    def __init__(self, name, interval, next_run):
+        """
+        Inicializa o estado
+
+        Args:
+            name: Nome do coletor
+            interval: Cadência em segundos (None = apenas quando acionado)
+            next_run: Próxima execução (relógio monotônico) ou None
+        """
+        self.name = name
+        self.interval = interval
+        self.next_run = next_run
+        self.triggered = False
+        self.runs = 0
+        self.missed = 0
+
+
+class CadenceScheduler:
+    """
+    Decide quais coletores rodam a cada ciclo
+
+    A cadência é de taxa fixa: a próxima execução é marcada a partir do
+    horário previsto, e não do fim da execução anterior, então a duração da
+    coleta e do envio não desloca os ciclos. Execuções que ficaram para trás
+    (ex: máquina suspensa) são descartadas em vez de rodarem em sequência.
+    Como um único consumidor chama claim() e executa os coletores, duas
+    execuções do mesmo coletor nunca se sobrepõem; um acionamento recebido
+    durante a execução gera uma nova execução logo em seguida.
+    """
+
+    def __init__(self, clock=time.monotonic, poll_timeout=1.0):
+        """
+        Inicializa o agendador vazio
+
+        Args:
+            clock: Relógio monotônico em segundos
+            poll_timeout: Fatia máxima de espera (permite Ctrl+C no Windows)
+        """
+        self.clock = clock
+        self.poll_timeout = poll_timeout
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+
+    def add(self, name, interval=None, run_now=True):
+        """
+        Registra um coletor
+
+        Args:
+            name: Nome do coletor
+            interval: Cadência em segundos (None = apenas quando acionado)
+            run_now: Executar já no primeiro ciclo
+        """
+        now = self.clock()
+        with self._lock:
+            job = _Job(name, interval, None if interval is None else now + interval)
+            if run_now:
+                job.next_run = now
+            self._jobs[name] = job
+        self._wake_event.set()
+
+    def set_interval(self, name, interval):
+        """
+        Altera a cadência de um coletor (a contagem recomeça agora)
+
+        Args:
+            name: Nome do coletor
+            interval: Cadência em segundos (None = apenas quando acionado)
+        """
+        with self._lock:
+            job = self._jobs[name]
+            job.interval = interval
+            job.next_run = None if interval is None else self.clock() + interval
+        self._wake_event.set()
+
+    def interval(self, name):
+        """
+        Cadência atual de um coletor
+
+        Args:
+            name: Nome do coletor
+
+        Returns:
+            float: Cadência em segundos ou None
+        """
+        with self._lock:
+            return self._jobs[name].interval
+
+    def trigger(self, name):
+        """
+        Pede a execução do coletor no próximo ciclo (seguro entre threads)
+
+        Args:
+            name: Nome do coletor
+        """
+        with self._lock:
+            self._jobs[name].triggered = True
+        self._wake_event.set()
+
+    def run_within(self, name, seconds):
+        """
+        Garante uma execução extra em até alguns segundos (ex: após falha)
+
+        Args:
+            name: Nome do coletor
+            seconds: Prazo máximo até a execução
+        """
+        with self._lock:
+            job = self._jobs[name]
+            deadline = self.clock() + seconds
+            if job.next_run is None or deadline < job.next_run:
+                job.next_run = deadline
+        self._wake_event.set()
+
+    def stop(self):
+        """
+        Solicita o encerramento (pode ser chamado de um tratador de sinal)
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+
+    @property
+    def stopped(self):
+        """True depois de stop()"""
+        return self._stop_event.is_set()
+
+    def _due(self, now):
+        """
+        Coletores com execução pendente (chamar com o lock)
+
+        Args:
+            now: Horário atual
+
+        Returns:
+            list: Estados dos coletores a executar
+        """
+        return [
+            job for job in self._jobs.values()
+            if job.triggered or (job.next_run is not None and job.next_run <= now)
+        ]
+
+    def seconds_until_next(self):
+        """
+        Tempo até a próxima execução agendada
+
+        Returns:
+            float: Segundos (0 se há execução pendente) ou None se nada agendado
+        """
+        now = self.clock()
+        with self._lock:
+            if self._due(now):
+                return 0.0
+            pending = [job.next_run for job in self._jobs.values() if job.next_run is not None]
+        return max(0.0, min(pending) - now) if pending else None
+
+    def wait(self):
+        """
+        Aguarda até haver coletor a executar ou até stop()
+
+        Returns:
+            bool: False se o agendador foi encerrado
+        """
+        while not self.stopped:
+            remaining = self.seconds_until_next()
+            if remaining == 0.0:
+                return True
+            timeout = self.poll_timeout if remaining is None else min(remaining, self.poll_timeout)
+            self._wake_event.wait(timeout)
+            self._wake_event.clear()
+        return False
+
+    def claim(self):
+        """
+        Marca os coletores pendentes como em execução e agenda a próxima vez
+
+        Returns:
+            list: Nomes dos coletores a executar agora
+        """
+        now = self.clock()
+        names = []
+        with self._lock:
+            for job in self._due(now):
+                job.triggered = False
+                job.runs += 1
+                if job.next_run is not None and job.next_run <= now:
+                    if job.interval is None:
+                        # Execução extra (run_within) de coletor sem cadência
+                        job.next_run = None
+                    else:
+                        behind = int((now - job.next_run) // job.interval)
+                        job.missed += behind
+                        if behind:
+                            metrics.inc('collector_runs_missed_total', behind, collector=job.name)
+                        job.next_run += (behind + 1) * job.interval
+                names.append(job.name)
+        return names
+
+    def stats(self):
+        """
+        Execuções e execuções descartadas por coletor
+
+        Returns:
+            dict: Nome -> {'runs', 'missed', 'interval'}
+        """
+        with self._lock:
+            return {
+                name: {'runs': job.runs, 'missed': job.missed, 'interval': job.interval}
+                for name, job in self._jobs.items()
+            }
@@ -0,0 +1,153 @@
+"""
+Cache local (nome, versao) -> ID do software no servidor
+"""
+import hashlib
+import json
+import time
+from utils.records import SoftwareRecord
+from utils.state_store import read_json, write_json_atomic
+
+
+# Versão do formato do arquivo de cache (2: entradas guardam os metadados enviados)
+CACHE_VERSION = 2
+
+
+def _cache_key(key):
+    """
+    Converte a chave (nome, versao) na chave textual do arquivo JSON
+
+    Args:
+        key: Tupla (nome, versao)
+
+    Returns:
+        str: "nome\\tversao"
+    """
+    nome, versao = key
+    return f"{nome}\t{versao or ''}"
+
+
+def software_metadata(software):
+    """
+    Resumo dos campos do software além da chave (fabricante, data_instalacao)
+
+    Se eles mudarem, o software precisa ser reenviado ao servidor mesmo com o
+    ID já conhecido, senão a mudança nunca chega lá.
+
+    Args:
+        software: SoftwareRecord ou dicionário
+
+    Returns:
+        str: Hash curto dos metadados
+    """
+    record = SoftwareRecord.from_value(software)
+    data = json.dumps([record.fabricante, record.data_instalacao], ensure_ascii=False)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
+
+class SoftwareIdCache:
+    """Cache persistente dos IDs de software já resolvidos pelo servidor"""
+
+    def __init__(self, cache_file, ttl_seconds=7 * 24 * 3600):
+        """
+        Inicializa o cache, carregando o arquivo se existir
+
+        Args:
+            cache_file: Caminho do arquivo de cache (JSON)
+            ttl_seconds: Validade de cada entrada em segundos
+        """
+        self.cache_file = cache_file
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.entries = self._load()
+
+    def _load(self):
+        """
+        Carrega as entradas do disco
+
+        Returns:
+            dict: Entradas {chave: [software_id, timestamp, metadados]}
+        """
+        data = read_json(self.cache_file)
+        if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+            return {}
+        entries = data.get('entries')
+        return entries if isinstance(entries, dict) else {}
+
+    def get(self, key, metadata=None):
+        """
+        Obtém o ID de um software, se conhecido e ainda válido
+
+        Args:
+            key: Tupla (nome, versao)
+            metadata: software_metadata() atual; se diferir do último enviado,
+                a entrada não vale (o software precisa ser reenviado)
+
+        Returns:
+            int: ID do software ou None
+        """
+        entry = self.entries.get(_cache_key(key))
+        if (entry and time.time() - entry[1] < self.ttl_seconds
+                and (metadata is None or entry[2] == metadata)):
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+
+    def metadata_changed(self, key, metadata):
+        """
+        Verifica se um software conhecido mudou de metadados desde o envio
+
+        Args:
+            key: Tupla (nome, versao)
+            metadata: software_metadata() atual
+
+        Returns:
+            bool: True se há entrada para a chave com metadados diferentes
+        """
+        entry = self.entries.get(_cache_key(key))
+        return entry is not None and entry[2] != metadata
+
+    def put(self, key, software_id, metadata=None):
+        """
+        Registra o ID resolvido pelo servidor
+
+        Args:
+            key: Tupla (nome, versao)
+            software_id: ID do software no servidor
+            metadata: software_metadata() do software enviado
+        """
+        self.entries[_cache_key(key)] = [software_id, time.time(), metadata]
+
+    def invalidate_ids(self, software_ids):
+        """
+        Remove as entradas que apontam para IDs desconhecidos pelo servidor
+
+        Args:
+            software_ids: Iterável de IDs inválidos
+
+        Returns:
+            int: Quantidade de entradas removidas
+        """
+        invalid = set(software_ids)
+        stale = [k for k, entry in self.entries.items() if entry[0] in invalid]
+        for k in stale:
+            del self.entries[k]
+        return len(stale)
+
+    def clear(self):
+        """
+        Remove todas as entradas
+        """
+        self.entries = {}
+
+    def save(self):
+        """
+        Salva o cache no disco de forma atômica, descartando entradas expiradas
+        """
+        now = time.time()
+        self.entries = {
+            k: entry for k, entry in self.entries.items()
+            if now - entry[1] < self.ttl_seconds
+        }
+        write_json_atomic(self.cache_file, {'version': CACHE_VERSION, 'entries': self.entries})
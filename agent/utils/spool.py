@@ -0,0 +1,192 @@
+"""
+Fila persistente (spool) de sincronizações pendentes
+"""
+import json
+import os
+import threading
+import time
+from utils.state_store import write_text_atomic
+
+
+class SyncSpool:
+    """
+    Journal em disco com o último snapshot não enviado de cada seção
+
+    Cada put() acrescenta uma linha JSON ao journal; um snapshot novo de uma
+    seção substitui o anterior ainda não enviado, então a fila guarda no
+    máximo um snapshot por seção. O journal é compactado (reescrito de forma
+    atômica só com os snapshots vivos) quando cresce demais. Uma linha
+    truncada por queda de energia é ignorada na leitura.
+    """
+
+    def __init__(self, spool_file, max_bytes=10 * 1024 * 1024):
+        """
+        Inicializa o spool, recuperando os snapshots pendentes do journal
+
+        Args:
+            spool_file: Caminho do journal (JSON lines)
+            max_bytes: Tamanho máximo do journal em disco
+        """
+        self.spool_file = spool_file
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._pending = {}
+        self._load()
+
+    def _load(self):
+        """
+        Reaplica o journal para reconstruir os snapshots pendentes
+        """
+        try:
+            with open(self.spool_file, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return
+
+        for line in content.splitlines():
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, AttributeError):
+                # Linha incompleta/corrompida (queda no meio da gravação)
+                continue
+
+        if content and not content.endswith('\n'):
+            # Reescreve o journal para que o próximo append não se junte à linha truncada
+            self._compact()
+
+    def _apply(self, record):
+        """
+        Aplica um registro do journal ao estado em memória
+
+        Args:
+            record: Registro 'put' ou 'ack'
+        """
+        section = record.get('section')
+        seq = record.get('seq', 0)
+        self._seq = max(self._seq, seq)
+
+        if record.get('ack'):
+            current = self._pending.get(section)
+            if current and current['seq'] == seq:
+                del self._pending[section]
+        else:
+            self._pending[section] = record
+
+    def _append(self, record):
+        """
+        Acrescenta um registro ao journal e sincroniza com o disco
+
+        Args:
+            record: Registro a gravar
+        """
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with open(self.spool_file, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _journal_size(self):
+        """
+        Tamanho do journal em disco
+
+        Returns:
+            int: Tamanho atual do journal em bytes
+        """
+        try:
+            return os.path.getsize(self.spool_file)
+        except OSError:
+            return 0
+
+    def _compact(self):
+        """
+        Reescreve o journal apenas com os snapshots pendentes
+
+        Se mesmo assim o limite for excedido, descarta os snapshots mais antigos.
+        """
+        records = sorted(self._pending.values(), key=lambda r: r['seq'])
+        lines = [json.dumps(r, ensure_ascii=False) + '\n' for r in records]
+
+        while lines and sum(len(line.encode('utf-8')) for line in lines) > self.max_bytes:
+            dropped = records.pop(0)
+            lines.pop(0)
+            del self._pending[dropped['section']]
+
+        write_text_atomic(self.spool_file, ''.join(lines))
+
+    def put(self, section, payload):
+        """
+        Enfileira o snapshot de uma seção, substituindo o anterior não enviado
+
+        Args:
+            section: Nome da seção (ex: 'equipamento', 'software')
+            payload: Dados serializáveis em JSON
+
+        Returns:
+            int: Sequência do snapshot, ou None se ele exceder o tamanho máximo
+        """
+        with self._lock:
+            record = {'seq': self._seq + 1, 'section': section, 'ts': time.time(), 'payload': payload}
+            if len(json.dumps(record, ensure_ascii=False).encode('utf-8')) > self.max_bytes:
+                return None
+
+            self._seq += 1
+            self._append(record)
+            self._pending[section] = record
+
+            # Snapshots substituídos continuam no journal até a compactação
+            if self._journal_size() > self.max_bytes // 2:
+                self._compact()
+            return record['seq']
+
+    def ack(self, section, seq):
+        """
+        Confirma o envio de um snapshot (se ainda for o mais recente da seção)
+
+        Args:
+            section: Nome da seção
+            seq: Sequência retornada por put()
+        """
+        with self._lock:
+            current = self._pending.get(section)
+            if not current or current['seq'] != seq:
+                return
+            del self._pending[section]
+            if self._pending:
+                self._append({'seq': seq, 'section': section, 'ack': True})
+            else:
+                # Nada pendente: journal vazio
+                self._compact()
+
+    def get(self, section):
+        """
+        Obtém o snapshot pendente de uma seção
+
+        Args:
+            section: Nome da seção
+
+        Returns:
+            dict: Registro com seq, section, ts e payload, ou None
+        """
+        with self._lock:
+            return self._pending.get(section)
+
+    def pending(self):
+        """
+        Obtém todos os snapshots pendentes
+
+        Returns:
+            dict: Registros pendentes por seção
+        """
+        with self._lock:
+            return dict(self._pending)
+
+    def depth(self):
+        """
+        Profundidade da fila
+
+        Returns:
+            int: Quantidade de snapshots pendentes
+        """
+        with self._lock:
+            return len(self._pending)
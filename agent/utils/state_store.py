@@ -0,0 +1,183 @@
+"""
+Armazenamento persistente do estado de sincronização do agente
+"""
+import json
+import os
+import tempfile
+
+
+# Versão do formato do arquivo de estado. Incrementar sempre que a estrutura
+# ou o cálculo dos hashes mudar de forma incompatível: o estado antigo é
+# descartado e o agente faz uma sincronização completa.
+# 3: hash da seção de software calculado pelo SetHasher (independe da ordem)
+STATE_VERSION = 3
+
+
+def write_text_atomic(path, text):
+    """
+    Grava texto em disco de forma atômica
+
+    O conteúdo é escrito em um arquivo temporário no mesmo diretório,
+    sincronizado com o disco e então renomeado sobre o destino. Uma queda
+    no meio da gravação deixa intacto o arquivo anterior.
+
+    Args:
+        path: Caminho do arquivo de destino
+        text: Conteúdo a gravar
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_json_atomic(path, data):
+    """
+    Grava JSON em disco de forma atômica (ver write_text_atomic)
+
+    Args:
+        path: Caminho do arquivo de destino
+        data: Dados serializáveis em JSON
+    """
+    write_text_atomic(path, json.dumps(data, ensure_ascii=False))
+
+
+def read_json(path):
+    """
+    Lê um arquivo JSON, tolerando ausência ou corrupção
+
+    Args:
+        path: Caminho do arquivo
+
+    Returns:
+        Dados lidos ou None se o arquivo não existir ou for inválido
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class SyncState:
+    """Estado da última sincronização confirmada pelo servidor"""
+
+    def __init__(self, state_file, agent_version):
+        """
+        Inicializa o estado, carregando o arquivo se existir
+
+        Args:
+            state_file: Caminho do arquivo de estado (JSON)
+            agent_version: Versão do agente; estado gravado por outra versão é descartado
+        """
+        self.state_file = state_file
+        self.agent_version = agent_version
+        self.data = self._load()
+
+    def _empty(self):
+        """
+        Retorna um estado vazio
+
+        Returns:
+            dict: Estado sem nenhuma sincronização registrada
+        """
+        return {
+            'version': STATE_VERSION,
+            'agent_version': self.agent_version,
+            'hashes': {},
+            'equipamento_id': None,
+            'software_ids': [],
+        }
+
+    def _load(self):
+        """
+        Carrega o estado do disco
+
+        Returns:
+            dict: Estado carregado ou vazio se inexistente, corrompido ou de outra versão
+        """
+        data = read_json(self.state_file)
+        if not isinstance(data, dict):
+            return self._empty()
+
+        if data.get('version') != STATE_VERSION or data.get('agent_version') != self.agent_version:
+            return self._empty()
+
+        state = self._empty()
+        state.update(data)
+        return state
+
+    def get(self, key, default=None):
+        """
+        Obtém um valor do estado
+
+        Args:
+            key: Chave do estado
+            default: Valor padrão se não encontrado
+
+        Returns:
+            Valor armazenado ou default
+        """
+        value = self.data.get(key)
+        return default if value is None else value
+
+    def get_hash(self, section):
+        """
+        Obtém o último hash confirmado de uma seção
+
+        Args:
+            section: Nome da seção (ex: 'hardware', 'rede', 'software')
+
+        Returns:
+            str: Hash ou None
+        """
+        return self.data['hashes'].get(section)
+
+    def set_hash(self, section, value):
+        """
+        Registra o hash confirmado de uma seção
+
+        Args:
+            section: Nome da seção
+            value: Hash confirmado
+        """
+        self.data['hashes'][section] = value
+
+    def set(self, key, value):
+        """
+        Define um valor do estado
+
+        Args:
+            key: Chave do estado
+            value: Valor a definir
+        """
+        self.data[key] = value
+
+    def forget_equipamento(self):
+        """
+        Descarta o equipamento e o inventário confirmados (o servidor não os
+        conhece mais), mantendo o restante do estado, como o tamanho de lote
+        """
+        self.data.update({'hashes': {}, 'equipamento_id': None, 'software_ids': [], 'softwares': None})
+
+    def clear(self):
+        """
+        Descarta todo o estado (força sincronização completa)
+        """
+        self.data = self._empty()
+
+    def save(self):
+        """
+        Salva o estado no disco de forma atômica
+        """
+        write_json_atomic(self.state_file, self.data)
@@ -9,6 +9,7 @@
 use Illuminate\Http\Request;
 use Illuminate\Support\Facades\Log;
 use Illuminate\Support\Facades\DB;
+use Illuminate\Validation\Rule;
 
 class AgentController extends Controller
 {
@@ -208,103 +209,10 @@ public function syncSoftwares(Request $request): JsonResponse
                         $realIndex = ($chunkIndex * 50) + $index;
                         
                         try {
-                            // Normalizar data_instalacao (flexível)
-                            $dataInstalacao = null;
-                            if (!empty($softwareData['data_instalacao'])) {
-                                try {
-                                    $dataInstalacao = \Carbon\Carbon::parse($softwareData['data_instalacao'])->format('Y-m-d');
-                                } catch (\Throwable $e) {
-                                    $dataInstalacao = null;
-                                }
-                            }
-
-                            // Validar e sanitizar nome (obrigatório)
-                            $nome = trim($softwareData['nome'] ?? '');
-                            if (empty($nome)) {
+                            $software = $this->upsertSoftware($softwareData);
+                            if (!$software) {
                                 continue;
                             }
-                            $nome = mb_substr($nome, 0, 255);
-                            
-                            // Filtrar por versão
-                            $versao = isset($softwareData['versao']) && !empty(trim($softwareData['versao'])) 
-                                ? mb_substr(trim($softwareData['versao']), 0, 255) 
-                                : null;
-                            
-                            // Buscar software existente (incluindo soft deleted)
-                            $query = Software::withTrashed()->where('nome', $nome);
-                            
-                            if ($versao !== null && $versao !== '') {
-                                $query->where('versao', $versao);
-                            } else {
-                                $query->whereNull('versao');
-                            }
-                            
-                            $software = $query->first();
-                            
-                            if ($software) {
-                                // Se estava soft deleted, restaurar
-                                if ($software->trashed()) {
-                                    $software->restore();
-                                }
-                                
-                                // Preparar dados para atualização
-                                $dataToUpdate = [
-                                    'detectado_por_agente' => true,
-                                ];
-                                
-                                // Atualizar apenas campos fornecidos
-                                if (isset($softwareData['fabricante'])) {
-                                    $fabricante = !empty(trim($softwareData['fabricante']))
-                                        ? mb_substr(trim($softwareData['fabricante']), 0, 255)
-                                        : null;
-                                    $dataToUpdate['fabricante'] = $fabricante ?? $software->fabricante;
-                                }
-                                
-                                if ($dataInstalacao !== null) {
-                                    $dataToUpdate['data_instalacao'] = $dataInstalacao;
-                                }
-                                
-                                if (isset($softwareData['chave_licenca'])) {
-                                    $chaveLicenca = !empty(trim($softwareData['chave_licenca']))
-                                        ? mb_substr(trim($softwareData['chave_licenca']), 0, 255)
-                                        : null;
-                                    $dataToUpdate['chave_licenca'] = $chaveLicenca ?? $software->chave_licenca;
-                                }
-                                
-                                // Atualizar apenas se houver mudanças
-                                $software->update($dataToUpdate);
-                            } else {
-                                // Criar novo software
-                                // Sanitizar dados antes de criar (já temos nome e versao sanitizados acima)
-                                $fabricante = isset($softwareData['fabricante']) && !empty(trim($softwareData['fabricante']))
-                                    ? mb_substr(trim($softwareData['fabricante']), 0, 255)
-                                    : null;
-                                $chaveLicenca = isset($softwareData['chave_licenca']) && !empty(trim($softwareData['chave_licenca']))
-                                    ? mb_substr(trim($softwareData['chave_licenca']), 0, 255)
-                                    : null;
-                                
-                                // Criar com apenas campos válidos
-                                $dataToCreate = [
-                                    'nome' => $nome,
-                                    'detectado_por_agente' => true,
-                                    'tipo_licenca' => 'proprietario',
-                                ];
-                                
-                                if ($versao !== null) {
-                                    $dataToCreate['versao'] = $versao;
-                                }
-                                if ($fabricante !== null) {
-                                    $dataToCreate['fabricante'] = $fabricante;
-                                }
-                                if ($dataInstalacao !== null) {
-                                    $dataToCreate['data_instalacao'] = $dataInstalacao;
-                                }
-                                if ($chaveLicenca !== null) {
-                                    $dataToCreate['chave_licenca'] = $chaveLicenca;
-                                }
-                                
-                                $software = Software::create($dataToCreate);
-                            }
                             
                             $softwareIds[] = $software->id;
                             $processed++;
@@ -374,6 +282,332 @@ public function syncSoftwares(Request $request): JsonResponse
         }
     }
 
+    /**
+     * Sincronizar softwares por diferença (delta)
+     * POST /api/v1/agent/sync-softwares-delta
+     *
+     * O agente envia apenas os softwares adicionados e removidos desde o último
+     * inventário confirmado, junto com o hash desse inventário (base_hash).
+     * Se o inventário do servidor divergir da base, responde 409 e o agente
+     * volta para a sincronização completa.
+     */
+    public function syncSoftwaresDelta(Request $request): JsonResponse
+    {
+        try {
+            $validated = $request->validate([
+                // Equipamento na lixeira também é recusado (422): o agente descarta o
+                // ID salvo e registra o equipamento de novo em sync-equipamento
+                'equipamento_id' => ['required', Rule::exists('equipamentos', 'id')->whereNull('deleted_at')],
+                'base_hash' => 'required|string|size:64',
+                'added' => 'present|array',
+                'added.*.nome' => 'required|string|max:255',
+                'added.*.versao' => 'nullable|string|max:255',
+                'added.*.fabricante' => 'nullable|string|max:255',
+                'added.*.data_instalacao' => 'nullable|string|max:50',
+                'added.*.chave_licenca' => 'nullable|string|max:255',
+                'removed' => 'present|array',
+                'removed.*.nome' => 'required|string|max:255',
+                'removed.*.versao' => 'nullable|string|max:255',
+            ]);
+
+            $equipamento = Equipamento::findOrFail($validated['equipamento_id']);
+
+            $currentHash = $this->softwareInventoryHash($equipamento);
+            if (!hash_equals($currentHash, $validated['base_hash'])) {
+                Log::info('sync-softwares-delta: inventário base divergente', [
+                    'equipamento_id' => $equipamento->id,
+                    'base_hash' => $validated['base_hash'],
+                    'server_hash' => $currentHash,
+                ]);
+                return response()->json([
+                    'message' => 'Inventário base divergente, sincronização completa necessária',
+                    'base_hash' => $currentHash,
+                ], 409);
+            }
+
+            $addedIds = [];
+            $removedIds = [];
+            $errors = [];
+
+            DB::beginTransaction();
+
+            try {
+                // Remover relacionamentos dos softwares desinstalados
+                foreach ($validated['removed'] as $softwareData) {
+                    [$nome, $versao] = $this->normalizeSoftwareKey($softwareData);
+                    if ($nome === null) {
+                        continue;
+                    }
+
+                    $query = $equipamento->softwares()->where('softwares.nome', $nome);
+                    if ($versao !== null) {
+                        $query->where('softwares.versao', $versao);
+                    } else {
+                        $query->whereNull('softwares.versao');
+                    }
+
+                    $removedIds = array_merge($removedIds, $query->pluck('softwares.id')->all());
+                }
+
+                if (!empty($removedIds)) {
+                    $equipamento->softwares()->detach($removedIds);
+                }
+
+                // Criar/atualizar os softwares instalados e relacionar ao equipamento
+                foreach ($validated['added'] as $index => $softwareData) {
+                    try {
+                        $software = $this->upsertSoftware($softwareData);
+                        if ($software) {
+                            $addedIds[] = $software->id;
+                        }
+                    } catch (\Throwable $e) {
+                        $errors[] = [
+                            'index' => $index,
+                            'nome' => $softwareData['nome'] ?? 'desconhecido',
+                            'error' => $e->getMessage(),
+                        ];
+                        Log::warning('Falha ao processar software (delta)', [
+                            'index' => $index,
+                            'nome' => $softwareData['nome'] ?? 'desconhecido',
+                            'error' => $e->getMessage(),
+                        ]);
+                    }
+                }
+
+                if (!empty($addedIds)) {
+                    $equipamento->softwares()->syncWithoutDetaching($addedIds);
+                }
+
+                DB::commit();
+            } catch (\Throwable $e) {
+                DB::rollBack();
+                throw $e;
+            }
+
+            Log::info('sync-softwares-delta concluído', [
+                'equipamento_id' => $equipamento->id,
+                'adicionados' => count($addedIds),
+                'removidos' => count($removedIds),
+                'total_erros' => count($errors),
+            ]);
+
+            return response()->json([
+                'added_ids' => $addedIds,
+                'removed_ids' => array_values(array_unique($removedIds)),
+                'hash' => $this->softwareInventoryHash($equipamento),
+                'total_softwares' => $equipamento->softwares()->count(),
+                'errors_count' => count($errors),
+                'errors' => $errors,
+            ]);
+        } catch (\Illuminate\Validation\ValidationException $e) {
+            Log::error('Erro de validação em sync-softwares-delta', [
+                'errors' => $e->errors(),
+            ]);
+            return response()->json([
+                'message' => 'Erro de validação',
+                'errors' => $e->errors(),
+            ], 422);
+        } catch (\Throwable $e) {
+            Log::error('Erro fatal em sync-softwares-delta', [
+                'message' => $e->getMessage(),
+                'file' => $e->getFile(),
+                'line' => $e->getLine(),
+                'trace' => $e->getTraceAsString(),
+            ]);
+            return response()->json([
+                'message' => 'Erro interno do servidor',
+                'error' => $e->getMessage(),
+            ], 500);
+        }
+    }
+
+    /**
+     * Comparar a árvore do inventário de softwares (reconciliação por buckets)
+     * POST /api/v1/agent/reconcile-softwares
+     *
+     * O agente envia a raiz e os hashes dos buckets do seu inventário. Se a raiz
+     * for igual à do servidor, nada precisa ser feito; senão o servidor responde
+     * quais buckets diferem e o agente reenvia apenas esses (sync-software-buckets).
+     */
+    public function reconcileSoftwares(Request $request): JsonResponse
+    {
+        try {
+            $validated = $request->validate([
+                'equipamento_id' => ['required', Rule::exists('equipamentos', 'id')->whereNull('deleted_at')],
+                'bucket_count' => 'required|integer|min:1|max:4096',
+                'root' => 'required|string|size:64',
+                'buckets' => 'required|array|size:' . (int) $request->input('bucket_count'),
+                'buckets.*' => 'required|string|size:64',
+            ]);
+
+            $equipamento = Equipamento::findOrFail($validated['equipamento_id']);
+            [$bucketHashes, $root] = $this->softwareInventoryTree($equipamento, $validated['bucket_count']);
+
+            if (hash_equals($root, $validated['root'])) {
+                return response()->json([
+                    'match' => true,
+                    'root' => $root,
+                    'buckets' => [],
+                ]);
+            }
+
+            $differing = [];
+            foreach ($bucketHashes as $index => $bucketHash) {
+                if (!hash_equals($bucketHash, (string) $validated['buckets'][$index])) {
+                    $differing[] = $index;
+                }
+            }
+
+            Log::info('reconcile-softwares: inventário divergente', [
+                'equipamento_id' => $equipamento->id,
+                'buckets_divergentes' => count($differing),
+                'bucket_count' => $validated['bucket_count'],
+            ]);
+
+            return response()->json([
+                'match' => false,
+                'root' => $root,
+                'buckets' => $differing,
+            ]);
+        } catch (\Illuminate\Validation\ValidationException $e) {
+            Log::error('Erro de validação em reconcile-softwares', [
+                'errors' => $e->errors(),
+            ]);
+            return response()->json([
+                'message' => 'Erro de validação',
+                'errors' => $e->errors(),
+            ], 422);
+        } catch (\Throwable $e) {
+            Log::error('Erro fatal em reconcile-softwares', [
+                'message' => $e->getMessage(),
+                'file' => $e->getFile(),
+                'line' => $e->getLine(),
+            ]);
+            return response()->json([
+                'message' => 'Erro interno do servidor',
+                'error' => $e->getMessage(),
+            ], 500);
+        }
+    }
+
+    /**
+     * Substituir o conteúdo de alguns buckets do inventário de softwares
+     * POST /api/v1/agent/sync-software-buckets
+     *
+     * Para cada bucket enviado, os softwares listados são criados/atualizados e
+     * relacionados ao equipamento; os softwares do equipamento que caem no mesmo
+     * bucket e não vieram na lista são desrelacionados.
+     */
+    public function syncSoftwareBuckets(Request $request): JsonResponse
+    {
+        try {
+            $validated = $request->validate([
+                'equipamento_id' => ['required', Rule::exists('equipamentos', 'id')->whereNull('deleted_at')],
+                'bucket_count' => 'required|integer|min:1|max:4096',
+                'buckets' => 'present|array',
+                'buckets.*' => 'present|array',
+                'buckets.*.*.nome' => 'required|string|max:255',
+                'buckets.*.*.versao' => 'nullable|string|max:255',
+                'buckets.*.*.fabricante' => 'nullable|string|max:255',
+                'buckets.*.*.data_instalacao' => 'nullable|string|max:50',
+                'buckets.*.*.chave_licenca' => 'nullable|string|max:255',
+            ]);
+
+            $equipamento = Equipamento::findOrFail($validated['equipamento_id']);
+            $bucketCount = $validated['bucket_count'];
+            $buckets = $validated['buckets'];
+            ksort($buckets, SORT_NUMERIC);
+
+            $softwareIds = [];
+            $removedIds = [];
+            $errors = [];
+            $offset = 0;
+
+            DB::beginTransaction();
+
+            try {
+                // Softwares atuais do equipamento agrupados por bucket
+                $current = [];
+                foreach ($equipamento->softwares()->get(['softwares.id', 'softwares.nome', 'softwares.versao']) as $software) {
+                    $line = $software->nome . "\t" . ($software->versao ?? '');
+                    $current[$this->softwareBucketIndex($line, $bucketCount)][] = $software->id;
+                }
+
+                foreach ($buckets as $bucket => $softwares) {
+                    $bucketIds = [];
+                    foreach (array_values($softwares) as $index => $softwareData) {
+                        try {
+                            $software = $this->upsertSoftware($softwareData);
+                            if ($software) {
+                                $bucketIds[] = $software->id;
+                            }
+                        } catch (\Throwable $e) {
+                            $errors[] = [
+                                'index' => $offset + $index,
+                                'nome' => $softwareData['nome'] ?? 'desconhecido',
+                                'error' => $e->getMessage(),
+                            ];
+                        }
+                    }
+                    $offset += count($softwares);
+
+                    $stale = array_values(array_diff($current[(int) $bucket] ?? [], $bucketIds));
+                    if (!empty($stale)) {
+                        $equipamento->softwares()->detach($stale);
+                        $removedIds = array_merge($removedIds, $stale);
+                    }
+                    if (!empty($bucketIds)) {
+                        $equipamento->softwares()->syncWithoutDetaching($bucketIds);
+                    }
+                    $softwareIds = array_merge($softwareIds, $bucketIds);
+                }
+
+                DB::commit();
+            } catch (\Throwable $e) {
+                DB::rollBack();
+                throw $e;
+            }
+
+            [, $root] = $this->softwareInventoryTree($equipamento, $bucketCount);
+
+            Log::info('sync-software-buckets concluído', [
+                'equipamento_id' => $equipamento->id,
+                'buckets' => count($buckets),
+                'softwares' => count($softwareIds),
+                'removidos' => count($removedIds),
+                'total_erros' => count($errors),
+            ]);
+
+            return response()->json([
+                'software_ids' => $softwareIds,
+                'removed_ids' => $removedIds,
+                'root' => $root,
+                'total_softwares' => $equipamento->softwares()->count(),
+                'errors_count' => count($errors),
+                'errors' => $errors,
+            ]);
+        } catch (\Illuminate\Validation\ValidationException $e) {
+            Log::error('Erro de validação em sync-software-buckets', [
+                'errors' => $e->errors(),
+            ]);
+            return response()->json([
+                'message' => 'Erro de validação',
+                'errors' => $e->errors(),
+            ], 422);
+        } catch (\Throwable $e) {
+            Log::error('Erro fatal em sync-software-buckets', [
+                'message' => $e->getMessage(),
+                'file' => $e->getFile(),
+                'line' => $e->getLine(),
+                'trace' => $e->getTraceAsString(),
+            ]);
+            return response()->json([
+                'message' => 'Erro interno do servidor',
+                'error' => $e->getMessage(),
+            ], 500);
+        }
+    }
+
     /**
      * Sincronizar relacionamento equipamento-softwares
      * POST /api/v1/agent/sync-equipamento-softwares
@@ -381,9 +615,11 @@ public function syncSoftwares(Request $request): JsonResponse
     public function syncEquipamentoSoftwares(Request $request): JsonResponse
     {
         $validated = $request->validate([
-            'equipamento_id' => 'required|exists:equipamentos,id',
+            'equipamento_id' => ['required', Rule::exists('equipamentos', 'id')->whereNull('deleted_at')],
             'software_ids' => 'required|array',
-            'software_ids.*' => 'exists:softwares,id',
+            // Softwares na lixeira são recusados (422): o agente descarta o ID do
+            // cache local e reenvia o software em sync-softwares, que o restaura
+            'software_ids.*' => Rule::exists('softwares', 'id')->whereNull('deleted_at'),
         ]);
 
         $equipamento = Equipamento::findOrFail($validated['equipamento_id']);
@@ -396,5 +632,172 @@ public function syncEquipamentoSoftwares(Request $request): JsonResponse
             'total_softwares' => count($validated['software_ids']),
         ]);
     }
-}
 
+    /**
+     * Criar ou atualizar um software a partir dos dados enviados pelo agente
+     * Retorna null se o nome estiver vazio
+     */
+    private function upsertSoftware(array $softwareData): ?Software
+    {
+        // Normalizar data_instalacao (flexível)
+        $dataInstalacao = null;
+        if (!empty($softwareData['data_instalacao'])) {
+            try {
+                $dataInstalacao = \Carbon\Carbon::parse($softwareData['data_instalacao'])->format('Y-m-d');
+            } catch (\Throwable $e) {
+                $dataInstalacao = null;
+            }
+        }
+
+        // Validar e sanitizar nome (obrigatório) e versão
+        [$nome, $versao] = $this->normalizeSoftwareKey($softwareData);
+        if ($nome === null) {
+            return null;
+        }
+
+        // Buscar software existente (incluindo soft deleted)
+        $query = Software::withTrashed()->where('nome', $nome);
+
+        if ($versao !== null && $versao !== '') {
+            $query->where('versao', $versao);
+        } else {
+            $query->whereNull('versao');
+        }
+
+        $software = $query->first();
+
+        if ($software) {
+            // Se estava soft deleted, restaurar
+            if ($software->trashed()) {
+                $software->restore();
+            }
+
+            // Preparar dados para atualização
+            $dataToUpdate = [
+                'detectado_por_agente' => true,
+            ];
+
+            // Atualizar apenas campos fornecidos
+            if (isset($softwareData['fabricante'])) {
+                $fabricante = !empty(trim($softwareData['fabricante']))
+                    ? mb_substr(trim($softwareData['fabricante']), 0, 255)
+                    : null;
+                $dataToUpdate['fabricante'] = $fabricante ?? $software->fabricante;
+            }
+
+            if ($dataInstalacao !== null) {
+                $dataToUpdate['data_instalacao'] = $dataInstalacao;
+            }
+
+            if (isset($softwareData['chave_licenca'])) {
+                $chaveLicenca = !empty(trim($softwareData['chave_licenca']))
+                    ? mb_substr(trim($softwareData['chave_licenca']), 0, 255)
+                    : null;
+                $dataToUpdate['chave_licenca'] = $chaveLicenca ?? $software->chave_licenca;
+            }
+
+            // Atualizar apenas se houver mudanças
+            $software->update($dataToUpdate);
+        } else {
+            // Criar novo software
+            // Sanitizar dados antes de criar (já temos nome e versao sanitizados acima)
+            $fabricante = isset($softwareData['fabricante']) && !empty(trim($softwareData['fabricante']))
+                ? mb_substr(trim($softwareData['fabricante']), 0, 255)
+                : null;
+            $chaveLicenca = isset($softwareData['chave_licenca']) && !empty(trim($softwareData['chave_licenca']))
+                ? mb_substr(trim($softwareData['chave_licenca']), 0, 255)
+                : null;
+
+            // Criar com apenas campos válidos
+            $dataToCreate = [
+                'nome' => $nome,
+                'detectado_por_agente' => true,
+                'tipo_licenca' => 'proprietario',
+            ];
+
+            if ($versao !== null) {
+                $dataToCreate['versao'] = $versao;
+            }
+            if ($fabricante !== null) {
+                $dataToCreate['fabricante'] = $fabricante;
+            }
+            if ($dataInstalacao !== null) {
+                $dataToCreate['data_instalacao'] = $dataInstalacao;
+            }
+            if ($chaveLicenca !== null) {
+                $dataToCreate['chave_licenca'] = $chaveLicenca;
+            }
+
+            $software = Software::create($dataToCreate);
+        }
+
+        return $software;
+    }
+
+    /**
+     * Normalizar a chave (nome, versão) de um software enviado pelo agente
+     * Nome vazio retorna null; versão vazia é tratada como null
+     */
+    private function normalizeSoftwareKey(array $softwareData): array
+    {
+        $nome = trim($softwareData['nome'] ?? '');
+        $nome = empty($nome) ? null : mb_substr($nome, 0, 255);
+
+        $versao = isset($softwareData['versao']) && !empty(trim($softwareData['versao']))
+            ? mb_substr(trim($softwareData['versao']), 0, 255)
+            : null;
+
+        return [$nome, $versao];
+    }
+
+    /**
+     * Hash do inventário de softwares de um equipamento
+     * SHA256 das linhas "nome\tversao" ordenadas, o mesmo cálculo feito pelo agente
+     */
+    private function softwareInventoryHash(Equipamento $equipamento): string
+    {
+        $lines = $equipamento->softwares()
+            ->get(['softwares.nome', 'softwares.versao'])
+            ->map(fn ($software) => $software->nome . "\t" . ($software->versao ?? ''))
+            ->unique()
+            ->all();
+
+        sort($lines, SORT_STRING);
+
+        return hash('sha256', implode("\n", $lines));
+    }
+
+    /**
+     * Bucket de uma linha "nome\tversao": primeiros 32 bits do SHA256, módulo bucketCount
+     * O mesmo cálculo feito pelo agente (utils/inventory.py)
+     */
+    private function softwareBucketIndex(string $line, int $bucketCount): int
+    {
+        return hexdec(substr(hash('sha256', $line), 0, 8)) % $bucketCount;
+    }
+
+    /**
+     * Árvore de Merkle rasa do inventário de softwares de um equipamento
+     * Retorna [hashes dos buckets, raiz]; o hash de cada bucket é calculado
+     * como softwareInventoryHash() sobre as linhas do bucket
+     */
+    private function softwareInventoryTree(Equipamento $equipamento, int $bucketCount): array
+    {
+        $buckets = array_fill(0, $bucketCount, []);
+        $lines = $equipamento->softwares()
+            ->get(['softwares.nome', 'softwares.versao'])
+            ->map(fn ($software) => $software->nome . "\t" . ($software->versao ?? ''))
+            ->unique();
+
+        foreach ($lines as $line) {
+            $buckets[$this->softwareBucketIndex($line, $bucketCount)][] = $line;
+        }
+
+        $bucketHashes = array_map(function (array $bucketLines) {
+            sort($bucketLines, SORT_STRING);
+            return hash('sha256', implode("\n", $bucketLines));
+        }, $buckets);
+
+        return [$bucketHashes, hash('sha256', implode("\n", $bucketHashes))];
+    }
+}
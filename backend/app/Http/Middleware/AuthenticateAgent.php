@@ -37,12 +37,6 @@ public function handle(Request $request, Closure $next): Response
                 return response()->json(['error' => 'API Key inválida ou inativa'], 401);
             }
 
-            // Marcar como usado
-            $agentKey->markAsUsed(
-                $request->ip(),
-                $request->input('hostname', 'unknown')
-            );
-
             // Adicionar ao request para uso posterior
             $request->merge(['agent_key' => $agentKey]);
             
@@ -50,7 +44,16 @@ public function handle(Request $request, Closure $next): Response
                 'agent_id' => $agentKey->id,
             ]);
 
-            return $next($request);
+            $response = $next($request);
+
+            // Marcar como usado depois do agent.decompress: com o corpo
+            // comprimido, o hostname só pode ser lido depois de descomprimido
+            $agentKey->markAsUsed(
+                $request->ip(),
+                $request->input('hostname', 'unknown')
+            );
+
+            return $response;
         } catch (\Throwable $e) {
             \Illuminate\Support\Facades\Log::error('Agent middleware - Erro fatal', [
                 'message' => $e->getMessage(),
@@ -0,0 +1,150 @@
+<?php
+
+namespace App\Http\Middleware;
+
+use Closure;
+use Illuminate\Http\Request;
+use Symfony\Component\HttpFoundation\InputBag;
+use Symfony\Component\HttpFoundation\Response;
+
+class DecompressAgentRequest
+{
+    /**
+     * Tamanho máximo do corpo descomprimido (proteção contra "zip bomb").
+     */
+    private const MAX_DECOMPRESSED_BYTES = 64 * 1024 * 1024;
+
+    /**
+     * Bytes comprimidos entregues por vez ao descompressor. Cada bloco
+     * expande no máximo algumas dezenas de MB, então o limite é verificado
+     * antes de o corpo inteiro ser descomprimido.
+     */
+    private const CHUNK_BYTES = 1024;
+
+    /**
+     * Descomprime o corpo enviado pelo agente (Content-Encoding gzip/zstd)
+     * e anuncia na resposta, via Accept-Encoding, as codificações aceitas.
+     * O agente só passa a comprimir depois de ver esse anúncio.
+     *
+     * Roda depois de agent.auth: só requisições autenticadas chegam a ser
+     * descomprimidas.
+     */
+    public function handle(Request $request, Closure $next): Response
+    {
+        $encoding = strtolower(trim((string) $request->header('Content-Encoding', 'identity')));
+
+        if ($encoding !== 'identity' && $encoding !== '') {
+            if (!in_array($encoding, self::supportedEncodings(), true)) {
+                return $this->advertise(response()->json([
+                    'error' => "Content-Encoding não suportado: {$encoding}",
+                ], 415));
+            }
+
+            $raw = $request->getContent();
+            try {
+                $content = $this->decode($encoding, $raw);
+            } catch (\OverflowException $e) {
+                return $this->advertise(response()->json(['error' => 'Corpo descomprimido muito grande'], 413));
+            }
+
+            if ($content === false) {
+                \Illuminate\Support\Facades\Log::warning('Agent middleware - Corpo comprimido inválido', [
+                    'encoding' => $encoding,
+                    'bytes' => strlen($raw),
+                ]);
+                return $this->advertise(response()->json(['error' => 'Corpo comprimido inválido'], 400));
+            }
+
+            $this->replaceContent($request, $content);
+        }
+
+        return $this->advertise($next($request));
+    }
+
+    /**
+     * Codificações que este servidor consegue descomprimir com limite de
+     * tamanho (zstd exige a API incremental da extensão, versão 0.12+).
+     */
+    private static function supportedEncodings(): array
+    {
+        return function_exists('zstd_uncompress_init') ? ['zstd', 'gzip'] : ['gzip'];
+    }
+
+    /**
+     * Descomprime o corpo em blocos, parando assim que o limite é excedido.
+     *
+     * @return string|false Conteúdo descomprimido, ou false se o corpo for inválido
+     *
+     * @throws \OverflowException Se o conteúdo exceder MAX_DECOMPRESSED_BYTES
+     */
+    private function decode(string $encoding, string $raw): string|false
+    {
+        if ($encoding === 'zstd') {
+            $context = @zstd_uncompress_init();
+            $add = fn (string $chunk) => @zstd_uncompress_add($context, $chunk);
+        } else {
+            $context = @inflate_init(ZLIB_ENCODING_GZIP);
+            $add = fn (string $chunk) => @inflate_add($context, $chunk, ZLIB_SYNC_FLUSH);
+        }
+
+        if ($context === false) {
+            return false;
+        }
+
+        $content = '';
+        foreach (str_split($raw, self::CHUNK_BYTES) as $chunk) {
+            $output = $add($chunk);
+            if ($output === false) {
+                return false;
+            }
+            if (strlen($content) + strlen($output) > self::MAX_DECOMPRESSED_BYTES) {
+                throw new \OverflowException('Corpo descomprimido muito grande');
+            }
+            $content .= $output;
+        }
+
+        // gzip truncado: o fim do fluxo nunca foi alcançado
+        if ($encoding === 'gzip' && inflate_get_status($context) !== ZLIB_STREAM_END) {
+            return false;
+        }
+
+        return $content;
+    }
+
+    /**
+     * Substitui o corpo da requisição pelo conteúdo descomprimido, mantendo
+     * os valores adicionados por middlewares anteriores (ex: agent_key).
+     */
+    private function replaceContent(Request $request, string $content): void
+    {
+        $server = $request->server->all();
+        unset($server['HTTP_CONTENT_ENCODING']);
+        $server['CONTENT_LENGTH'] = (string) strlen($content);
+
+        $request->initialize(
+            $request->query->all(),
+            $request->request->all(),
+            $request->attributes->all(),
+            $request->cookies->all(),
+            $request->files->all(),
+            $server,
+            $content
+        );
+
+        // O JSON já foi lido (ainda comprimido) pelo agent.auth, que adicionou o agent_key
+        $request->setJson(new InputBag(array_merge(
+            (array) json_decode($content, true),
+            $request->request->all()
+        )));
+    }
+
+    /**
+     * Adiciona o header Accept-Encoding à resposta (RFC 7694).
+     */
+    private function advertise(Response $response): Response
+    {
+        $response->headers->set('Accept-Encoding', implode(', ', self::supportedEncodings()));
+
+        return $response;
+    }
+}
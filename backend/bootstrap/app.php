@@ -19,6 +19,7 @@
         // Registrar middleware alias para o agente
         $middleware->alias([
             'agent.auth' => \App\Http\Middleware\AuthenticateAgent::class,
+            'agent.decompress' => \App\Http\Middleware\DecompressAgentRequest::class,
         ]);
     })
     ->withExceptions(function (Exceptions $exceptions): void {
@@ -117,8 +117,9 @@
     Route::post('/label-templates/{labelTemplate}/set-default', [LabelTemplateController::class, 'setDefault']);
 });
 
-// Rotas do Agente (autenticação via API Key)
-Route::prefix('v1/agent')->middleware('agent.auth')->group(function () {
+// Rotas do Agente (autenticação via API Key; corpo pode vir com gzip/zstd,
+// descomprimido só depois da autenticação)
+Route::prefix('v1/agent')->middleware(['agent.auth', 'agent.decompress'])->group(function () {
     // Endpoint de teste (sem validação pesada)
     Route::get('/test', function (Request $request) {
         \Illuminate\Support\Facades\Log::info('TEST ENDPOINT - Recebida requisição', [
@@ -136,6 +137,9 @@
     
     Route::post('/sync-equipamento', [AgentController::class, 'syncEquipamento']);
     Route::post('/sync-softwares', [AgentController::class, 'syncSoftwares']);
+    Route::post('/sync-softwares-delta', [AgentController::class, 'syncSoftwaresDelta']);
     Route::post('/sync-equipamento-softwares', [AgentController::class, 'syncEquipamentoSoftwares']);
+    Route::post('/reconcile-softwares', [AgentController::class, 'reconcileSoftwares']);
+    Route::post('/sync-software-buckets', [AgentController::class, 'syncSoftwareBuckets']);
 });
 
@@ -0,0 +1,105 @@
+<?php
+
+namespace Tests\Feature;
+
+use App\Models\AgentApiKey;
+use App\Models\Laboratorio;
+use App\Models\User;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Testing\TestResponse;
+use Tests\TestCase;
+
+class AgentCompressionTest extends TestCase
+{
+    use RefreshDatabase;
+
+    private AgentApiKey $agentKey;
+
+    private Laboratorio $laboratorio;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $user = User::factory()->create();
+        $this->laboratorio = Laboratorio::factory()->create(['responsavel_id' => $user->id]);
+        $this->agentKey = AgentApiKey::create([
+            'name' => 'Agente de teste',
+            'key' => AgentApiKey::generateKey(),
+            'active' => true,
+            'created_by' => $user->id,
+        ]);
+    }
+
+    /**
+     * Envia um corpo já codificado para sync-equipamento.
+     */
+    private function sendRaw(string $body, string $encoding, ?string $apiKey = null): TestResponse
+    {
+        return $this->call('POST', '/api/v1/agent/sync-equipamento', [], [], [], [
+            'CONTENT_TYPE' => 'application/json',
+            'HTTP_ACCEPT' => 'application/json',
+            'HTTP_CONTENT_ENCODING' => $encoding,
+            'HTTP_X_AGENT_API_KEY' => $apiKey ?? $this->agentKey->key,
+        ], $body);
+    }
+
+    private function equipamento(): string
+    {
+        return json_encode([
+            'hostname' => 'LAB01-PC01',
+            'mac_address' => 'AA-BB-CC-00-00-01',
+            'laboratorio_id' => $this->laboratorio->id,
+            'dados_hash' => 'abc123',
+        ]);
+    }
+
+    public function test_gzip_body_is_decompressed_after_authentication(): void
+    {
+        $response = $this->sendRaw(gzencode($this->equipamento()), 'gzip');
+
+        $response->assertOk()
+            ->assertJsonPath('action', 'created')
+            ->assertHeader('Accept-Encoding');
+        $this->assertDatabaseHas('equipamentos', ['hostname' => 'LAB01-PC01']);
+        // Hostname lido do corpo já descomprimido
+        $this->assertSame('LAB01-PC01', $this->agentKey->fresh()->last_hostname);
+    }
+
+    public function test_invalid_key_is_rejected_before_decompression(): void
+    {
+        $response = $this->sendRaw(gzencode($this->equipamento()), 'gzip', 'chave-invalida');
+
+        // Sem Accept-Encoding: o agent.decompress nem chegou a rodar
+        $response->assertStatus(401)->assertHeaderMissing('Accept-Encoding');
+    }
+
+    public function test_body_expanding_past_the_limit_returns_413(): void
+    {
+        // 65 MB de zeros comprimidos em ~65 KB, gerados em blocos
+        $context = deflate_init(ZLIB_ENCODING_GZIP);
+        $body = '';
+        $block = str_repeat("\0", 1024 * 1024);
+        for ($i = 0; $i < 65; $i++) {
+            $body .= deflate_add($context, $block, ZLIB_NO_FLUSH);
+        }
+        $body .= deflate_add($context, '', ZLIB_FINISH);
+
+        $this->sendRaw($body, 'gzip')->assertStatus(413);
+    }
+
+    public function test_invalid_or_truncated_body_returns_400(): void
+    {
+        $this->sendRaw('isto não é gzip', 'gzip')->assertStatus(400);
+
+        $compressed = gzencode($this->equipamento());
+        $this->sendRaw(substr($compressed, 0, intdiv(strlen($compressed), 2)), 'gzip')->assertStatus(400);
+    }
+
+    public function test_unsupported_encoding_returns_415(): void
+    {
+        $this->sendRaw($this->equipamento(), 'br')
+            ->assertStatus(415)
+            ->assertHeader('Accept-Encoding');
+    }
+}
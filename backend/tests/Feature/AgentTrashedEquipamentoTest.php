@@ -0,0 +1,71 @@
+<?php
+
+namespace Tests\Feature;
+
+use App\Models\AgentApiKey;
+use App\Models\Equipamento;
+use App\Models\Software;
+use App\Models\User;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Tests\TestCase;
+
+class AgentTrashedEquipamentoTest extends TestCase
+{
+    use RefreshDatabase;
+
+    private string $apiKey;
+
+    private Equipamento $equipamento;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $user = User::factory()->create();
+        $this->apiKey = AgentApiKey::generateKey();
+        AgentApiKey::create([
+            'name' => 'Agente de teste',
+            'key' => $this->apiKey,
+            'active' => true,
+            'created_by' => $user->id,
+        ]);
+
+        $this->equipamento = Equipamento::factory()->create();
+        $this->equipamento->delete();
+    }
+
+    private function agentPost(string $endpoint, array $data)
+    {
+        return $this->withHeaders(['X-Agent-API-Key' => $this->apiKey])
+            ->postJson("/api/v1/agent/{$endpoint}", $data);
+    }
+
+    public function test_delta_for_trashed_equipamento_returns_422(): void
+    {
+        // Antes o findOrFail respondia 500 e o agente repetia o envio para sempre
+        $this->agentPost('sync-softwares-delta', [
+            'equipamento_id' => $this->equipamento->id,
+            'base_hash' => str_repeat('0', 64),
+            'added' => [],
+            'removed' => [],
+        ])->assertStatus(422)->assertJsonValidationErrors('equipamento_id');
+    }
+
+    public function test_reconcile_for_trashed_equipamento_returns_422(): void
+    {
+        $this->agentPost('reconcile-softwares', [
+            'equipamento_id' => $this->equipamento->id,
+            'bucket_count' => 1,
+            'root' => str_repeat('0', 64),
+            'buckets' => [str_repeat('0', 64)],
+        ])->assertStatus(422)->assertJsonValidationErrors('equipamento_id');
+    }
+
+    public function test_relationship_for_trashed_equipamento_returns_422(): void
+    {
+        $this->agentPost('sync-equipamento-softwares', [
+            'equipamento_id' => $this->equipamento->id,
+            'software_ids' => [Software::factory()->create()->id],
+        ])->assertStatus(422)->assertJsonValidationErrors('equipamento_id');
+    }
+}